@@ -0,0 +1,5 @@
+#!/usr/bin/env bash
+
+source .venv/bin/activate
+
+pytest --perf tests/perf "${@:2}"
@@ -5,5 +5,6 @@ Import from those modules directly or use the main package imports.
 from .key import T9Key
 from .dict import T9Dict
 from .input import T9Input
+from .stats import T9Stats
 
-__all__ = ["T9Key", "T9Dict", "T9Input"]
+__all__ = ["T9Key", "T9Dict", "T9Input", "T9Stats"]
@@ -0,0 +1,159 @@
+"""Asyncio support for PY9 T9 text input system.
+
+AsyncT9Dict wraps one T9Dict for use from an event loop. Lookups run in an
+executor, and every write goes through a single writer task so that writes
+never overlap. Sessions made with AsyncT9Dict.session() share the same
+dictionary, and their new words are queued to the same writer.
+"""
+
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from .dict import T9Dict
+from .input import T9Input
+
+# decoded nodes kept by the shared dictionary
+CACHE_NODES = 1 << 16
+
+
+class SessionDict:
+    """The dictionary seen by an AsyncT9Dict session.
+
+    Lookups go straight to the shared T9Dict. New words are handed to the
+    writer task, and addword() waits until they are written.
+    """
+
+    def __init__(self, adict):
+        self._adict = adict
+        self.dict = adict.dict
+
+    def current(self):
+        """Get the shared dictionary's current version, see T9Dict.current()."""
+        return self.dict.current()
+
+    def getwords(self, digits, op="getwords"):
+        """Get possible words for a T9 digit sequence, see T9Dict.getwords()."""
+        return self.dict.getwords(digits, op)
+
+    def addword(self, word):
+        """Add a word through the writer task, waiting until it is written.
+
+        Raises KeyError if word already exists, as T9Dict.addword() does.
+        Sessions must type in an executor (see AsyncT9Dict.sendkeys()),
+        since the event loop's own thread can't wait for the writer task.
+        """
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is not None and running is self._adict._loop:
+            raise RuntimeError("can't wait for the writer task on its own event loop, use asendkeys()")
+        self._adict.submit(word).result()
+
+
+class AsyncT9Dict:
+    """Asyncio front end for a shared T9Dict."""
+
+    def __init__(self, dict_file, executor=None):
+        """Open the dictionary.
+
+        dict_file: dictionary file, or an open T9Dict
+        executor: executor for lookups (default: the loop's default executor)
+        """
+        self._owned = isinstance(dict_file, (str, os.PathLike))  # opened here, so closed by close()
+        if self._owned:
+            self.dict = T9Dict(str(dict_file), cache_size=CACHE_NODES)
+        else:
+            self.dict = dict_file
+        self.executor = executor
+        self._write_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="t9-writer")
+        self._loop = None
+        self._queue = None
+        self._writer = None
+
+    def _start(self):
+        """Start the writer task on the running loop, if it isn't running."""
+        if self._writer is None:
+            self._loop = asyncio.get_running_loop()
+            self._queue = asyncio.Queue()
+            self._writer = self._loop.create_task(self._write_loop())
+
+    async def _write_loop(self):
+        """Add queued words one at a time."""
+        while True:
+            word, future = await self._queue.get()
+            try:
+                await self._loop.run_in_executor(self._write_executor, self.dict.addword, word)
+            except Exception as e:
+                if not future.cancelled():
+                    future.set_exception(e)
+            else:
+                if not future.cancelled():
+                    future.set_result(None)
+            finally:
+                self._queue.task_done()
+
+    async def getwords(self, digits):
+        """Get possible words for a T9 digit sequence, see T9Dict.getwords()."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.dict.getwords, digits)
+
+    async def addword(self, word):
+        """Add a word to the dictionary through the writer task.
+
+        Raises KeyError if word already exists.
+        """
+        self._start()
+        future = self._loop.create_future()
+        self._queue.put_nowait((word, future))
+        await future
+
+    def submit(self, word):
+        """Queue a word for the writer task from another thread.
+
+        Safe to call from any thread once the writer task is running.
+
+        Returns:
+            a concurrent.futures.Future, done once the word is written
+        """
+        return asyncio.run_coroutine_threadsafe(self.addword(word), self._loop)
+
+    def session(self, *args, **kwargs):
+        """Make a T9Input that shares this dictionary.
+
+        Takes the same arguments as T9Input, apart from the dictionary.
+        Must be called from the event loop.
+        """
+        self._start()
+        return T9Input(SessionDict(self), *args, **kwargs)
+
+    async def sendkeys(self, session, keys):
+        """Send keys to a session without blocking the event loop."""
+        return await session.asendkeys(keys, self.executor)
+
+    async def flush(self):
+        """Wait until every queued word has been written."""
+        if self._queue is not None:
+            await self._queue.join()
+
+    async def close(self):
+        """Finish queued writes, then stop the writer and close the dictionary if it was opened here."""
+        await self.flush()
+        if self._writer is not None:
+            self._writer.cancel()
+            try:
+                await self._writer
+            except asyncio.CancelledError:
+                pass
+            self._writer = None
+        self._write_executor.shutdown()
+        if self._owned:
+            self.dict.close()
+
+    async def __aenter__(self):
+        self._start()
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
@@ -0,0 +1,78 @@
+"""Process pool batch lookups for PY9 T9 text input system.
+
+The input is split into chunks of whole lines. Each worker process opens
+the dictionary once, when it starts, and turns chunks into output bytes.
+Results are written in input order, and only a few chunks per worker are
+in flight at any time, so memory use stays flat however big the input is.
+"""
+
+import io
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .lookup import Lookup
+
+# input read per chunk, in bytes (rounded up to a whole line)
+CHUNK_BYTES = 1 << 20
+
+# chunks queued per worker before waiting for the oldest
+AHEAD = 2
+
+_lookup = None  # the worker's Lookup
+
+
+def _start_worker(dict_file, top, match, fmt):
+    """Open the dictionary in a new worker process."""
+    global _lookup
+    _lookup = Lookup(dict_file, top, match, fmt)
+
+
+def _run_chunk(chunk):
+    """Look up a chunk of input lines in a worker.
+
+    Returns:
+        (number of lines, output bytes)
+    """
+    out = io.BytesIO()
+    count = _lookup.run(io.BytesIO(chunk), out)
+    return count, out.getvalue()
+
+
+def read_chunks(infile, size=CHUNK_BYTES):
+    """Read a binary file in chunks of about size bytes, ending on whole lines."""
+    while True:
+        chunk = infile.read(size)
+        if not chunk:
+            return
+        if not chunk.endswith(b"\n"):
+            chunk += infile.readline()
+        yield chunk
+
+
+def run_batch(dict_file, infile, outfile, workers, top=0, match=False, fmt="tsv", chunk_bytes=CHUNK_BYTES):
+    """Look up every line of a binary input file with a pool of worker processes.
+
+    Takes the same options as Lookup. Output is the same as Lookup.run()
+    gives, in the same order.
+
+    Returns:
+        number of lines looked up
+    """
+    count = 0
+    pending = deque()
+
+    def write_oldest():
+        lines, data = pending.popleft().result()
+        outfile.write(data)
+        return lines
+
+    with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=(str(dict_file), top, match, fmt)) as pool:
+        for chunk in read_chunks(infile, chunk_bytes):
+            pending.append(pool.submit(_run_chunk, chunk))
+            if len(pending) >= workers * AHEAD:
+                count += write_oldest()
+        while pending:
+            count += write_oldest()
+
+    outfile.flush()
+    return count
@@ -0,0 +1,232 @@
+"""Benchmark suite for PY9 T9 text input system.
+
+Every benchmark is deterministic for a given wordlist and seed, so the JSON
+results can be compared across versions and machines.
+"""
+
+import json
+import platform
+import random
+import shutil
+import tempfile
+import time
+import tracemalloc
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+
+from . import maket9
+from .dict import T9Dict
+from .input import T9Input
+from .stats import T9Stats
+from .utils import getkey, read_wordlist
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+PERCENTILES = (50, 90, 99)
+
+
+def package_version():
+    """Get the installed t9 version, if there is one."""
+    try:
+        return version("t9")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def percentiles(samples):
+    """Summarise a list of timings in seconds as microsecond percentiles."""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    result = {}
+    for p in PERCENTILES:
+        i = min(len(ordered) - 1, int(len(ordered) * p / 100))
+        result[f"p{p}_us"] = round(ordered[i] * 1e6, 3)
+    result["max_us"] = round(ordered[-1] * 1e6, 3)
+    result["mean_us"] = round(sum(ordered) / len(ordered) * 1e6, 3)
+    return result
+
+
+def page_faults():
+    """Get the page faults taken by this process so far (0 where this isn't known)."""
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_minflt + usage.ru_majflt
+
+
+def sample_words(words, count, seed):
+    """Pick count words (with replacement) using a seeded generator."""
+    rng = random.Random(seed)
+    return [rng.choice(words) for _ in range(count)]
+
+
+def new_words(words, count, seed):
+    """Make count random words that are not in the wordlist."""
+    rng = random.Random(seed)
+    existing = set(words)
+    result = []
+    while len(result) < count:
+        word = "".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 10)))
+        if word not in existing:
+            existing.add(word)
+            result.append(word)
+    return result
+
+
+def corpus_keys(text):
+    """Convert text to the keypresses that type it in predictive mode.
+
+    Each word is typed as its digits followed by 0 (space).
+    """
+    return "".join(getkey(word) + "0" for word in text.split())
+
+
+def bench_makedict(wordlist, output, language="Bench", comment="", layout="hot"):
+    """Time a dictionary build and measure its peak traced memory.
+
+    The build runs twice: once untraced for the timing, and once under
+    tracemalloc, which would otherwise inflate the time.
+    """
+    start = time.perf_counter()
+    maket9.makedict(str(wordlist), str(output), language, comment, layout)
+    seconds = time.perf_counter() - start
+
+    # leave tracing alone if someone else started it, such as --profile
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.start()
+    try:
+        before, _ = tracemalloc.get_traced_memory()
+        maket9.makedict(str(wordlist), str(output), language, comment, layout)
+        _, peak = tracemalloc.get_traced_memory()
+        peak -= before
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    return {"seconds": round(seconds, 6), "peak_bytes": peak, "file_bytes": Path(output).stat().st_size}
+
+
+def bench_getwords(dict_file, keys):
+    """Time lookups of each key sequence, cold then warm.
+
+    Cold lookups each use a freshly opened dictionary. Warm lookups reuse
+    one dictionary after a full warm-up pass over the same keys. A final
+    instrumented pass counts the I/O done per lookup, and the page faults
+    of a lookup in a freshly mapped dictionary.
+    """
+    cold = []
+    for k in keys:
+        start = time.perf_counter()
+        T9Dict(str(dict_file)).getwords(k)
+        cold.append(time.perf_counter() - start)
+
+    d = T9Dict(str(dict_file))
+    for k in keys:
+        d.getwords(k)
+    warm = []
+    for k in keys:
+        start = time.perf_counter()
+        d.getwords(k)
+        warm.append(time.perf_counter() - start)
+
+    stats = T9Stats()
+    d = T9Dict(str(dict_file), stats)
+    for k in keys:
+        d.getwords(k)
+    totals = stats.as_dict().get("getwords", {})
+    io = {name: round(totals.get(name, 0) / max(1, len(keys)), 3) for name in ("opens", "seeks", "nodes", "bytes_read")}
+
+    faults = 0
+    for k in keys:
+        d = T9Dict(str(dict_file))
+        before = page_faults()
+        d.getwords(k)
+        faults += page_faults() - before
+        d.close()
+    io["cold_faults"] = round(faults / max(1, len(keys)), 3)
+
+    return {"lookups": len(keys), "cold": percentiles(cold), "warm": percentiles(warm), "per_lookup": io}
+
+
+def bench_addword(dict_file, words):
+    """Time adding each word to the dictionary."""
+    d = T9Dict(str(dict_file))
+    start = time.perf_counter()
+    for word in words:
+        d.addword(word)
+    seconds = time.perf_counter() - start
+    return {"words": len(words), "seconds": round(seconds, 6), "per_second": round(len(words) / seconds, 1)}
+
+
+def bench_sendkeys(dict_file, keys):
+    """Time replaying a keypress sequence through T9Input."""
+    x = T9Input(str(dict_file))
+    start = time.perf_counter()
+    x.sendkeys(keys)
+    seconds = time.perf_counter() - start
+    return {"keys": len(keys), "seconds": round(seconds, 6), "per_second": round(len(keys) / seconds, 1)}
+
+
+def run_bench(wordlist, lookups=10000, inserts=1000, corpus=None, seed=9, layout="hot"):
+    """Run the full benchmark suite against a wordlist.
+
+    Args:
+        wordlist: wordlist file to build the benchmark dictionary from
+        lookups: number of key sequences to look up
+        inserts: number of new words to add
+        corpus: text file to type through T9Input (default: sampled words)
+        seed: random seed for every sampled workload
+        layout: node layout of the benchmark dictionary, see maket9
+
+    Returns:
+        dict of JSON-serialisable results
+    """
+    words = list(read_wordlist(wordlist))
+    keys = [getkey(w) for w in sample_words(words, lookups, seed)]
+    if corpus:
+        text = Path(corpus).read_text(encoding="utf-8")
+    else:
+        text = " ".join(sample_words(words, 1000, seed + 1))
+
+    results = {
+        "t9": package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "wordlist": str(wordlist),
+        "words": len(words),
+        "seed": seed,
+        "layout": layout,
+    }
+
+    workdir = Path(tempfile.mkdtemp(prefix="t9-bench-"))
+    try:
+        dict_file = workdir / "bench.dict"
+        results["makedict"] = bench_makedict(wordlist, dict_file, layout=layout)
+        results["getwords"] = bench_getwords(dict_file, keys)
+
+        # writes go to copies so every benchmark sees the same dictionary
+        scratch = workdir / "scratch.dict"
+        shutil.copyfile(dict_file, scratch)
+        results["addword"] = bench_addword(scratch, new_words(words, inserts, seed + 2))
+
+        shutil.copyfile(dict_file, scratch)
+        results["sendkeys"] = bench_sendkeys(scratch, corpus_keys(text))
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return results
+
+
+def write_results(results, output=None):
+    """Print results as JSON, and save them to output if given."""
+    text = json.dumps(results, indent=2)
+    print(text)
+    if output:
+        Path(output).write_text(text + "\n", encoding="utf-8")
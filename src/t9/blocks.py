@@ -0,0 +1,94 @@
+"""Block-compressed nodes for PY9 T9 text input system.
+
+Compressed dictionaries are read-only. Their nodes are cut into blocks of
+about BLOCK_BYTES, each compressed on its own. No node is split between
+blocks, and nodes keep the positions they would have in an uncompressed
+file, so a node is found by looking up which block its position is in.
+
+Blocks, right after the header (and string pool, if there is one):
+    !B              codec, see CODECS
+    !L              number of blocks
+    !Q[blocks + 1]  uncompressed position where each block starts, then the end
+    !Q[blocks + 1]  position in the file of each compressed block, then the end
+    compressed blocks
+"""
+
+import bisect
+import lzma
+import struct
+import zlib
+from collections import OrderedDict
+
+HEAD = struct.Struct("!BL")
+
+CODECS = {"zlib": 1, "lzma": 2}
+MODULES = {1: zlib, 2: lzma}
+
+BLOCK_BYTES = 1 << 14
+
+# decompressed blocks kept per dictionary
+BLOCK_CACHE = 64
+
+
+def compress_nodes(data, base, starts, codec="zlib"):
+    """Compress the nodes of a dictionary.
+
+    data: the nodes, as written to an uncompressed file from position base
+    starts: sorted positions of every node
+    codec: "zlib" or "lzma"
+
+    Returns:
+        the blocks, to be written at position base
+    """
+    module = MODULES[CODECS[codec]]
+    bounds = [base]
+    for pos in starts:
+        if pos - bounds[-1] >= BLOCK_BYTES:
+            bounds.append(pos)
+    bounds.append(base + len(data))
+
+    blocks = [module.compress(data[a - base : b - base]) for a, b in zip(bounds, bounds[1:])]
+    count = len(blocks)
+    offsets = [base + HEAD.size + 16 * (count + 1)]
+    for block in blocks:
+        offsets.append(offsets[-1] + len(block))
+
+    index = struct.pack(f"!{count + 1}Q", *bounds) + struct.pack(f"!{count + 1}Q", *offsets)
+    return HEAD.pack(CODECS[codec], count) + index + b"".join(blocks)
+
+
+class BlockReader:
+    """Finds nodes in the compressed blocks of a buffer, such as an mmap of the dictionary file."""
+
+    def __init__(self, buf, pos):
+        self.buf = buf
+        codec, count = HEAD.unpack_from(buf, pos)
+        self.codec = MODULES[codec]
+        pos += HEAD.size
+        self.starts = list(struct.unpack_from(f"!{count + 1}Q", buf, pos))
+        self.offsets = list(struct.unpack_from(f"!{count + 1}Q", buf, pos + 8 * (count + 1)))
+        self._cache = OrderedDict()  # block number -> decompressed bytes
+
+    def block(self, pos):
+        """Get the decompressed block holding the node at pos.
+
+        Returns:
+            (block, position the block starts at)
+        """
+        i = bisect.bisect_right(self.starts, pos) - 1
+        data = self._cache.get(i)
+        if data is None:
+            data = self.codec.decompress(self.buf[self.offsets[i] : self.offsets[i + 1]])
+            if len(self._cache) >= BLOCK_CACHE:
+                # drop the least recently used entry, unless another thread just did
+                try:
+                    self._cache.popitem(last=False)
+                except KeyError:
+                    pass
+            self._cache[i] = data
+        else:
+            try:
+                self._cache.move_to_end(i)
+            except KeyError:
+                pass
+        return data, self.starts[i]
@@ -0,0 +1,157 @@
+"""Text buffer for PY9 T9 text input system."""
+
+
+class TextBuffer:
+    """Gap buffer holding the text either side of the cursor.
+
+    Characters before the cursor are kept in order, and those after it in
+    reverse, so typing, deleting and moving the cursor only touch the ends
+    of two lists. Joining them into strings is left until text is needed.
+
+    Edits also record how much text at either end they left alone, so a
+    display can be updated from changes() without comparing whole strings.
+    """
+
+    __slots__ = ("_before", "_after", "_start", "_end")
+
+    def __init__(self, before="", after=""):
+        self._before = list(before)
+        self._after = list(reversed(after))
+        self._start = None  # characters at the start unchanged since changes(), None = all
+        self._end = None  # characters at the end unchanged since changes(), None = all
+
+    def state(self):
+        """Get (before, after, start, end), to make the same buffer with fromstate()."""
+        return self.before, self.after, self._start, self._end
+
+    @classmethod
+    def fromstate(cls, before, after, start, end):
+        """Make a buffer from state() of another one."""
+        buffer = cls(before, after)
+        buffer._start = start
+        buffer._end = end
+        return buffer
+
+    def _changed(self, start, end):
+        """Record an edit that left start characters at the start and end at the end."""
+        if self._start is None or start < self._start:
+            self._start = start
+        if self._end is None or end < self._end:
+            self._end = end
+
+    @property
+    def before(self):
+        """Text before the cursor."""
+        return "".join(self._before)
+
+    @before.setter
+    def before(self, value):
+        self._before = list(value)
+        self._changed(0, len(self._after))
+
+    @property
+    def after(self):
+        """Text after the cursor."""
+        return "".join(reversed(self._after))
+
+    @after.setter
+    def after(self, value):
+        self._after = list(reversed(value))
+        self._changed(len(self._before), 0)
+
+    def __len__(self):
+        return len(self._before) + len(self._after)
+
+    def __str__(self):
+        return self.before + self.after
+
+    @property
+    def cursor(self):
+        """Cursor position, in characters from the start."""
+        return len(self._before)
+
+    def text(self, start, end):
+        """Get the text from start to end, only joining the characters in between."""
+        cursor = len(self._before)
+        text = "".join(self._before[start : min(end, cursor)])
+        if end > cursor:
+            first = max(start - cursor, 0)
+            last = end - cursor
+            text += "".join(reversed(self._after[len(self._after) - last : len(self._after) - first]))
+        return text
+
+    def changes(self):
+        """Get how much text is unchanged since the last call, and start again.
+
+        Returns:
+            (start, end): the number of characters at the start and at the
+            end that no edit has touched, each len(self) if nothing changed
+        """
+        size = len(self)
+        start = size if self._start is None else self._start
+        end = size if self._end is None else self._end
+        self._start = self._end = None
+        return start, end
+
+    def charbefore(self):
+        """Get the character before the cursor, or "" at the start."""
+        return self._before[-1] if self._before else ""
+
+    def charafter(self):
+        """Get the character after the cursor, or "" at the end."""
+        return self._after[-1] if self._after else ""
+
+    def insert(self, text):
+        """Insert text before the cursor."""
+        self._changed(len(self._before), len(self._after))
+        self._before.extend(text)
+
+    def insertafter(self, text):
+        """Insert text after the cursor."""
+        self._changed(len(self._before), len(self._after))
+        self._after.extend(reversed(text))
+
+    def replacebefore(self, c):
+        """Replace the character before the cursor."""
+        self._before[-1] = c
+        self._changed(len(self._before) - 1, len(self._after))
+
+    def backspace(self):
+        """Delete the character before the cursor.
+
+        Returns:
+            the deleted character, or "" at the start
+        """
+        if not self._before:
+            return ""
+        c = self._before.pop()
+        self._changed(len(self._before), len(self._after))
+        return c
+
+    def left(self):
+        """Move the cursor back one character, unless it's at the start."""
+        if self._before:
+            self._after.append(self._before.pop())
+
+    def right(self):
+        """Move the cursor forward one character, unless it's at the end."""
+        if self._after:
+            self._before.append(self._after.pop())
+
+    def takewordbefore(self):
+        """Remove and return the characters between the cursor and the space before it."""
+        word = []
+        while self._before and self._before[-1] != " ":
+            word.append(self._before.pop())
+        if word:
+            self._changed(len(self._before), len(self._after))
+        return "".join(reversed(word))
+
+    def takewordafter(self):
+        """Remove and return the characters between the cursor and the space after it."""
+        word = []
+        while self._after and self._after[-1] != " ":
+            word.append(self._after.pop())
+        if word:
+            self._changed(len(self._before), len(self._after))
+        return "".join(word)
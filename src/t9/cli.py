@@ -1,12 +1,25 @@
 """Command-line interface for PY9 T9 text input system."""
 
 import argparse
+import asyncio
+import io
+import json
 import sys
 from pathlib import Path
 
 from importlib.metadata import version
 
 from . import maket9
+from .batch import run_batch
+from .bench import run_bench, write_results
+from .dict import T9Dict
+from .dicttools import PRIORITIES, diff, inspect, merge, read_frequencies, reorder
+from .kspc import evaluate
+from .lookup import Lookup
+from .profiling import run_profiled
+from .replay import run_replay
+from .server import serve_forever
+from .utils import find_or_generate_dict, find_wordlist, get_locale
 from .demo import run_demo as demo_function
 from .corpus.cli import add_corpus_commands
 
@@ -16,7 +29,7 @@ def run_demo(dict_file=None, language=None, region=None):
     return demo_function(dict_file, language, region)
 
 
-def generate_dict(wordlist, output, language="Unknown", comment=""):
+def generate_dict(wordlist, output, language="Unknown", comment="", layout="hot", pool=False, compress=None):
     """
     Generate a T9 dictionary from a wordlist file.
     """
@@ -28,10 +41,13 @@ def generate_dict(wordlist, output, language="Unknown", comment=""):
     print(f"Output: {output}")
     print(f"Language: {language}")
     print(f"Comment: {comment}")
+    print(f"Layout: {layout}{', string pool' if pool else ''}")
+    if compress:
+        print(f"Compression: {compress} (read-only)")
 
     try:
         # Call the generation function
-        maket9.makedict(wordlist, output, language, comment)
+        maket9.makedict(wordlist, output, language, comment, layout, pool, compress)
         print(f"Dictionary successfully created: {output}")
         return 0
 
@@ -40,6 +56,270 @@ def generate_dict(wordlist, output, language="Unknown", comment=""):
         return 1
 
 
+def benchmark(
+    wordlist=None,
+    language=None,
+    region=None,
+    lookups=10000,
+    inserts=1000,
+    corpus=None,
+    seed=9,
+    output=None,
+    layout="hot",
+):
+    """
+    Benchmark a wordlist, printing the results as JSON.
+    """
+    if wordlist is None:
+        if language is None:
+            language, region = get_locale()
+        wordlist = find_wordlist(language or "en", region) or find_wordlist("en", "GB")
+
+    if not Path(wordlist).exists():
+        print(f"Wordlist file not found: {wordlist}")
+        return 1
+
+    write_results(run_bench(wordlist, lookups, inserts, corpus, seed, layout), output)
+    return 0
+
+
+def kspc(corpus, dict_file=None, language=None, region=None, output=None):
+    """
+    Work out the keystrokes per character of typing a text corpus, printing the results as JSON.
+    """
+    if dict_file is None:
+        dict_file = find_or_generate_dict(language, region)
+        if not dict_file:
+            print("Could not find or generate dictionary.")
+            return 1
+    elif not Path(dict_file).exists():
+        print(f"Dictionary file not found: {dict_file}")
+        return 1
+    if not Path(corpus).exists():
+        print(f"Corpus file not found: {corpus}")
+        return 1
+
+    write_results(evaluate(dict_file, Path(corpus).read_text(encoding="utf-8")), output)
+    return 0
+
+
+def dict_reorder(dict_file, frequencies, output=None):
+    """
+    Put the words of a dictionary in order of a frequency table, printing the results as JSON.
+    """
+    for path in (dict_file, frequencies):
+        if not Path(path).exists():
+            print(f"File not found: {path}")
+            return 1
+    with T9Dict(str(dict_file), revalidate=None) as d:
+        compressed = d.compressed
+    if compressed:
+        print(f"Dictionary is compressed, so it can't be reordered: {dict_file}")
+        return 1
+
+    try:
+        write_results(reorder(dict_file, read_frequencies(frequencies), output))
+    except io.UnsupportedOperation as e:
+        # compressed by a rebuild since the check
+        print(e)
+        return 1
+    return 0
+
+
+def dict_merge(a_file, b_file, output, priority="a", language=None, comment=None):
+    """
+    Merge two dictionaries into a new one, printing the results as JSON.
+    """
+    for path in (a_file, b_file):
+        if not Path(path).exists():
+            print(f"Dictionary file not found: {path}")
+            return 1
+
+    write_results(merge(a_file, b_file, output, priority, language, comment))
+    return 0
+
+
+def dict_diff(a_file, b_file):
+    """
+    Print the words added and removed between two dictionaries, as digit sequence and +word or -word lines.
+    """
+    for path in (a_file, b_file):
+        if not Path(path).exists():
+            print(f"Dictionary file not found: {path}")
+            return 1
+
+    out = sys.stdout
+    for keys, added, removed in diff(a_file, b_file):
+        for word in removed:
+            out.write(f"{keys}\t-{word}\n")
+        for word in added:
+            out.write(f"{keys}\t+{word}\n")
+    out.flush()
+    return 0
+
+
+def dict_stats(dict_file, top=10, output=None):
+    """
+    Measure the shape of a dictionary, printing the results as JSON.
+    """
+    if not Path(dict_file).exists():
+        print(f"Dictionary file not found: {dict_file}")
+        return 1
+
+    write_results(inspect(dict_file, top), output)
+    return 0
+
+
+def dict_check(dict_file):
+    """
+    Check the structure of a dictionary, printing any problems. Returns 1 if there are any.
+    """
+    if not Path(dict_file).exists():
+        print(f"Dictionary file not found: {dict_file}")
+        return 1
+
+    result = inspect(dict_file, top=0)
+    for p in result["problems"]:
+        where = " ".join(f"{k}={p[k]}" for k in ("position", "ref") if k in p)
+        print(f"{p['problem']} {where}".rstrip())
+    if result["problem_count"] > len(result["problems"]):
+        print(f"... {result['problem_count'] - len(result['problems'])} more problems")
+    print(
+        f"{dict_file}: {result['nodes']} nodes, {result['words']} words, {result['dead_nodes']} dead nodes, "
+        f"{result['problem_count']} problems"
+    )
+    return 1 if result["problem_count"] else 0
+
+
+def lookup(dict_file=None, language=None, region=None, top=0, match=False, fmt="tsv", workers=1):
+    """
+    Look up digit sequences from stdin, one per line, writing words to stdout.
+    """
+    if dict_file is None:
+        dict_file = find_or_generate_dict(language, region)
+        if not dict_file:
+            print("Could not find or generate dictionary.", file=sys.stderr)
+            return 1
+    elif not Path(dict_file).exists():
+        print(f"Dictionary file not found: {dict_file}", file=sys.stderr)
+        return 1
+
+    if workers > 1:
+        run_batch(dict_file, sys.stdin.buffer, sys.stdout.buffer, workers, top, match, fmt)
+    else:
+        Lookup(dict_file, top, match, fmt).run(sys.stdin.buffer, sys.stdout.buffer)
+    return 0
+
+
+def replay(log=None, dict_file=None, language=None, region=None, output=None, workers=1, keydelay=0.5):
+    """
+    Replay recorded sessions from a log (default: stdin), writing results to stdout
+    and a JSON summary to stderr.
+    """
+    if dict_file is None:
+        dict_file = find_or_generate_dict(language, region)
+        if not dict_file:
+            print("Could not find or generate dictionary.", file=sys.stderr)
+            return 1
+    elif not Path(dict_file).exists():
+        print(f"Dictionary file not found: {dict_file}", file=sys.stderr)
+        return 1
+    if log is not None and not Path(log).exists():
+        print(f"Log file not found: {log}", file=sys.stderr)
+        return 1
+
+    infile = open(log, "rb") if log else sys.stdin.buffer
+    outfile = open(output, "wb") if output else sys.stdout.buffer
+    try:
+        summary = run_replay(dict_file, infile, outfile, workers, keydelay)
+    finally:
+        if log:
+            infile.close()
+        if output:
+            outfile.close()
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 0
+
+
+def serve(dict_file=None, language=None, region=None, path=None, host="127.0.0.1", port=9009, workers=4, diffs=False):
+    """
+    Serve T9 input sessions over a Unix socket or localhost TCP.
+    """
+    if dict_file is None:
+        dict_file = find_or_generate_dict(language, region)
+        if not dict_file:
+            print("Could not find or generate dictionary.")
+            return 1
+    elif not Path(dict_file).exists():
+        print(f"Dictionary file not found: {dict_file}")
+        return 1
+
+    try:
+        asyncio.run(serve_forever(dict_file, path, host, port, workers, diffs))
+    except KeyboardInterrupt:
+        print("\nExiting...")
+    return 0
+
+
+def dispatch(args, language=None, region=None):
+    """
+    Run the command chosen on the command line.
+    """
+    # If no command specified, run demo by default
+    if args.command is None:
+        print("No command specified, running demo...")
+        return run_demo(None, language, region)
+
+    if args.command in ("generate", "gen"):
+        return generate_dict(
+            args.wordlist, args.output, args.language, args.comment, args.layout, args.pool, args.compress
+        )
+    elif args.command == "demo":
+        return run_demo(args.dictionary, language, region)
+    elif args.command == "bench":
+        return benchmark(
+            args.wordlist,
+            language,
+            region,
+            args.lookups,
+            args.inserts,
+            args.corpus,
+            args.seed,
+            args.output,
+            args.layout,
+        )
+    elif args.command == "kspc":
+        return kspc(args.corpus, args.dictionary, language, region, args.output)
+    elif args.command == "lookup":
+        return lookup(args.dictionary, language, region, args.top, args.match, args.format, args.workers)
+    elif args.command == "replay":
+        return replay(args.log, args.dictionary, language, region, args.output, args.workers, args.keydelay)
+    elif args.command == "serve":
+        return serve(args.dictionary, language, region, args.socket, args.host, args.port, args.workers, args.diffs)
+    elif args.command == "dict":
+        if args.dict_command == "reorder":
+            return dict_reorder(args.dictionary, args.frequencies, args.output)
+        elif args.dict_command == "merge":
+            return dict_merge(args.a, args.b, args.output, args.priority, args.language, args.comment)
+        elif args.dict_command == "diff":
+            return dict_diff(args.a, args.b)
+        elif args.dict_command == "stats":
+            return dict_stats(args.dictionary, args.top, args.output)
+        elif args.dict_command == "check":
+            return dict_check(args.dictionary)
+        print("No dict subcommand specified. Use 'py9 dict -h' for help.")
+        return 1
+    elif args.command == "corpus":
+        # Handle corpus subcommands
+        if hasattr(args, "func"):
+            return args.func(args)
+        else:
+            print("No corpus subcommand specified. Use 'py9 corpus -h' for help.")
+            return 1
+
+    return 0
+
+
 def main():
     """
     Main CLI entry point.
@@ -48,6 +328,7 @@ def main():
 
     parser.add_argument("--version", action="version", version=f"%(prog)s {version('t9')}")
     parser.add_argument("--locale", help="Locale to use (e.g., en-GB, en-US)")
+    parser.add_argument("--profile", metavar="PATH", help="Profile the command, writing PATH.pstats and PATH.txt")
 
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
 
@@ -57,11 +338,88 @@ def main():
     gen_parser.add_argument("-o", "--output", required=True, help="Output dictionary file path")
     gen_parser.add_argument("-l", "--language", default="Unknown", help="Language name for dictionary metadata")
     gen_parser.add_argument("-c", "--comment", default="", help="Comment for dictionary metadata")
+    gen_parser.add_argument("--layout", choices=maket9.LAYOUTS, default="hot", help="Node layout (default: hot)")
+    gen_parser.add_argument("--pool", action="store_true", help="Store words in a front-coded string pool")
+    gen_parser.add_argument("--compress", choices=["zlib", "lzma"], help="Compress into a read-only dictionary")
 
     # Demo command
     demo_parser = subparsers.add_parser("demo", help="Run T9 demo application")
     demo_parser.add_argument("dictionary", nargs="?", help="Path to dictionary file (optional)")
 
+    # Bench command
+    bench_parser = subparsers.add_parser("bench", help="Benchmark dictionary build, lookup and input speed")
+    bench_parser.add_argument("wordlist", nargs="?", help="Wordlist to benchmark (default: wordlist for locale)")
+    bench_parser.add_argument("-n", "--lookups", type=int, default=10000, help="Number of lookups to time")
+    bench_parser.add_argument("-i", "--inserts", type=int, default=1000, help="Number of words to add")
+    bench_parser.add_argument("--corpus", help="Text file to type through the input parser")
+    bench_parser.add_argument("--seed", type=int, default=9, help="Random seed for sampled workloads")
+    bench_parser.add_argument("-o", "--output", help="Also write JSON results to this file")
+    bench_parser.add_argument("--layout", choices=maket9.LAYOUTS, default="hot", help="Node layout (default: hot)")
+
+    # KSPC command
+    kspc_parser = subparsers.add_parser("kspc", help="Measure keystrokes per character of typing a text corpus")
+    kspc_parser.add_argument("corpus", help="Text file to type")
+    kspc_parser.add_argument("-d", "--dictionary", help="Path to dictionary file (default: dictionary for locale)")
+    kspc_parser.add_argument("-o", "--output", help="Also write JSON results to this file")
+
+    # Lookup command
+    lookup_parser = subparsers.add_parser("lookup", help="Look up digit sequences from stdin")
+    lookup_parser.add_argument("-d", "--dictionary", help="Path to dictionary file (default: dictionary for locale)")
+    lookup_parser.add_argument("-f", "--format", choices=["tsv", "jsonl"], default="tsv", help="Output format")
+    lookup_parser.add_argument("-k", "--top", type=int, default=0, help="Only output the top K words (0 = all)")
+    lookup_parser.add_argument(
+        "-m", "--match", action="store_true", help="Include match type: exact, lookahead, lookbehind or none"
+    )
+    lookup_parser.add_argument(
+        "-w", "--workers", type=int, default=1, help="Worker processes for large inputs (default: 1, no pool)"
+    )
+
+    # Replay command
+    replay_parser = subparsers.add_parser("replay", help="Replay recorded keypress sessions")
+    replay_parser.add_argument("log", nargs="?", help="JSON lines session log (default: stdin)")
+    replay_parser.add_argument("-d", "--dictionary", help="Path to dictionary file (default: dictionary for locale)")
+    replay_parser.add_argument("-o", "--output", help="Write results to this file instead of stdout")
+    replay_parser.add_argument("-w", "--workers", type=int, default=1, help="Worker processes (default: 1, no pool)")
+    replay_parser.add_argument("--keydelay", type=float, default=0.5, help="Multi-tap key timeout in seconds")
+
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Serve input sessions over a socket")
+    serve_parser.add_argument("-d", "--dictionary", help="Path to dictionary file (default: dictionary for locale)")
+    serve_parser.add_argument("-s", "--socket", help="Unix socket path to listen on instead of TCP")
+    serve_parser.add_argument("--host", default="127.0.0.1", help="TCP host to listen on (default: 127.0.0.1)")
+    serve_parser.add_argument("-p", "--port", type=int, default=9009, help="TCP port to listen on (default: 9009)")
+    serve_parser.add_argument("-w", "--workers", type=int, default=4, help="Threads for dictionary I/O")
+    serve_parser.add_argument(
+        "--diffs", action="store_true", help="Reply with display changes instead of the whole display"
+    )
+
+    # Dict commands
+    dict_parser = subparsers.add_parser("dict", help="Tools for compiled dictionary files")
+    dict_subparsers = dict_parser.add_subparsers(dest="dict_command", help="Dict commands")
+    reorder_parser = dict_subparsers.add_parser("reorder", help="Reorder words by a frequency table, without a rebuild")
+    reorder_parser.add_argument("dictionary", help="Path to dictionary file")
+    reorder_parser.add_argument("frequencies", help="Lines of 'word count', or words most frequent first")
+    reorder_parser.add_argument("-o", "--output", help="Write the result here instead of replacing the dictionary")
+
+    merge_parser = dict_subparsers.add_parser("merge", help="Merge two dictionaries into a new one")
+    merge_parser.add_argument("a", help="Path to first dictionary file")
+    merge_parser.add_argument("b", help="Path to second dictionary file")
+    merge_parser.add_argument("-o", "--output", required=True, help="Output dictionary file path")
+    merge_parser.add_argument(
+        "--priority", choices=PRIORITIES, default="a", help="Whose words come first where both have some (default: a)"
+    )
+    merge_parser.add_argument("-l", "--language", help="Language name for the result (default: the first's)")
+    merge_parser.add_argument("-c", "--comment", help="Comment for the result (default: the first's)")
+    diff_parser = dict_subparsers.add_parser("diff", help="List words added and removed between two dictionaries")
+    diff_parser.add_argument("a", help="Path to old dictionary file")
+    diff_parser.add_argument("b", help="Path to new dictionary file")
+    stats_parser = dict_subparsers.add_parser("stats", help="Measure the shape of a dictionary")
+    stats_parser.add_argument("dictionary", help="Path to dictionary file")
+    stats_parser.add_argument("-k", "--top", type=int, default=10, help="Number of nodes with the most words to list")
+    stats_parser.add_argument("-o", "--output", help="Also write JSON results to this file")
+    check_parser = dict_subparsers.add_parser("check", help="Check the structure of a dictionary")
+    check_parser.add_argument("dictionary", help="Path to dictionary file")
+
     # Corpus commands
     add_corpus_commands(subparsers)
 
@@ -75,24 +433,9 @@ def main():
         else:
             language = args.locale
 
-    # If no command specified, run demo by default
-    if args.command is None:
-        print("No command specified, running demo...")
-        return run_demo(None, language, region)
-
-    if args.command in ("generate", "gen"):
-        return generate_dict(args.wordlist, args.output, args.language, args.comment)
-    elif args.command == "demo":
-        return run_demo(args.dictionary, language, region)
-    elif args.command == "corpus":
-        # Handle corpus subcommands
-        if hasattr(args, "func"):
-            return args.func(args)
-        else:
-            print("No corpus subcommand specified. Use 'py9 corpus -h' for help.")
-            return 1
-
-    return 0
+    if args.profile:
+        return run_profiled(lambda: dispatch(args, language, region), args.profile)
+    return dispatch(args, language, region)
 
 
 if __name__ == "__main__":
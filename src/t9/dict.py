@@ -1,56 +1,284 @@
 """Dictionary class for PY9 T9 text input system."""
 
-import struct
+import io
 import os
+import mmap
 import logging
-
-from .key import T9Key, SaveState
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from .blocks import BlockReader
+from .header import COUNTS_POS, FLAG_BLOCKS, FLAG_POOL, GENERATION, read_header
+from .key import MAX_WORDS, T9Key
+from .pool import StringPool
 from .utils import getkey
 
+try:
+    import fcntl
+except ImportError:  # no flock on Windows, so writes are only coordinated within a process
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
+# seconds between checks that the file hasn't been replaced by a new one
+REPLACED_INTERVAL = 1.0
+
+
+def _lock(f, exclusive=False):
+    """Take a shared or exclusive lock on an open dictionary file."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+
+
+def _unlock(f):
+    """Release a lock taken with _lock()."""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _replaced(f, path):
+    """Check if path is no longer the open file f, because a new file was moved there."""
+    st = os.fstat(f.fileno())
+    try:
+        current = os.stat(path)
+    except FileNotFoundError:
+        return False
+    return (st.st_dev, st.st_ino) != (current.st_dev, current.st_ino)
+
+
+class _Mapping:
+    """A read-only map of one dictionary file, and the nodes decoded from it."""
+
+    def __init__(self, path):
+        self.f = open(path, "rb")
+        st = os.fstat(self.f.fileno())
+        self.inode = (st.st_dev, st.st_ino)
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.cache = OrderedDict()  # file position -> decoded T9Key
+        self.pool = None  # StringPool, for files that have one
+        self.blocks = None  # BlockReader, for compressed files
+        self.header = None  # the last Header read from the file
+        self.wide = False  # 64-bit positions and 32-bit word counts
+        self._readers = 0  # lookups using the mapping now
+        self._retired = False  # no longer the current mapping, so close it once unused
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Keep the mapping open until release().
+
+        Returns:
+            False if it's already closed
+        """
+        with self._lock:
+            if self._closed:
+                return False
+            self._readers += 1
+            return True
+
+    def release(self):
+        """Stop using the mapping, closing it if it was retired meanwhile."""
+        with self._lock:
+            self._readers -= 1
+            if not (self._retired and self._readers == 0):
+                return
+        self.close()
+
+    def retire(self):
+        """Close the mapping once nobody is using it, since a newer one replaces it."""
+        with self._lock:
+            self._retired = True
+            if self._readers:
+                return
+        self.close()
+
+    def remap(self):
+        """Map the file again after it has grown.
+
+        The old map is left for any reader still using it.
+        """
+        self.mm = mmap.mmap(self.f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.mm
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self.cache.clear()
+        self.mm.close()
+        self.f.close()
+
+
+class _Version:
+    """A published state of the dictionary: its root and the mapping it's in."""
+
+    __slots__ = ("mapping", "rootpos", "wordcount", "generation", "genpos")
+
+    def __init__(self, mapping, rootpos, wordcount, generation, genpos):
+        self.mapping = mapping
+        self.rootpos = rootpos
+        self.wordcount = wordcount
+        self.generation = generation  # the 8 bytes at genpos when this version was read
+        self.genpos = genpos
+
 
 class T9Dict:
-    """T9 dictionary for word lookups and modifications."""
+    """T9 dictionary for word lookups and modifications.
+
+    One T9Dict can be shared between threads. Lookups run concurrently
+    against a snapshot of the root, while addword() calls are serialized
+    and publish a new root only after everything it points to is written.
 
-    def __init__(self, dict_file):
+    Several processes can share a file too. Writers hold an exclusive
+    flock() and bump the header's generation last. Readers compare the
+    generation before a lookup and re-read the header when it has changed,
+    and notice a file replaced by a rebuild (as makedict does) within
+    REPLACED_INTERVAL seconds. Nodes are never rewritten in place.
+    """
+
+    def __init__(self, dict_file, stats=None, cache_size=0, revalidate=0.0):
         """Create a T9 dictionary class and load file header info.
 
         dict_file: path to dictionary file
+        stats: optional T9Stats to count the cost of each call
+        cache_size: number of decoded nodes to keep in memory (0 = none)
+        revalidate: seconds between checks for writes by other processes
+            (0 = before every lookup, None = never)
 
-        File format:
-        - word count (4 bytes)
-        - root node pos (4 bytes)
-        - language string (variable)
-        - comment string (variable)
+        See header.py for the file format.
         """
         self.file = dict_file
-        f = open(dict_file, "rb")
-        f.seek(8)
-        self.wordcount, self.rootpos = struct.unpack("!LL", f.read(8))
-        self.language = f.readline().decode("utf-8").rstrip("\n\r")
-        self.comment = f.readline().decode("utf-8").rstrip("\n\r")
-        f.close()
-
-    def getwords(self, digits):
+        self.stats = stats
+        self.cache_size = cache_size
+        self.revalidate = revalidate
+        self._write_lock = threading.Lock()  # serializes addword()
+        self._closed = False  # close() was called, so lookups and writes fail
+        self._checked = self._statted = time.monotonic()
+        self._load(_Mapping(dict_file))
+
+    @property
+    def wordcount(self):
+        """Number of words in the current version."""
+        return self._version.wordcount
+
+    @property
+    def rootpos(self):
+        """Root node position in the current version."""
+        return self._version.rootpos
+
+    @property
+    def compressed(self):
+        """The file is block-compressed, so it is read-only."""
+        return self._version.mapping.blocks is not None
+
+    @property
+    def wide(self):
+        """The file has 64-bit positions and 32-bit word counts."""
+        return self._version.mapping.wide
+
+    def _load(self, mapping, lock=True):
+        """Read the header from mapping and publish it as the current version.
+
+        lock: take a shared lock, so a writer in another process isn't half done
+        """
+        if lock:
+            _lock(mapping.f)
+        try:
+            header = read_header(mapping.mm)
+            generation = mapping.mm[header.genpos : header.genpos + 8]
+        finally:
+            if lock:
+                _unlock(mapping.f)
+        mapping.header = header
+        mapping.wide = header.wide
+        if header.flags & FLAG_POOL and mapping.pool is None:
+            mapping.pool = StringPool(mapping.mm, header.size)
+        if header.flags & FLAG_BLOCKS and mapping.blocks is None:
+            start = mapping.pool.end if mapping.pool is not None else header.size
+            mapping.blocks = BlockReader(mapping.mm, start)
+        self.language = header.language
+        self.comment = header.comment
+        old = getattr(self, "_version", None)
+        self._version = _Version(mapping, header.rootpos, header.wordcount, generation, header.genpos)
+        if old is not None and old.mapping is not mapping:
+            old.mapping.retire()
+        return self._version
+
+    def reload(self):
+        """Re-read the dictionary file, picking up changes by other processes."""
+        return self._load(_Mapping(self.file))
+
+    def current(self):
+        """Get the current version, first catching up with other writers if it's time to check.
+
+        Every change publishes a new version, so anything worked out from a
+        version still holds while current() returns it.
+
+        Raises ValueError once the dictionary is closed.
+        """
+        if self._closed:
+            raise ValueError(f"Dictionary '{self.file}' is closed")
+        version = self._version
+        if self.revalidate is None:
+            return version
+        now = time.monotonic()
+        if self.revalidate and now - self._checked < self.revalidate:
+            return version
+        self._checked = now
+
+        mapping = version.mapping
+        if mapping.mm[version.genpos : version.genpos + 8] != version.generation:
+            return self._load(mapping)
+        if now - self._statted >= REPLACED_INTERVAL:
+            self._statted = now
+            try:
+                st = os.stat(self.file)
+            except FileNotFoundError:
+                return version
+            if (st.st_dev, st.st_ino) != mapping.inode:
+                return self.reload()
+        return version
+
+    def _acquire(self):
+        """Get the current version, keeping its mapping open until version.mapping.release()."""
+        while True:
+            version = self.current()
+            if version.mapping.acquire():
+                return version
+            # replaced and closed since current(), so the new version is published
+
+    def getwords(self, digits, op="getwords"):
         """Get possible words for a T9 digit sequence.
 
+        op: name to count the lookup under in stats
+
         Returns:
         - If len(result[0]) == len(digits): exact match found
         - If len(result[0]) > len(digits): lookahead used
         - If len(result[0]) < len(digits): lookbehind used
         """
-        f = open(self.file, "rb")
-        k = T9Key()
+        if self.stats is not None:
+            return self.stats.measure(op, self._getwords, digits)
+        return self._getwords(digits)
+
+    def _getwords(self, digits, call=None):
+        version = self._acquire()
+        try:
+            return self._walk(version, digits, call)
+        finally:
+            version.mapping.release()
+
+    def _walk(self, version, digits, call=None):
+        mapping = version.mapping
         oldlist = []
-        p = self.rootpos
-        logger.debug("root position: %s", p)
+        p = version.rootpos
 
         # process each digit
         for c in digits:
-            f.seek(p)
-            k.__init__()
-            k.loadnode(f)
+            k = self._node(mapping, p, call)
 
             if k.refs[int(c) - 1] is not None:
                 # the next node is available
@@ -60,19 +288,66 @@ class T9Dict:
                     oldlist = [k.words[0]]
             else:
                 # didn't find the word - return short word
-                f.close()
-                del k
                 return oldlist
 
-        # reset node, load node
-        k.__init__()
-        f.seek(p)
-        k.loadnode(f)
+        return self._lastwords(mapping, p, digits, oldlist, call)
+
+    def getmany(self, sequences):
+        """Get possible words for many digit sequences, the same as getwords() gives for each.
+
+        Each sequence reuses the walk down the prefix it shares with the one
+        before, so sorted sequences are fastest.
+
+        Returns:
+            a list of results, in the same order as sequences
+        """
+        if self.stats is not None:
+            return self.stats.measure("getmany", self._getmany, sequences)
+        return self._getmany(sequences)
+
+    def _getmany(self, sequences, call=None):
+        version = self._acquire()
+        try:
+            return self._walkmany(version, sequences, call)
+        finally:
+            version.mapping.release()
+
+    def _walkmany(self, version, sequences, call=None):
+        mapping = version.mapping
+        results = []
+        # (position, top word so far) of the nodes reached by each digit of the last sequence
+        path = [(version.rootpos, [])]
+        last = ""
+        for digits in sequences:
+            same = 0
+            limit = min(len(last), len(digits), len(path) - 1)
+            while same < limit and last[same] == digits[same]:
+                same += 1
+            del path[same + 1 :]
+            last = digits
+
+            p, oldlist = path[-1]
+            for c in digits[same:]:
+                k = self._node(mapping, p, call)
+                ref = k.refs[int(c) - 1]
+                if ref is None:
+                    break
+                if len(k.words) > 0:
+                    oldlist = [k.words[0]]
+                p = ref
+                path.append((p, oldlist))
+            else:
+                results.append(self._lastwords(mapping, p, digits, oldlist, call))
+                continue
+            results.append(list(oldlist))
+        return results
+
+    def _lastwords(self, mapping, p, digits, oldlist, call=None):
+        """Get the words of the node at p, which digits lead to, looking ahead if it has none."""
+        k = self._node(mapping, p, call)
         if len(k.words) == 0:
             # couldn't find word
             if digits[-1] == "1":
-                f.close()
-                del k
                 return oldlist
             else:
                 while len(k.words) == 0:
@@ -83,125 +358,197 @@ class T9Dict:
                             break
                     # Note: p should never be 0 with properly constructed dictionaries
                     # as makedict ensures all paths terminate in words
-                    f.seek(p)
-                    k.__init__()
-                    k.loadnode(f)
+                    k = self._node(mapping, p, call)
 
-            f.close()
-            return k.words
-        else:
-            return k.words
+        # copy, so callers can't change cached nodes
+        return list(k.words)
 
-    def addword(self, word):
-        """Add a word to the dictionary.
-        Raises KeyError if word already exists.
+    def _node(self, mapping, pos, call=None):
+        """Get the node at pos for reading, from the cache if it's there.
+
+        The node is shared with the cache, so it must not be modified.
         """
-        logger.debug("root position: %s", self.rootpos)
-        key = getkey(word)
+        cache = mapping.cache
+        k = cache.get(pos)
+        if k is not None:
+            if call is not None:
+                call.cache_hits += 1
+            return k
+
+        if mapping.blocks is not None:
+            buf, start = mapping.blocks.block(pos)
+        else:
+            buf = mapping.mm
+            start = 0
+            if pos >= len(buf):
+                # the file has grown since it was mapped
+                buf = mapping.remap()
+                if call is not None:
+                    call.opens += 1
+        k = T9Key()
+        end = k.loadbuffer(buf, pos - start, mapping.pool, mapping.wide)
+        k.fpos = pos
+        if call is not None:
+            call.nodes += 1
+            call.bytes_read += end - (pos - start)
+
+        if self.cache_size:
+            if len(cache) >= self.cache_size:
+                # drop the oldest entry, unless another thread just did
+                try:
+                    cache.popitem(last=False)
+                except KeyError:
+                    pass
+            cache[pos] = k
+        return k
+
+    @contextmanager
+    def snapshot(self):
+        """Hold the current version open, to walk its nodes with node().
+
+        Its file stays mapped until the block ends, even if a reload or
+        close() replaces it meanwhile.
+        """
+        version = self._acquire()
+        try:
+            yield version
+        finally:
+            version.mapping.release()
 
-        f = open(self.file, "rb")
+    def node(self, version, pos):
+        """Get the node at pos in a version from snapshot(), starting at version.rootpos.
 
-        nodes = []
-        nodes.append(T9Key())
-        f.seek(self.rootpos)
-        nodes[0].loadnode(f)
-        p = 0
+        The node may be shared with the cache, so it must not be modified.
+        """
+        return self._node(version.mapping, pos)
 
-        # process each digit
-        for c in key:
-            logger.debug("processing node %s", nodes[p].last)
-
-            # is it referenced?
-            if nodes[p].refs[int(c) - 1] is not None:
-                # load it
-                nodes.append(T9Key())
-                f.seek(nodes[p].refs[int(c) - 1])
-                p += 1
-                nodes[p].loadnode(f)
-            else:
-                # create it
-                p += 1
-                nodes.append(T9Key())
-                # node needs a save
-                nodes[p].needsave = SaveState.NEW
-
-            logger.debug("last node ref: %s", nodes[p - 1].refs[int(key[p - 1]) - 1])
-
-            if nodes[p - 1].refs[int(key[p - 1]) - 1] is None:
-                logger.debug("last node was new")
-                # previous node is also new
-                nodes[p - 1].needsave = SaveState.NEW
-                if p - 2 >= 0:
-                    if nodes[p - 2].refs[int(key[p - 2]) - 1] is None:
-                        logger.debug("nested new node")
-                        nodes[p - 2].needsave = SaveState.NEW
-                    else:
-                        nodes[p - 2].needsave = SaveState.UPDATE
-            else:
-                # previous node is old - update
-                if nodes[p - 1].needsave != SaveState.NEW:
-                    nodes[p - 1].needsave = SaveState.UPDATE
-
-        f.close()
-
-        # let's not add exact duplicates (but allow case variants)
-        for q in nodes[p].words:
-            if q == word:
-                del nodes
-                raise KeyError("Word '" + word + "' is already in dictionary '" + self.file + "' at position " + key)
-
-        # sort out the last ones
-        for n in range(1, len(nodes)):
-            nodes[n].last = int(key[n - 1]) - 1
-
-        # add the word to the list
-        nodes[p].words.append(word)
-        nodes[p].needsave = SaveState.NEW
-        if nodes[p - 1].fpos != 0:
-            nodes[p].last = int(c) - 1
-
-        # now work from the last digit back saving each one
-        for n in range(len(nodes) - 1, -1, -1):
-            if nodes[n].needsave == SaveState.NEW:
-                logger.debug("node %s needs save", n)
-
-                # are we moving the root node?
-                movert = self.rootpos == nodes[n].fpos
-
-                f = open(self.file, "r+b")
-
-                f.seek(os.stat(self.file)[6])
-                logger.debug("processing node %s of %s", n, len(nodes))
-                if n < len(nodes) - 1:
-                    logger.debug("next node %s at position %s", nodes[n + 1].last, nodes[n + 1].fpos)
-                    if nodes[n + 1].last != -1:
-                        logger.debug("new file position for node %s: %s", n, nodes[n + 1].fpos)
-                        nodes[n].refs[nodes[n + 1].last] = nodes[n + 1].fpos
-                nodes[n].savenode(f)
-                logger.debug("saved node %s at position %s", n, nodes[n].fpos)
-                f.close()
-                if movert:
-                    self.rootpos = nodes[n].fpos
+    def _copynode(self, mapping, pos, call=None):
+        """Get a private copy of the node at pos, which can be changed."""
+        return self._node(mapping, pos, call).copy()
 
-            elif nodes[n].needsave == SaveState.UPDATE:
-                logger.debug("node %s needs update at position %s", n, nodes[n].fpos)
-                f = open(self.file, "r+b")
+    def close(self):
+        """Release the memory map and any cached nodes, once lookups using them are done.
 
-                logger.debug("updating node %s with position %s", n, nodes[n + 1].fpos)
-                nodes[n].refs[nodes[n + 1].last] = nodes[n + 1].fpos
+        Lookups and writes after this raise ValueError.
+        """
+        self._closed = True
+        self._version.mapping.retire()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _open(self, mode, call):
+        """Open the dictionary file, counting its use if call is given."""
+        if call is None:
+            return open(self.file, mode)
+        return self.stats.open(self.file, mode, call)
+
+    def _sync(self, f):
+        """Catch up with other writers, while holding the write lock on f."""
+        version = self._version
+        st = os.fstat(f.fileno())
+        if (st.st_dev, st.st_ino) != version.mapping.inode:
+            return self._load(_Mapping(self.file), lock=False)
+        if version.mapping.mm[version.genpos : version.genpos + 8] != version.generation:
+            return self._load(version.mapping, lock=False)
+        return version
 
-                f.seek(nodes[n].fpos)
-                nodes[n].savenode(f)
+    def addword(self, word):
+        """Add a word to the dictionary.
+        Raises KeyError if word already exists, ValueError if its node is full
+        or the dictionary is closed, or io.UnsupportedOperation if the
+        dictionary is compressed.
+        """
+        if self.stats is not None:
+            return self.stats.measure("addword", self._addword, word)
+        return self._addword(word)
+
+    def _addword(self, word, call=None):
+        key = getkey(word)
+        if self._closed:
+            raise ValueError(f"Dictionary '{self.file}' is closed")
+        if self._version.mapping.blocks is not None:
+            raise io.UnsupportedOperation(f"Dictionary '{self.file}' is compressed, so it is read-only")
+
+        with self._write_lock:
+            f = self._open("r+b", call)
+            try:
+                _lock(f, exclusive=True)
+                while _replaced(f, self.file):
+                    # moved aside while we waited for the lock, so write to the new file
+                    f.close()
+                    f = self._open("r+b", call)
+                    _lock(f, exclusive=True)
+                version = self._sync(f)
+                while not version.mapping.acquire():
+                    # closed by a reload in another thread since, so catch up again
+                    version = self._sync(f)
+                mapping = version.mapping
+                logger.debug("root position: %s", version.rootpos)
+                try:
+                    # copy the path down from the root, creating any missing nodes.
+                    # nodes are never changed in place, so readers holding the old
+                    # root keep seeing a consistent dictionary.
+                    nodes = [self._copynode(mapping, version.rootpos, call)]
+                    for c in key:
+                        ref = nodes[-1].refs[int(c) - 1]
+                        if ref is not None:
+                            nodes.append(self._copynode(mapping, ref, call))
+                        else:
+                            nodes.append(T9Key())
+
+                    # let's not add exact duplicates (but allow case variants)
+                    if word in nodes[-1].words:
+                        raise KeyError(
+                            "Word '" + word + "' is already in dictionary '" + self.file + "' at position " + key
+                        )
+
+                    # the count is 16 bits unless the file is wide
+                    if not mapping.wide and len(nodes[-1].words) >= MAX_WORDS:
+                        raise ValueError(
+                            f"Dictionary '{self.file}' already has {MAX_WORDS} words at position {key}, "
+                            "the most a node can hold unless the dictionary is wide"
+                        )
+
+                    # add the word to the list
+                    nodes[-1].words.append(word)
+
+                    # now work from the last digit back, appending each copy so its
+                    # parent can point at the new position
+                    f.seek(0, os.SEEK_END)
+                    for n in range(len(nodes) - 1, -1, -1):
+                        if n < len(nodes) - 1:
+                            nodes[n].refs[int(key[n]) - 1] = nodes[n + 1].fpos
+                        nodes[n].savenode(f, mapping.pool is not None, mapping.wide)
+                    f.flush()
+
+                    # publish the new root once everything it points to is written,
+                    # and bump the generation last so other processes reload
+                    rootpos = nodes[0].fpos
+                    wordcount = version.wordcount + 1
+                    header = mapping.header
+                    f.seek(header.countpos)
+                    f.write(header.pack_counts(wordcount, rootpos))
+                    if version.genpos == COUNTS_POS:
+                        # older files have no generation, so readers watch the counts
+                        generation = header.pack_counts(wordcount, rootpos)
+                    else:
+                        (n,) = GENERATION.unpack(version.generation)
+                        generation = GENERATION.pack((n + 1) % (1 << 64))
+                        f.seek(version.genpos)
+                        f.write(generation)
+                    f.flush()
+                    # unless a reload in another thread has already moved on to a new mapping
+                    if self._version.mapping is mapping:
+                        self._version = _Version(mapping, rootpos, wordcount, generation, version.genpos)
+                    logger.debug("root position: %s", rootpos)
+                finally:
+                    mapping.release()
+            finally:
                 f.close()
-            # else: node doesn't need saving
-
-        self.wordcount += 1
-        f = open(self.file, "r+b")
-        f.seek(8)
-        f.write(struct.pack("!LL", self.wordcount, self.rootpos))
-        f.close()
-        logger.debug("root position: %s", self.rootpos)
-        del nodes
 
     def delword(self, word):
         """
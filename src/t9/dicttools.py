@@ -0,0 +1,567 @@
+"""Tools that work on compiled dictionary files for PY9 T9 text input system.
+
+They read a dictionary's nodes in file order, one sequential pass over the
+file, or walk the tries of two dictionaries side by side, rather than
+building them again from a wordlist.
+"""
+
+import bisect
+import heapq
+import io
+import mmap
+import os
+import struct
+import time
+from array import array
+from collections import Counter
+from itertools import compress, repeat, zip_longest
+
+from .blocks import CODECS, HEAD, BlockReader
+from .dict import T9Dict, _lock, _unlock
+from .header import FLAG_BLOCKS, FLAG_POOL, FLAG_WIDE, GENERATION, Header, new_generation, read_header, write_header
+from .key import FLAGS, REF, WIDE_COUNT, WIDE_REF, T9Key, skipnode
+from .pool import StringPool, decode_varint
+from .utils import getkey, read_wordlist
+
+# how merge() orders the words of a key sequence found in both dictionaries:
+#   a           the first dictionary's words, then any new ones from the second
+#   b           the second dictionary's words, then any new ones from the first
+#   interleave  one word from each in turn, starting with the first
+PRIORITIES = ("a", "b", "interleave")
+
+# problems listed by inspect(), beyond which they are only counted
+MAX_PROBLEMS = 100
+
+
+def node_start(buf, header):
+    """Get the string pool of a mapped dictionary, if it has one, and where its nodes start.
+
+    Raises io.UnsupportedOperation for compressed dictionaries, whose nodes
+    can't be read in place.
+    """
+    if header.flags & FLAG_BLOCKS:
+        raise io.UnsupportedOperation("Dictionary is compressed, so its nodes can't be read in place")
+    pool = StringPool(buf, header.size) if header.flags & FLAG_POOL else None
+    return pool, pool.end if pool is not None else header.size
+
+
+def scan_nodes(buf, start, pool=None, wide=False):
+    """Read every node from start to the end of buf, in file order.
+
+    Nodes are stored one after another, including any left behind by
+    addword(), so this finds them all without following a single ref.
+
+    Yields:
+        (position, end position, T9Key)
+    """
+    pos = start
+    end = len(buf)
+    while pos < end:
+        k = T9Key()
+        after = k.loadbuffer(buf, pos, pool, wide)
+        yield pos, after, k
+        pos = after
+
+
+def read_frequencies(filename):
+    """Read a frequency table from a file.
+
+    Lines of "word count" (separated by a tab or space) give counts. Lines of
+    just a word are a frequency ordered wordlist, like the ones makedict
+    reads, and earlier words count as more frequent.
+
+    Returns:
+        {word: count}
+    """
+    lines = list(read_wordlist(filename))
+    counts = {}
+    for i, line in enumerate(lines):
+        word, _, count = line.rpartition("\t") if "\t" in line else line.rpartition(" ")
+        if word and count.isdigit():
+            counts[word] = int(count)
+        else:
+            counts.setdefault(line, len(lines) - i)
+    return counts
+
+
+def reorder(dict_file, frequencies, output=None):
+    """Put the words of every node in order of frequency, most frequent first.
+
+    The nodes keep their size and position, so only their word lists are
+    rewritten, and a new file is written then moved into place as makedict
+    does. Words with the same frequency, or none, keep their order.
+
+    dict_file: dictionary to reorder
+    frequencies: {word: count}, such as CorpusProcessor.count_word_frequencies()
+        gives. Words not found are also looked up in lower case.
+    output: where to write the result (default: replace dict_file)
+
+    Raises io.UnsupportedOperation for compressed dictionaries.
+
+    Returns:
+        dict of nodes read, nodes reordered, nodes skipped because a word
+        doesn't encode as it was read, and seconds taken
+    """
+    start_time = time.perf_counter()
+    output = str(output or dict_file)
+    get = frequencies.get
+
+    def score(word):
+        count = get(word)
+        if count is None:
+            count = get(word.lower(), 0)
+        return -count
+
+    nodes = changed = skipped = 0
+    with open(dict_file, "rb") as src:
+        # hold off writers until the new file is in place
+        _lock(src, exclusive=True)
+        try:
+            buf = mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                header = read_header(buf)
+                pool, start = node_start(buf, header)
+                tmp = f"{output}.{os.getpid()}.tmp"
+                try:
+                    with open(tmp, "wb") as f:
+                        pooled = pool is not None
+                        wide = header.wide
+                        copied = 0  # everything before this is written
+                        pos = start
+                        size = len(buf)
+                        while pos < size:
+                            end, wc = skipnode(buf, pos, pooled, wide)
+                            nodes += 1
+                            if wc > 1:
+                                k = T9Key()
+                                k.loadbuffer(buf, pos, pool, wide)
+                                words = sorted(k.words, key=score)
+                                if words != k.words:
+                                    k.words = words
+                                    data = k.tobytes(k.refs, k.ids if pooled else None, wide)
+                                    # leave be any node with a word that doesn't encode as it was read
+                                    if len(data) == end - pos:
+                                        f.write(buf[copied:pos])
+                                        f.write(data)
+                                        copied = end
+                                        changed += 1
+                                    else:
+                                        skipped += 1
+                            pos = end
+                        f.write(buf[copied:])
+                        if header.extended:
+                            # a new generation, as for a rebuilt file
+                            f.seek(header.genpos)
+                            f.write(GENERATION.pack(new_generation()))
+                    os.replace(tmp, output)
+                except BaseException:
+                    if os.path.exists(tmp):
+                        os.remove(tmp)
+                    raise
+            finally:
+                buf.close()
+        finally:
+            _unlock(src)
+
+    return {
+        "nodes": nodes,
+        "reordered": changed,
+        "skipped": skipped,
+        "seconds": round(time.perf_counter() - start_time, 6),
+    }
+
+
+def _open(dict_file):
+    """Open a dictionary to walk, at the version it has now."""
+    return T9Dict(str(dict_file), revalidate=None)
+
+
+def walk_pair(a, b, children_first=False):
+    """Walk the tries of two dictionaries together, one node of each at a time.
+
+    Only the path being walked and the children still to visit are kept, so
+    memory depends on the depth of the tries, not their size.
+
+    a, b: open T9Dicts, each walked at the version it has when the walk starts
+    children_first: yield each node after its children, instead of before
+
+    Yields:
+        (digit sequence, node of a or None, node of b or None)
+    """
+
+    def load(d, version, pos):
+        return None if pos is None else d.node(version, pos)
+
+    with a.snapshot() as va, b.snapshot() as vb:
+        stack = [("", va.rootpos, vb.rootpos, None)]
+        while stack:
+            keys, pa, pb, nodes = stack.pop()
+            if nodes is not None:
+                # back from the children
+                yield (keys,) + nodes
+                continue
+            ka = load(a, va, pa)
+            kb = load(b, vb, pb)
+            if children_first:
+                stack.append((keys, None, None, (ka, kb)))
+            else:
+                yield keys, ka, kb
+            for i in range(8, -1, -1):
+                ra = ka.refs[i] if ka is not None else None
+                rb = kb.refs[i] if kb is not None else None
+                if ra is not None or rb is not None:
+                    stack.append((keys + str(i + 1), ra, rb, None))
+
+
+def merge_words(a, b, priority="a"):
+    """Union two word lists, without repeats, in the order given by priority (see PRIORITIES)."""
+    if priority == "b":
+        a, b = b, a
+    if priority == "interleave":
+        words = [w for pair in zip_longest(a, b) for w in pair if w is not None]
+    else:
+        words = a + b
+    return list(dict.fromkeys(words))
+
+
+def _write_merge(path, a, b, priority, language, comment, wide):
+    """Write the merge of a and b to path, children before parents as the dfs layout does."""
+    nodes = words = 0
+    with open(path, "wb") as f:
+        header = Header(0, 0, language, comment, FLAG_WIDE if wide else 0, new_generation())
+        write_header(f, header)
+        pos = header.size
+        written = {}  # digit sequence -> position, for children whose parent is still to come
+        k = T9Key()
+        for keys, ka, kb in walk_pair(a, b, children_first=True):
+            k.words = merge_words(ka.words if ka is not None else [], kb.words if kb is not None else [], priority)
+            refs = [written.pop(keys + d, None) for d in "123456789"]
+            data = k.tobytes(refs, None, wide)
+            f.write(data)
+            written[keys] = pos
+            pos += len(data)
+            nodes += 1
+            words += len(k.words)
+        f.seek(header.countpos)
+        f.write(header.pack_counts(words, written.pop("")))
+    return nodes, words
+
+
+def merge(a_file, b_file, output, priority="a", language=None, comment=None):
+    """Merge two dictionaries into a new one, in one walk of both.
+
+    Every key sequence of either dictionary gets the words of both. The
+    result has no string pool and isn't compressed, whatever the inputs.
+
+    priority: which words come first where both have some, see PRIORITIES
+    language, comment: header fields for the result (default: a's)
+
+    Returns:
+        dict of nodes and words written, and seconds taken
+    """
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown priority: {priority}")
+    start_time = time.perf_counter()
+    output = str(output)
+    a = _open(a_file)
+    b = _open(b_file)
+    try:
+        language = a.language if language is None else language
+        comment = a.comment if comment is None else comment
+        wide = a.wide or b.wide
+        tmp = f"{output}.{os.getpid()}.tmp"
+        try:
+            try:
+                nodes, words = _write_merge(tmp, a, b, priority, language, comment, wide)
+            except struct.error:
+                if wide:
+                    raise
+                # too big for 32-bit positions or 16-bit word counts
+                wide = True
+                nodes, words = _write_merge(tmp, a, b, priority, language, comment, wide)
+            os.replace(tmp, output)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+    finally:
+        a.close()
+        b.close()
+
+    return {"nodes": nodes, "words": words, "wide": wide, "seconds": round(time.perf_counter() - start_time, 6)}
+
+
+def diff(a_file, b_file):
+    """Find the words added and removed between two dictionaries, in one walk of both.
+
+    Words that only moved within a key sequence's list aren't reported.
+
+    Yields:
+        (digit sequence, words only in b, words only in a), for each digit
+        sequence that differs, in order of digit sequence
+    """
+    a = _open(a_file)
+    b = _open(b_file)
+    try:
+        for keys, ka, kb in walk_pair(a, b):
+            wa = ka.words if ka is not None else []
+            wb = kb.words if kb is not None else []
+            if wa == wb:
+                continue
+            sa = set(wa)
+            sb = set(wb)
+            added = [w for w in wb if w not in sa]
+            removed = [w for w in wa if w not in sb]
+            if added or removed:
+                yield keys, added, removed
+    finally:
+        a.close()
+        b.close()
+
+
+class NodeTable:
+    """What inspect() keeps of every node: a few numbers each, in arrays."""
+
+    def __init__(self):
+        self.pos = array("Q")  # file position, in increasing order
+        self.size = array("L")  # bytes
+        self.words = array("L")  # number of words
+        self.first = array("Q", [0])  # where each node's children start in refs, then the end
+        self.refs = array("Q")  # positions of every node's children, in order
+
+    def __len__(self):
+        return len(self.pos)
+
+
+class _BadNode(Exception):
+    """A node _scan_nodes() can't read past."""
+
+
+def _scan_nodes(buf, pos, end, base, pool_count, wide, table, problem):
+    """Read the nodes in buf[pos:end] into table, without decoding their words.
+
+    base: file position of buf[0], for nodes in a decompressed block
+    pool_count: number of words in the string pool, or None if there isn't one
+
+    Returns:
+        False if a node couldn't be read, so the rest of buf[pos:end] wasn't
+    """
+    ref = WIDE_REF if wide else REF
+    count = WIDE_COUNT if wide else FLAGS
+    # for each flags value: how to read its children's positions, and their size
+    refs_formats = [struct.Struct(f"!{bin(flags).count('1')}{ref.format[-1]}") for flags in range(0x400)]
+    unpack_flags = FLAGS.unpack_from
+    unpack_count = count.unpack_from
+    find = buf.find
+    positions, sizes, words, first, refs = table.pos, table.size, table.words, table.first, table.refs
+    start = pos
+    try:
+        while pos < end:
+            start = pos
+            (flags,) = unpack_flags(buf, pos)
+            if flags & ~0x3FE:
+                raise _BadNode("bad node flags")
+            pos += FLAGS.size
+            if flags:
+                fmt = refs_formats[flags]
+                refs.extend(fmt.unpack_from(buf, pos))
+                pos += fmt.size
+            (wc,) = unpack_count(buf, pos)
+            pos += count.size
+            if wc < 0:
+                raise _BadNode("negative word count")
+            if pool_count is None:
+                for _ in range(wc):
+                    pos = find(b"\n", pos, end) + 1
+                    if not pos:
+                        raise _BadNode("truncated node")
+            else:
+                for _ in range(wc):
+                    tag, pos = decode_varint(buf, pos)
+                    if tag & 1:
+                        pos += tag >> 1
+                    elif tag >> 1 >= pool_count:
+                        problem("word number past the end of the pool", base + start)
+            if pos > end:
+                raise _BadNode("truncated node")
+            positions.append(base + start)
+            sizes.append(pos - start)
+            words.append(wc)
+            first.append(len(refs))
+    except (_BadNode, struct.error, IndexError) as e:
+        problem(str(e) if isinstance(e, _BadNode) else "truncated node", base + start)
+        # drop the children of the node that couldn't be read
+        del refs[first[-1] :]
+        return False
+    return True
+
+
+def _bucket(n):
+    """Label a words-per-node count: exact up to 4, then powers of two, like "5-8"."""
+    if n <= 4:
+        return str(n)
+    high = 1 << (n - 1).bit_length()
+    return f"{high // 2 + 1}-{high}"
+
+
+def inspect(dict_file, top=10):
+    """Check a dictionary's structure and measure its shape.
+
+    Every node is read once, in file order, without decoding its words, then
+    the trie is walked from the root with a stack to find which nodes are
+    reachable. Compressed dictionaries are read a block at a time.
+
+    Problems found:
+        nodes that can't be read, or run past the end of the file
+        child positions past the end of the nodes, or not at a node
+        nodes reachable along more than one path
+        pool word numbers past the end of the pool
+        a root that isn't a node, or a word count that doesn't match the nodes
+
+    top: number of nodes with the most words to list
+
+    Returns:
+        dict of JSON-serialisable results, with problems empty if the
+        dictionary is sound
+    """
+    start_time = time.perf_counter()
+    problems = []
+    problem_count = 0
+
+    def problem(message, pos=None, ref=None):
+        nonlocal problem_count
+        problem_count += 1
+        if len(problems) < MAX_PROBLEMS:
+            entry = {"problem": message}
+            if pos is not None:
+                entry["position"] = pos
+            if ref is not None:
+                entry["ref"] = ref
+            problems.append(entry)
+
+    table = NodeTable()
+    with open(dict_file, "rb") as f:
+        # map a complete state of the file, not one a writer is half way through
+        _lock(f)
+        try:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            header = read_header(buf)
+        finally:
+            _unlock(f)
+        try:
+            size = len(buf)
+            pool = StringPool(buf, header.size) if header.flags & FLAG_POOL else None
+            nodes_start = pool.end if pool is not None else header.size
+            sections = {"header": header.size, "pool": nodes_start - header.size}
+            pool_count = pool.count if pool is not None else None
+            codec = None
+            blocks = None
+            if header.flags & FLAG_BLOCKS:
+                blocks = BlockReader(buf, nodes_start)
+                codec = {v: k for k, v in CODECS.items()}[buf[nodes_start]]
+                sections["block_index"] = HEAD.size + 16 * len(blocks.starts)
+                sections["blocks"] = blocks.offsets[-1] - blocks.offsets[0]
+                nodes_end = blocks.starts[-1]
+                for i in range(len(blocks.starts) - 1):
+                    data, base = blocks.block(blocks.starts[i])
+                    _scan_nodes(data, 0, len(data), base, pool_count, header.wide, table, problem)
+                nodes_start = blocks.starts[0]
+            else:
+                nodes_end = size
+                _scan_nodes(buf, nodes_start, size, 0, pool_count, header.wide, table, problem)
+
+            n = len(table)
+            positions, sizes, words, first, refs = table.pos, table.size, table.words, table.first, table.refs
+
+            # node number of every child, or -1
+            index = dict(zip(positions, range(n)))
+            targets = array("q", map(index.get, refs, repeat(-1)))
+            del index
+            if -1 in targets:
+                for r, j in enumerate(targets):
+                    if j >= 0:
+                        continue
+                    parent = positions[bisect.bisect_right(first, r) - 1]
+                    ref = refs[r]
+                    if ref < nodes_start or ref >= nodes_end:
+                        problem("child position out of range", parent, ref)
+                    else:
+                        problem("child position not at a node", parent, ref)
+
+            reachable = bytearray(n)
+            depths = array("H", bytes(2 * n))
+            root = bisect.bisect_left(positions, header.rootpos)
+            if root < n and positions[root] == header.rootpos:
+                reachable[root] = 1
+                stack = [root]
+                while stack:
+                    i = stack.pop()
+                    depth = depths[i] + 1
+                    for r in range(first[i], first[i + 1]):
+                        j = targets[r]
+                        if j < 0:
+                            continue
+                        if reachable[j]:
+                            problem("node reachable along more than one path", positions[j])
+                            continue
+                        reachable[j] = 1
+                        depths[j] = depth
+                        stack.append(j)
+            else:
+                problem("root position not at a node", None, header.rootpos)
+
+            live = list(compress(range(n), reachable))
+            live_bytes = sum(compress(sizes, reachable))
+            live_words = sum(compress(words, reachable))
+            if live_words != header.wordcount:
+                problem(f"header word count {header.wordcount} but {live_words} words in the nodes")
+            scanned = sum(sizes)
+            sections["nodes"] = live_bytes
+            sections["dead_nodes"] = scanned - live_bytes
+            if blocks is None:
+                sections["unread"] = nodes_end - nodes_start - scanned
+
+            def node_info(i):
+                if blocks is not None:
+                    data, base = blocks.block(positions[i])
+                else:
+                    data, base = buf, 0
+                k = T9Key()
+                k.loadbuffer(data, positions[i] - base, pool, header.wide)
+                return {
+                    "keys": getkey(k.words[0]) if k.words else None,
+                    "position": positions[i],
+                    "words": words[i],
+                    "bytes": sizes[i],
+                }
+
+            worst = [node_info(i) for i in heapq.nlargest(top, live, key=words.__getitem__)] if top else []
+            depth_histogram = Counter(compress(depths, reachable))
+            words_histogram = Counter(compress(words, reachable))
+            words_buckets = Counter()
+            for w in sorted(words_histogram):
+                words_buckets[_bucket(w)] += words_histogram[w]
+        finally:
+            buf.close()
+
+    return {
+        "dictionary": str(dict_file),
+        "language": header.language,
+        "comment": header.comment,
+        "generation": header.generation,
+        "pool": pool is not None,
+        "wide": header.wide,
+        "compressed": codec,
+        "file_bytes": size,
+        "sections": sections,
+        "nodes": len(live),
+        "dead_nodes": n - len(live),
+        "words": live_words,
+        "max_depth": max(depth_histogram) if depth_histogram else 0,
+        "depth": {str(d): depth_histogram[d] for d in sorted(depth_histogram)},
+        "words_per_node": dict(words_buckets),
+        "most_words": worst,
+        "problem_count": problem_count,
+        "problems": problems,
+        "seconds": round(time.perf_counter() - start_time, 6),
+    }
@@ -0,0 +1,131 @@
+"""Dictionary file header for PY9 T9 text input system.
+
+Header:
+    "PY9DICT:"      magic (8 bytes)
+    !L              number of words
+    !L              root node position
+    language\\n
+    comment\\n
+
+  Extension (dictionaries made since generation counters were added):
+    "PY9X"          marker (4 bytes)
+    !H              extension size in bytes, including the marker
+    !H              format flags, FLAG_*
+    !Q              generation, changed by every write to the file
+    !Q !Q           number of words and root node position, in wide files
+                    (the !L fields above are then 0)
+
+Older readers skip the extension, since they only follow the root position,
+but can't read files with any format flags set. A node can't be mistaken
+for the extension: a node's first byte is always 0-3.
+"""
+
+import random
+import struct
+
+MAGIC = b"PY9DICT:"
+COUNTS = struct.Struct("!LL")
+COUNTS_POS = 8
+
+EXT_MARKER = b"PY9X"
+EXT = struct.Struct("!4sHHQ")
+GENERATION = struct.Struct("!Q")
+GENERATION_OFFSET = 8  # from the start of the extension
+
+FLAG_POOL = 0x1  # words are in a string pool right after the header, see pool.py
+FLAG_BLOCKS = 0x2  # nodes are in compressed blocks, see blocks.py
+FLAG_WIDE = 0x4  # 64-bit node positions and 32-bit word counts, see key.py
+SUPPORTED_FLAGS = FLAG_POOL | FLAG_BLOCKS | FLAG_WIDE
+
+WIDE_COUNTS = struct.Struct("!QQ")
+WIDE_COUNTS_OFFSET = 16  # from the start of the extension
+
+
+class Header:
+    """A parsed dictionary file header."""
+
+    def __init__(self, wordcount=0, rootpos=0, language="Unknown", comment="", flags=0, generation=None):
+        self.wordcount = wordcount
+        self.rootpos = rootpos
+        self.language = language
+        self.comment = comment
+        self.flags = flags
+        self.generation = generation  # None if the file has no extension
+        self.genpos = COUNTS_POS  # position of the 8 bytes that change on every write
+        self.countpos = COUNTS_POS  # position of the word count and root position
+        self.size = 0  # header length, where the nodes start
+
+    @property
+    def extended(self):
+        """True if the file has the header extension."""
+        return self.generation is not None
+
+    @property
+    def wide(self):
+        """True if the file has 64-bit positions and 32-bit word counts."""
+        return bool(self.flags & FLAG_WIDE)
+
+    def pack_counts(self, wordcount, rootpos):
+        """Encode the word count and root position, to be written at countpos."""
+        if self.wide:
+            return WIDE_COUNTS.pack(wordcount, rootpos)
+        return COUNTS.pack(wordcount, rootpos)
+
+
+def new_generation():
+    """Pick a starting generation, so a rebuilt file won't match an old one."""
+    return random.getrandbits(63)
+
+
+def read_header(buf):
+    """Parse the header from the start of a buffer, such as an mmap.
+
+    Raises ValueError if the buffer isn't a dictionary, or uses format
+    flags this version doesn't support.
+    """
+    if buf[0:8] != MAGIC:
+        raise ValueError("Not a PY9 dictionary file")
+
+    h = Header()
+    h.wordcount, h.rootpos = COUNTS.unpack_from(buf, COUNTS_POS)
+    pos = COUNTS_POS + COUNTS.size
+    end = buf.find(b"\n", pos)
+    h.language = buf[pos:end].decode("utf-8").rstrip("\r")
+    pos = end + 1
+    end = buf.find(b"\n", pos)
+    h.comment = buf[pos:end].decode("utf-8").rstrip("\r")
+    pos = end + 1
+
+    if buf[pos : pos + 4] == EXT_MARKER:
+        _, size, h.flags, h.generation = EXT.unpack_from(buf, pos)
+        if h.flags & ~SUPPORTED_FLAGS:
+            raise ValueError(f"Unsupported dictionary format flags: {h.flags:#x}")
+        h.genpos = pos + GENERATION_OFFSET
+        if h.wide:
+            h.countpos = pos + WIDE_COUNTS_OFFSET
+            h.wordcount, h.rootpos = WIDE_COUNTS.unpack_from(buf, h.countpos)
+        pos += size
+    h.size = pos
+    return h
+
+
+def write_header(f, header):
+    """Write a header at the current position of f, which should be 0.
+
+    Sets header.genpos, header.countpos and header.size.
+    """
+    if header.wide:
+        f.write(MAGIC + COUNTS.pack(0, 0))
+    else:
+        f.write(MAGIC + COUNTS.pack(header.wordcount, header.rootpos))
+    f.write(header.language.encode("utf-8") + b"\x0a" + header.comment.encode("utf-8") + b"\x0a")
+    if header.extended:
+        pos = f.tell()
+        if header.wide:
+            f.write(EXT.pack(EXT_MARKER, EXT.size + WIDE_COUNTS.size, header.flags, header.generation))
+            f.write(WIDE_COUNTS.pack(header.wordcount, header.rootpos))
+            header.countpos = pos + WIDE_COUNTS_OFFSET
+        else:
+            f.write(EXT.pack(EXT_MARKER, EXT.size, header.flags, header.generation))
+        header.genpos = pos + GENERATION_OFFSET
+    header.size = f.tell()
@@ -1,68 +1,277 @@
 """Input parser class for PY9 T9 text input system."""
 
+import asyncio
+import json
+import os
 import time
 import logging
 
+from .buffer import TextBuffer
 from .constants import ALLKEYS, Key
 from .dict import T9Dict
 from .mode import InputMode
+from .prefetch import Prefetcher
 from .utils import getkey
 
 logger = logging.getLogger(__name__)
 
 
+class DisplayChange:
+    """What changed on the display of a T9Input, from T9Input.diff().
+
+    Replacing display[start:end] of the previous display with text gives
+    the new display.
+    """
+
+    __slots__ = ("start", "end", "text", "cursor", "candidates", "mode")
+
+    def __init__(self, start, end, text, cursor, candidates, mode):
+        self.start = start  # where the change starts, in both displays
+        self.end = end  # where the change ends in the previous display
+        self.text = text  # what replaces display[start:end]
+        self.cursor = cursor  # where the cursor text starts in the new display
+        self.candidates = candidates  # words for the keys being typed, [] when not editing
+        self.mode = mode
+
+    def apply(self, display):
+        """Update a copy of the previous display."""
+        return display[: self.start] + self.text + display[self.end :]
+
+    def todict(self):
+        """Get the change as a dictionary, for JSON."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
 class T9Input:
     """T9 input parser that handles keypresses and text manipulation.
 
     Send keypresses with sendkeys(), retrieve display text with gettext(),
-    get raw text with text().
+    get raw text with text(), or just what changed on the display with diff().
+
+    snapshot() and restore() store an idle input as a few bytes, see
+    sessions.py for keeping many inputs that way.
     """
 
-    def __init__(self, dict_file, defaulttxt="", defaultmode=0, keydelay=0.5, numeric=False):
+    __slots__ = (
+        "dict",
+        "mode",
+        "pos",
+        "keys",
+        "word",
+        "words",
+        "buffer",
+        "lastkeypress",
+        "lastkeytime",
+        "keydelay",
+        "numeric",
+        "stats",
+        "clock",
+        "prefetcher",
+        "_shown",
+    )
+
+    def __init__(
+        self,
+        dict_file,
+        defaulttxt="",
+        defaultmode=0,
+        keydelay=0.5,
+        numeric=False,
+        stats=None,
+        clock=time.perf_counter,
+        prefetch=0,
+    ):
         """Create a new input parser.
 
-        dict_file: dictionary file name
+        dict_file: dictionary file name, or a T9Dict to share with other inputs
         defaulttxt: text to start with
         defaultmode: mode to start in (NAVIGATE=Predictive, TEXT_LOWER, TEXT_UPPER, NUMERIC)
         keydelay: key timeout in TXT mode
         numeric: NOT IMPLEMENTED YET
+        stats: optional T9Stats to count keypresses and dictionary calls
+        clock: function giving the time in seconds, for keydelay
+        prefetch: number of likely next digits to look up between keypresses (0 = none)
         """
-        self.dict = T9Dict(dict_file)  # dict for lookups
+        if isinstance(dict_file, (str, os.PathLike)):
+            self.dict = T9Dict(dict_file, stats)  # dict for lookups
+        else:
+            self.dict = dict_file  # shared dict for lookups
+        self.prefetcher = None  # looks up likely next keys in the background
+        if prefetch:
+            self.dict = self.prefetcher = Prefetcher(self.dict, prefetch)
         self.mode = defaultmode  # InputMode: NAVIGATE, EDIT_WORD, EDIT_CHAR, TEXT_LOWER, TEXT_UPPER, NUMERIC
         self.pos = 0  # cursor position (edit chars)
         self.keys = ""  # keys typed (edit word)
         self.word = ""  # word displayed (edit word/chars)
         self.words = []  # possible words (edit word)
-        self.textbefore = defaulttxt  # before the cursor
-        self.textafter = ""  # after the cursor
+        self.buffer = TextBuffer(defaulttxt)  # text either side of the cursor
         self.lastkeypress = ""  # last key pressed (txt input)
-        self.lastkeytime = time.perf_counter()  # time from last key (txt input)
+        self.clock = clock  # time source for keys sent without a time
+        self.lastkeytime = clock()  # time from last key (txt input)
         self.keydelay = keydelay  # time to change char (txt input)
         self.numeric = numeric  # True if this is numbers only
+        self.stats = stats  # instrumentation, None when disabled
+        self._shown = None  # (cursor, cursor text, text after) as of the last diff()
+        if self.prefetcher is not None:
+            self._prefetch()
 
-    def gettext(self):
-        """Get current text including cursor for display.
-        For raw text use .text()
+    def snapshot(self):
+        """Get the input's state as compact bytes, for restore().
+
+        The dictionary, stats, prefetcher and candidate words aren't kept.
+        restore() looks the words up again.
+        """
+        before, after, start, end = self.buffer.state()
+        state = [
+            int(self.mode),
+            self.pos,
+            self.keys,
+            self.word,
+            before,
+            after,
+            start,
+            end,
+            self.lastkeypress,
+            self.lastkeytime,
+            self.keydelay,
+            self.numeric,
+            self._shown,
+        ]
+        return json.dumps(state, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    @classmethod
+    def restore(cls, dict_file, data, stats=None, clock=time.perf_counter, prefetch=0):
+        """Make an input from snapshot() of another one.
+
+        dict_file: dictionary file name, or a T9Dict to share with other inputs
+        data: bytes from snapshot()
+        stats: optional T9Stats to count keypresses and dictionary calls
+        clock: function giving the time in seconds, the same as the original's
+        prefetch: number of likely next digits to look up between keypresses (0 = none)
         """
+        x = cls.__new__(cls)
+        if isinstance(dict_file, (str, os.PathLike)):
+            x.dict = T9Dict(dict_file, stats)
+        else:
+            x.dict = dict_file
+        x.prefetcher = None
+        if prefetch:
+            x.dict = x.prefetcher = Prefetcher(x.dict, prefetch)
+        (
+            mode,
+            x.pos,
+            x.keys,
+            x.word,
+            before,
+            after,
+            start,
+            end,
+            x.lastkeypress,
+            x.lastkeytime,
+            x.keydelay,
+            x.numeric,
+            shown,
+        ) = json.loads(data)
+        x.mode = InputMode(mode)
+        x.buffer = TextBuffer.fromstate(before, after, start, end)
+        x._shown = tuple(shown) if shown is not None else None
+        x.stats = stats
+        x.clock = clock
+        if x.mode in (InputMode.EDIT_WORD, InputMode.EDIT_CHAR) and x.keys:
+            x.words = x.dict.getwords(x.keys)
+        else:
+            x.words = []
+        if x.prefetcher is not None:
+            x._prefetch()
+        return x
+
+    @property
+    def textbefore(self):
+        """Text before the cursor."""
+        return self.buffer.before
+
+    @textbefore.setter
+    def textbefore(self, value):
+        self.buffer.before = value
+
+    @property
+    def textafter(self):
+        """Text after the cursor."""
+        return self.buffer.after
+
+    @textafter.setter
+    def textafter(self, value):
+        self.buffer.after = value
+
+    def cursortext(self):
+        """Get what is shown at the cursor in the current mode."""
         if self.mode == InputMode.NAVIGATE:
-            return self.textbefore + "|" + self.textafter
+            return "|"
         elif self.mode == InputMode.EDIT_WORD:
-            return self.textbefore + "[" + self.word + "]" + self.textafter
+            return "[" + self.word + "]"
         elif self.mode == InputMode.EDIT_CHAR:
-            return self.textbefore + '"' + self.posword() + '"?' + self.textafter
+            return '"' + self.posword() + '"?'
         elif self.mode == InputMode.TEXT_LOWER:
-            return self.textbefore + "()" + self.textafter
+            return "()"
         elif self.mode == InputMode.TEXT_UPPER:
-            return self.textbefore + "[]" + self.textafter
+            return "[]"
         elif self.mode == InputMode.NUMERIC:
-            return self.textbefore + "#" + self.textafter
+            return "#"
+
+    def gettext(self):
+        """Get current text including cursor for display.
+        For raw text use .text()
+        """
+        cursor = self.cursortext()
+        if cursor is None:
+            return None
+        return self.buffer.before + cursor + self.buffer.after
+
+    def diff(self):
+        """Get what changed on the display since the last call.
+
+        The first call gives the whole display, as a change to "". Only the
+        changed part of the text is joined, so this stays cheap however
+        long the text grows.
+
+        Returns:
+            a DisplayChange
+        """
+        buffer = self.buffer
+        start, end = buffer.changes()
+        cursor = buffer.cursor
+        after = len(buffer) - cursor
+        cursortext = self.cursortext() or ""
+        if self._shown is None:
+            start = end = 0
+            oldsize = 0
+        else:
+            oldcursor, oldcursortext, oldafter = self._shown
+            start = min(start, cursor, oldcursor)
+            end = min(end, after, oldafter)
+            oldsize = oldcursor + len(oldcursortext) + oldafter
+            if start == cursor == oldcursor and end == after == oldafter:
+                # only the cursor text changed, so skip what it kept
+                same = 0
+                while same < min(len(cursortext), len(oldcursortext)) and cursortext[same] == oldcursortext[same]:
+                    same += 1
+                start += same
+                cursortext = cursortext[same:]
+        text = buffer.text(start, cursor) + cursortext + buffer.text(cursor, cursor + after - end)
+        self._shown = (cursor, self.cursortext() or "", after)
+
+        if self.mode in (InputMode.EDIT_WORD, InputMode.EDIT_CHAR):
+            candidates = list(self.words)
+        else:
+            candidates = []
+        return DisplayChange(start, oldsize - end, text, cursor, candidates, int(self.mode))
 
     def text(self):
         """Get text buffer without cursor."""
         if self.mode == InputMode.EDIT_CHAR or self.mode == InputMode.EDIT_WORD:
-            return self.textbefore + self.word + self.textafter
+            return self.buffer.before + self.word + self.buffer.after
         else:
-            return self.textbefore + self.textafter
+            return self.buffer.before + self.buffer.after
 
     def posword(self):
         """Get word with position marker."""
@@ -132,7 +341,7 @@ class T9Input:
         if key == Key.NUM_1.value and self.keys[0] != Key.NUM_1.value:
             if self.keys[-1] == Key.NUM_1.value:
                 # this is punctuation only - skip the word (no save)
-                self.textbefore += self.word[0:-1]
+                self.buffer.insert(self.word[0:-1])
                 self.keys = self.keys[-1]
                 self.keys += key
                 self.setword()
@@ -150,6 +359,10 @@ class T9Input:
 
         UDLRS = UP, DOWN, LEFT, RIGHT, SELECT
 
+        keys is a string, or a list of (key, time) pairs for keys recorded
+        with their times, which are used instead of the clock. Replaying a
+        recording that way gives the same text however fast it runs.
+
         Navigation mode:
             0-9: start new word
             ULR: navigate cursor
@@ -182,15 +395,45 @@ class T9Input:
             D: backspace
             S: back to navigation
         """
+        if self.stats is not None:
+            return self.stats.measure("sendkeys", self._sendkeys, keys)
+        return self._sendkeys(keys)
+
+    async def asendkeys(self, keys, executor=None):
+        """Send action keys from a coroutine, see sendkeys().
+
+        The keys are handled in executor (default: the loop's default
+        executor) so that dictionary I/O doesn't block the event loop.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(executor, self.sendkeys, keys)
+
+    def _sendkeys(self, keys, call=None):
+        if call is not None:
+            call.keys = len(keys)
+        if self.prefetcher is not None:
+            self.prefetcher.cancel()
         for key in keys:
+            if isinstance(key, str):
+                now = None
+            else:
+                key, now = key
             if self.mode == InputMode.NAVIGATE:
                 self._handle_navigate_key(key)
             elif self.mode < InputMode.TEXT_LOWER:
                 self._handle_edit_key(key)
             elif self.mode < InputMode.NUMERIC:
-                self._handle_text_key(key)
+                self._handle_text_key(key, now)
             elif self.mode == InputMode.NUMERIC:
                 self._handle_numeric_key(key)
+        if self.prefetcher is not None:
+            self._prefetch()
+
+    def _prefetch(self):
+        """Start looking up what the next digit could give, in modes that look words up."""
+        if self.mode < InputMode.TEXT_LOWER:
+            # the next digit either starts a word or adds to the one being typed
+            self.prefetcher.start("" if self.mode == InputMode.NAVIGATE else self.keys)
 
     def _handle_navigate_key(self, key):
         """Handle key in navigation mode."""
@@ -213,20 +456,20 @@ class T9Input:
 
         elif key == Key.NUM_0.value:
             # insert a space
-            self.textbefore = self.textbefore + " "
+            self.buffer.insert(" ")
 
         elif key == Key.DOWN.value:
             # delete a char
-            if self.textbefore == "":
+            c = self.buffer.charbefore()
+            if c == "":
                 return
-            if int(getkey(self.textbefore[-1])) < 2:
-                self.textbefore = self.textbefore[:-1]
+            if int(getkey(c)) < 2:
+                self.buffer.backspace()
             else:
                 # edit word
                 self.mode = InputMode.EDIT_WORD
                 # move in to edit buffer
-                self.word = self.textbefore.split(" ")[-1]
-                self.textbefore = self.textbefore[0 : self.textbefore.rfind(" ") + 1]
+                self.word = self.buffer.takewordbefore()
                 if self.word == "":
                     self.mode = InputMode.NAVIGATE
                 else:
@@ -237,38 +480,34 @@ class T9Input:
             self.mode = InputMode.TEXT_LOWER
 
         elif key in [Key.UP.value, Key.LEFT.value]:
-            if self.textbefore == "":
+            c = self.buffer.charbefore()
+            if c == "":
                 return
             # left a char
-            if int(getkey(self.textbefore[-1])) < 2:
+            if int(getkey(c)) < 2:
                 # move one char
-                self.textafter = self.textbefore[-1] + self.textafter
-                self.textbefore = self.textbefore[:-1]
+                self.buffer.left()
             else:
                 # edit word
                 self.mode = InputMode.EDIT_WORD
                 # move to edit buffer
-                t = self.textbefore.split(" ")
-                self.word = t[-1]
-                self.textbefore = self.textbefore[0 : self.textbefore.rfind(" ") + 1]
+                self.word = self.buffer.takewordbefore()
                 self.keys = getkey(self.word)
                 self.words = self.dict.getwords(self.keys)
 
         elif key == Key.RIGHT.value:
             # right a char
-            if self.textafter == "":
+            c = self.buffer.charafter()
+            if c == "":
                 return
-            if int(getkey(self.textafter[0])) < 2:
+            if int(getkey(c)) < 2:
                 # move one char
-                self.textbefore = self.textbefore + self.textafter[0]
-                self.textafter = self.textafter[1:]
+                self.buffer.right()
             else:
                 # edit word
                 self.mode = InputMode.EDIT_WORD
                 # move to edit buffer
-                t = self.textafter.split(" ")
-                self.word = t[0]
-                self.textafter = self.textafter[len(t[0]) : len(self.textafter)]
+                self.word = self.buffer.takewordafter()
                 self.keys = getkey(self.word)
                 self.words = self.dict.getwords(self.keys)
 
@@ -310,9 +549,9 @@ class T9Input:
 
             # return to navigate mode.
             self.mode = InputMode.NAVIGATE
-            self.textbefore += self.word
+            self.buffer.insert(self.word)
             if key == Key.NUM_0.value:
-                self.textbefore += " "
+                self.buffer.insert(" ")
         elif key == Key.LEFT.value:
             # save this word?
             if self.word not in self.words:
@@ -322,7 +561,7 @@ class T9Input:
 
             # return to navigate mode.
             self.mode = InputMode.NAVIGATE
-            self.textafter = self.word + self.textafter
+            self.buffer.insertafter(self.word)
         elif key == Key.UP.value:
             # up is navigate to next word
             self.nextword()
@@ -353,7 +592,7 @@ class T9Input:
 
                 # return to navigate mode.
                 self.mode = InputMode.NAVIGATE
-                self.textbefore += self.word + " "
+                self.buffer.insert(self.word + " ")
             else:
                 # reset the text.
                 self.setword()
@@ -383,12 +622,12 @@ class T9Input:
 
                     # return to navigate mode.
                     self.mode = InputMode.NAVIGATE
-                    self.textbefore += self.word
+                    self.buffer.insert(self.word)
                 else:
                     self.pos += 1
 
-    def _handle_text_key(self, key):
-        """Handle key in text input modes."""
+    def _handle_text_key(self, key, now=None):
+        """Handle key in text input modes, pressed at time now (default: the clock's time)."""
         if key in [
             Key.NUM_1.value,
             Key.NUM_2.value,
@@ -401,22 +640,22 @@ class T9Input:
             Key.NUM_9.value,
         ]:
             # text entry mode 3 (boring way)
-            if self.lastkeytime + self.keydelay > time.perf_counter() and key == self.lastkeypress:
+            if now is None:
+                now = self.clock()
+            if self.lastkeytime + self.keydelay > now and key == self.lastkeypress:
                 # edit char
-                c = self.textbefore[-1].upper()
-                print(ALLKEYS[int(key)].find(c), int(key), ALLKEYS[int(key)], c)
+                c = self.buffer.charbefore().upper()
                 i = ALLKEYS[int(key)].find(c)
                 if i != -1:
                     if i == len(ALLKEYS[int(key)]) - 1:
                         c = ALLKEYS[int(key)][0]
                     else:
                         c = ALLKEYS[int(key)][i + 1]
-                    print(self.mode)
                     if self.mode == InputMode.TEXT_LOWER:
                         # lower case in mode 4
                         c = c.lower()
 
-                    self.textbefore = self.textbefore[:-1] + c
+                    self.buffer.replacebefore(c)
 
             else:
                 # new char
@@ -424,28 +663,24 @@ class T9Input:
                 if self.mode == InputMode.TEXT_LOWER:
                     # lower case in mode 4
                     c = c.lower()
-                self.textbefore += c
+                self.buffer.insert(c)
 
             self.lastkeypress = key
-            self.lastkeytime = time.perf_counter()
+            self.lastkeytime = now
         else:
-            self.lastkeytime = 0
+            # any other key ends multi-tap, however soon the next digit comes
+            self.lastkeypress = ""
 
         if key == Key.NUM_0.value:
             # space
-            self.textbefore += " "
+            self.buffer.insert(" ")
         elif key == Key.DOWN.value:
             # delete
-            if self.textbefore != "":
-                self.textbefore = self.textbefore[:-1]
+            self.buffer.backspace()
         elif key in [Key.LEFT.value, Key.UP.value]:
-            if self.textbefore != "":
-                self.textafter = self.textbefore[-1] + self.textafter
-                self.textbefore = self.textbefore[:-1]
+            self.buffer.left()
         elif key == Key.RIGHT.value:
-            if self.textafter != "":
-                self.textbefore = self.textbefore + self.textafter[0]
-                self.textafter = self.textafter[1:]
+            self.buffer.right()
         elif key == Key.SELECT.value:
             self.mode += 1
 
@@ -463,18 +698,13 @@ class T9Input:
             Key.NUM_8.value,
             Key.NUM_9.value,
         ]:
-            self.textbefore += key
+            self.buffer.insert(key)
         elif key == Key.DOWN.value:
             # delete
-            if self.textbefore != "":
-                self.textbefore = self.textbefore[:-1]
+            self.buffer.backspace()
         elif key in [Key.LEFT.value, Key.UP.value]:
-            if self.textbefore != "":
-                self.textafter = self.textbefore[-1] + self.textafter
-                self.textbefore = self.textbefore[:-1]
+            self.buffer.left()
         elif key == Key.RIGHT.value:
-            if self.textafter != "":
-                self.textbefore = self.textbefore + self.textafter[0]
-                self.textafter = self.textafter[1:]
+            self.buffer.right()
         elif key == Key.SELECT.value:
             self.mode = InputMode.NAVIGATE
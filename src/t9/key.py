@@ -1,18 +1,43 @@
 """Dictionary node class for PY9 T9 text input system."""
 
 import struct
-import logging
-from enum import IntEnum
 
-logger = logging.getLogger(__name__)
+from .pool import decode_varint, encode_varint
 
+FLAGS = struct.Struct("!h")
+REF = struct.Struct("!L")
 
-class SaveState(IntEnum):
-    """Node save state for dictionary file operations."""
+# the most words a node can hold, unless the file is wide
+MAX_WORDS = 0x7FFF
 
-    UNCHANGED = -1  # Node doesn't need any file operation
-    UPDATE = 1  # Existing node needs reference update
-    NEW = 2  # New node needs full save to file
+# wide dictionaries, see header.FLAG_WIDE
+WIDE_REF = struct.Struct("!Q")
+WIDE_COUNT = struct.Struct("!L")
+
+
+def skipnode(buf, pos, pooled=False, wide=False):
+    """Find the end of the node at pos in buf without decoding its words.
+
+    pooled: the file has a string pool
+    wide: the file has 64-bit positions and 32-bit word counts
+
+    Returns:
+        (position just after the node, number of words)
+    """
+    (flags,) = FLAGS.unpack_from(buf, pos)
+    pos += FLAGS.size + bin(flags & 0x3FE).count("1") * (WIDE_REF if wide else REF).size
+    count = WIDE_COUNT if wide else FLAGS
+    (wc,) = count.unpack_from(buf, pos)
+    pos += count.size
+    if pooled:
+        for n in range(wc):
+            tag, pos = decode_varint(buf, pos)
+            if tag & 1:
+                pos += tag >> 1
+    else:
+        for n in range(wc):
+            pos = buf.find(b"\n", pos) + 1
+    return pos, wc
 
 
 class T9Key:
@@ -22,72 +47,78 @@ class T9Key:
         self.refs = [None, None, None, None, None, None, None, None, None]
         self.words = []
         self.fpos = 0
-        self.needsave = SaveState.UNCHANGED
-        self.last = -1
-
-    def save(self, f):
-        """
-        Save the node and all child nodes to file f.
-        Used when creating dictionary file.
-        """
-        # recurse save children first so self.ref[x].fpos is always set
-        for i in self.refs:
-            if i:
-                i.save(f)
-        # now get position in file
-        self.fpos = f.tell()
-
-        # write flags (2 bytes)
-        flags = 0
-        for i in range(1, 10):
-            if self.refs[i - 1] is not None:
-                flags = 2**i | flags
-        f.write(struct.pack("!h", flags))
-
-        # write positions of children (4 bytes each)
-        for i in self.refs:
-            if i:
-                f.write(struct.pack("!i", i.fpos))
-
-        # write number of words
-        f.write(struct.pack("!h", len(self.words)))
-
-        # write list of words
-        for word in self.words:
-            f.write(("%s\n" % word).encode("utf-8"))
-
-    def savenode(self, f):
+        self.ids = None  # {word: number} for words loaded from a string pool
+
+    def copy(self):
+        """Get a copy of this node that can be changed independently."""
+        k = T9Key()
+        k.refs = list(self.refs)
+        k.words = list(self.words)
+        k.fpos = self.fpos
+        k.ids = self.ids
+        return k
+
+    def savenode(self, f, pooled=False, wide=False):
         """
         Save just this node to the file.
         Used to add or overwrite a node.
+        pooled: the file has a string pool, so words it holds are saved by number
+        wide: the file has 64-bit positions and 32-bit word counts
         """
         # get position in file
         self.fpos = f.tell()
+        f.write(self.tobytes(self.refs, (self.ids or {}) if pooled else None, wide))
 
-        # write flags (2 bytes)
+    def tobytes(self, refs, ids=None, wide=False):
+        """
+        Encode the node as it is stored in the file.
+        refs: file positions of the children, None where there is no child
+        ids: {word: number} in the file's string pool, if it has one
+        wide: use 64-bit positions and a 32-bit word count
+        """
+        # flags (2 bytes)
         flags = 0
         for i in range(1, 10):
-            if self.refs[i - 1] is not None:
+            if refs[i - 1] is not None:
                 flags = 2**i | flags
-        logger.debug("writing flags %s %s %s", self.words, flags, self.refs)
-
-        f.write(struct.pack("!h", flags))
+        data = [FLAGS.pack(flags)]
 
-        # write positions of children (4 bytes each)
-        logger.debug("saving children")
-        for i in self.refs:
-            if i:
-                logger.debug("saving child %s", i)
-                f.write(struct.pack("!i", i))
+        # positions of children (4 bytes each, or 8 if wide)
+        ref = WIDE_REF if wide else REF
+        for i in refs:
+            if i is not None:
+                data.append(ref.pack(i))
 
-        logger.debug("... done saving children")
+        # number of words, then the list of words
+        data.append((WIDE_COUNT if wide else FLAGS).pack(len(self.words)))
+        data.append(self.wordbytes(ids))
+        return b"".join(data)
 
-        # write number of words
-        f.write(struct.pack("!h", len(self.words)))
-
-        # write list of words
+    def wordbytes(self, ids=None):
+        """
+        Encode the node's list of words.
+        Without a pool each word ends in a newline. With one, each word is a
+        varint: its number in the pool times 2, or its length times 2 plus 1
+        followed by the word, for words added since the pool was made.
+        """
+        if ids is None:
+            return "".join(["%s\n" % word for word in self.words]).encode("utf-8")
+        data = []
         for word in self.words:
-            f.write(("%s\n" % word).encode("utf-8"))
+            i = ids.get(word)
+            if i is None:
+                enc = word.encode("utf-8")
+                data.append(encode_varint(len(enc) << 1 | 1) + enc)
+            else:
+                data.append(encode_varint(i << 1))
+        return b"".join(data)
+
+    def nodesize(self, ids=None, wide=False):
+        """Get the number of bytes the node takes in the file."""
+        children = sum(1 for i in self.refs if i is not None)
+        if wide:
+            return 6 + 8 * children + len(self.wordbytes(ids))
+        return 4 + 4 * children + len(self.wordbytes(ids))
 
     def loadnode(self, f):
         """
@@ -110,4 +141,43 @@ class T9Key:
         for n in range(0, wc):
             self.words.append(f.readline().decode("utf-8").rstrip("\n\r"))
 
-        logger.debug("loaded node: refs=%s words=%s", self.refs, self.words)
+    def loadbuffer(self, buf, pos, pool=None, wide=False):
+        """
+        Load a node from a buffer, such as an mmap of the dictionary file.
+        pool: the file's StringPool, if it has one
+        wide: the file has 64-bit positions and 32-bit word counts
+        Returns the position just after the node.
+        """
+        self.fpos = pos
+        (flags,) = FLAGS.unpack_from(buf, pos)
+        pos += 2
+        # loop through flags
+        ref = WIDE_REF if wide else REF
+        for i in range(1, 10):
+            if 2**i & flags != 0:
+                (self.refs[i - 1],) = ref.unpack_from(buf, pos)
+                pos += ref.size
+
+        # read word count
+        count = WIDE_COUNT if wide else FLAGS
+        (wc,) = count.unpack_from(buf, pos)
+        pos += count.size
+        self.words = []
+        if pool is not None:
+            self.ids = {}
+            for n in range(0, wc):
+                tag, pos = decode_varint(buf, pos)
+                if tag & 1:
+                    end = pos + (tag >> 1)
+                    self.words.append(buf[pos:end].decode("utf-8"))
+                    pos = end
+                else:
+                    word = pool.word(tag >> 1)
+                    self.words.append(word)
+                    self.ids[word] = tag >> 1
+            return pos
+        for n in range(0, wc):
+            end = buf.find(b"\n", pos)
+            self.words.append(buf[pos:end].decode("utf-8").rstrip("\r"))
+            pos = end + 1
+        return pos
@@ -0,0 +1,219 @@
+"""Keystrokes per character evaluation for PY9 T9 text input system.
+
+Every word of a text corpus is typed the cheapest way T9Input allows:
+
+    digits, then 0 if the first word offered is right
+    digits, then U presses through nextword() until it is offered, then 0
+    digits, U presses past the last word offered into character editing,
+    then U/S presses to fix each letter, R to move on, and 0 at the end
+
+A word with no words offered for its digits can only be spelled if T9Input
+is left in character editing by the last shorter digit sequence that had
+some. Otherwise U and 0 just type its dots, and the word counts as untyped.
+
+Each word counts its letters plus the space that 0 types, so a dictionary
+that offers every word first scores just over 1.0. The dictionary is not
+changed, so every occurrence of a word costs the same.
+
+Distinct words are converted to keys once, and their distinct key sequences
+looked up in one sorted batch, so a corpus of many megabytes is dominated
+by reading and splitting the text.
+"""
+
+import time
+from collections import Counter
+
+from .constants import ALLKEYS
+from .dict import T9Dict
+from .utils import getkey
+
+# decoded nodes kept by the evaluation dictionary
+CACHE_NODES = 1 << 18
+
+PUNCTUATION = ALLKEYS[1]
+
+
+def nextchar(c, key):
+    """Get the letter that U gives after c in character editing, like T9Input.nextchar()."""
+    group = ALLKEYS[key]
+    lc = c == c.lower()
+    c = c.upper()
+    if c not in group:
+        c = group[0]
+    else:
+        i = group.find(c) + 1
+        c = group[i] if i < len(group) else group[0]
+    return c.lower() if lc else c
+
+
+def switchcase(c):
+    """Get the letter that S gives from c in character editing."""
+    return c.lower() if c.upper() == c else c.upper()
+
+
+def spellkeys(current, word, keys):
+    """Get the keys that turn current into word in character editing, starting at the first letter.
+
+    Returns:
+        the keys, or None if some letter can't be typed this way
+    """
+    out = []
+    last = len(word) - 1
+    for pos, (c, target) in enumerate(zip(current, word)):
+        key = int(keys[pos])
+        for _ in range(len(ALLKEYS[key]) + 1):
+            if c == target or switchcase(c) == target:
+                break
+            c = nextchar(c, key)
+            out.append("U")
+        else:
+            return None
+        if c != target:
+            out.append("S")
+        if pos < last:
+            # R only moves on from a letter on the key
+            if target.upper() not in ALLKEYS[key]:
+                return None
+            out.append("R")
+    out.append("0")
+    return "".join(out)
+
+
+def charmode(keys, prefix_words):
+    """Check if typing keys leaves T9Input in character editing.
+
+    setword() only changes the mode when there are words for the keys so
+    far, so with none for the whole of keys the mode is whatever the last
+    prefix that had some left it in.
+
+    prefix_words: getwords() of each prefix of keys, shortest first
+    """
+    char = False
+    for n, words in enumerate(prefix_words, 1):
+        # a 1 after the first key adds an apostrophe without setword(), see T9Input.addkeypress()
+        if words and not (n > 1 and keys[n - 1] == "1"):
+            char = len(words[0]) != n
+    return char
+
+
+def wordkeys(word, words, keys=None, editchar=False):
+    """Get the cheapest keys that type word and a space, starting in navigate mode.
+
+    word: the word to type
+    words: getwords() of its digits
+    keys: its digits, if already known
+    editchar: if there are no words, whether typing the digits leaves
+        T9Input in character editing, see charmode()
+
+    Returns:
+        (keys, fallback): the key presses, or None if word can't be typed,
+        and True if it had to be spelled out letter by letter
+    """
+    if keys is None:
+        keys = getkey(word)
+    if word in words and len(words[0]) == len(keys):
+        return keys + "U" * words.index(word) + "0", False
+    # start from what setword() shows, see T9Input.setword()
+    if not words:
+        if not editchar:
+            # word editing with nothing to offer: U and 0 only keep the dots
+            return None, True
+        current = "." * len(keys)
+        ups = ""
+    else:
+        wl = len(words[0])
+        kl = len(keys)
+        if wl == kl:
+            # cycle through every word into character editing
+            current = words[-1]
+            ups = "U" * len(words)
+        elif wl > kl:
+            current = words[0][0:kl]
+            ups = ""
+        else:
+            current = words[0] + "." * (kl - wl)
+            ups = ""
+    spelled = spellkeys(current, word, keys)
+    if spelled is None:
+        return None, True
+    return keys + ups + spelled, True
+
+
+def corpus_words(text):
+    """Count the words in a text, without the punctuation around them."""
+    counts = Counter()
+    for token, n in Counter(text.split()).items():
+        word = token.strip(PUNCTUATION)
+        if word:
+            counts[word] += n
+    return counts
+
+
+def evaluate(dict_file, text):
+    """Work out the keystrokes per character of typing text with a dictionary.
+
+    dict_file: dictionary file, or an open T9Dict
+    text: the corpus
+
+    Returns:
+        dict of JSON-serialisable results
+    """
+    if isinstance(dict_file, T9Dict):
+        d = dict_file
+    else:
+        d = T9Dict(str(dict_file), cache_size=CACHE_NODES, revalidate=None)
+
+    start = time.perf_counter()
+    counts = corpus_words(text)
+    keys = {word: getkey(word) for word in counts}
+    # words that need the punctuation-only path of T9Input.addkeypress() can't be predicted
+    typeable = {word: k for word, k in keys.items() if "11" not in k}
+
+    lookup_start = time.perf_counter()
+    sequences = sorted(set(typeable.values()))
+    try:
+        results = dict(zip(sequences, d.getmany(sequences)))
+        # the mode typing each sequence without words ends in depends on its prefixes
+        missing = [k for k in sequences if not results[k]]
+        prefixes = sorted({k[:n] for k in missing for n in range(1, len(k))} - results.keys())
+        results.update(zip(prefixes, d.getmany(prefixes)))
+    finally:
+        if d is not dict_file:
+            # opened here, so nobody else will close it
+            d.close()
+    editchar = {k: charmode(k, [results[k[:n]] for n in range(1, len(k) + 1)]) for k in missing}
+    lookup_seconds = time.perf_counter() - lookup_start
+
+    words = chars = strokes = first = fallback = untyped = 0
+    for word, n in counts.items():
+        k = typeable.get(word)
+        if k is None:
+            untyped += n
+            continue
+        presses, spelled = wordkeys(word, results[k], k, editchar.get(k, False))
+        if presses is None:
+            untyped += n
+            continue
+        words += n
+        chars += (len(word) + 1) * n
+        strokes += len(presses) * n
+        if spelled:
+            fallback += n
+        elif presses == k + "0":
+            first += n
+    seconds = time.perf_counter() - start
+
+    return {
+        "dictionary": d.file,
+        "words": words,
+        "distinct_words": len(counts),
+        "chars": chars,
+        "keystrokes": strokes,
+        "kspc": round(strokes / chars, 6) if chars else 0,
+        "first_choice": round(first / words, 6) if words else 0,
+        "spelled": fallback,
+        "untyped": untyped,
+        "lookups": len(results),
+        "lookups_per_second": round(len(results) / lookup_seconds, 1) if lookup_seconds else 0,
+        "seconds": round(seconds, 6),
+    }
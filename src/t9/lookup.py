@@ -0,0 +1,111 @@
+"""Batch digit sequence lookups for PY9 T9 text input system."""
+
+import json
+
+from .dict import T9Dict
+
+# lines read per batch, as a size hint in bytes
+BATCH_BYTES = 1 << 16
+
+# decoded nodes kept by the lookup dictionary
+CACHE_NODES = 1 << 18
+
+# distinct digit sequences whose results are remembered
+MEMO_SIZE = 1 << 16
+
+DIGITS = "123456789"
+
+
+def match_type(digits, words):
+    """Classify a getwords() result for digits.
+
+    Returns "exact", "lookahead" or "lookbehind" by comparing the length of
+    the first word to the number of digits, or "none" if nothing matched.
+    """
+    if not words:
+        return "none"
+    wl = len(words[0])
+    kl = len(digits)
+    if wl == kl:
+        return "exact"
+    elif wl > kl:
+        return "lookahead"
+    else:
+        return "lookbehind"
+
+
+def format_tsv(digits, words, match):
+    """Format a result as a tab separated line."""
+    if match:
+        return "\t".join([digits, match_type(digits, words)] + words) + "\n"
+    return "\t".join([digits] + words) + "\n"
+
+
+def format_jsonl(digits, words, match):
+    """Format a result as a JSON line."""
+    result = {"digits": digits, "words": words}
+    if match:
+        result["match"] = match_type(digits, words)
+    return json.dumps(result, ensure_ascii=False) + "\n"
+
+
+FORMATS = {"tsv": format_tsv, "jsonl": format_jsonl}
+
+
+class Lookup:
+    """Looks up many digit sequences against one open dictionary.
+
+    Results are remembered per digit sequence, so repeated input is cheap.
+    Lines that aren't made of the digits 1-9 give an empty result.
+    """
+
+    def __init__(self, dict_file, top=0, match=False, fmt="tsv"):
+        """Open the dictionary for lookups.
+
+        dict_file: dictionary file, or an open T9Dict
+        top: only give the first top words (0 = all)
+        match: include the match type of each result
+        fmt: output format, "tsv" or "jsonl"
+        """
+        if isinstance(dict_file, T9Dict):
+            self.dict = dict_file
+        else:
+            self.dict = T9Dict(str(dict_file), cache_size=CACHE_NODES)
+        self.top = top
+        self.match = match
+        self.format = FORMATS[fmt]
+        self._memo = {}
+
+    def lookup(self, digits):
+        """Get the formatted result line for one digit sequence."""
+        line = self._memo.get(digits)
+        if line is None:
+            if digits and not digits.strip(DIGITS):
+                words = self.dict.getwords(digits)
+            else:
+                words = []
+            if self.top:
+                words = words[: self.top]
+            line = self.format(digits, words, self.match)
+            if len(self._memo) >= MEMO_SIZE:
+                self._memo.clear()
+            self._memo[digits] = line
+        return line
+
+    def run(self, infile, outfile):
+        """Look up every line of a binary input file, writing to a binary output file.
+
+        Returns:
+            number of lines looked up
+        """
+        count = 0
+        lookup = self.lookup
+        while True:
+            lines = infile.readlines(BATCH_BYTES)
+            if not lines:
+                break
+            out = [lookup(line.decode("utf-8").strip()) for line in lines]
+            outfile.write("".join(out).encode("utf-8"))
+            count += len(lines)
+        outfile.flush()
+        return count
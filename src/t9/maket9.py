@@ -2,23 +2,122 @@
 T9.py - a predictive text dictionary in the style of Nokia's T9
 
 File Format...
-  Header:
-    String[7]     = "PY9DICT:"
-    Unsigned Long = Number of words
-    Unsigned Long = root node's start position
+  Header: see header.py
 
   Node block:
     Unsigned Long[4] =
+
+Layouts:
+  dfs   children before parents, depth-first (the original layout)
+  bfs   breadth-first, so the root and the shallow levels come first
+  hot   the top levels breadth-first in the first HOT_BYTES, then each
+        remaining subtree parent first, most frequent child first, so a
+        lookup reads forwards through a few nearby pages
+
+Nodes hold whole words whose key is the node's path, so no two subtrees
+are ever the same and sharing them as a DAWG would save nothing.
 """
 
-import struct
-from .key import T9Key
+import io
+import os
+
+from .blocks import compress_nodes
+from .header import FLAG_BLOCKS, FLAG_POOL, FLAG_WIDE, Header, new_generation, write_header
+from .key import MAX_WORDS, T9Key
+from .pool import build_pool
 from .utils import getkey, read_wordlist
 
+LAYOUTS = ("dfs", "bfs", "hot")
+
+# bytes of breadth-first levels at the start of a "hot" layout
+HOT_BYTES = 1 << 16
+
+
+def layout_order(root, layout, rank):
+    """Get the nodes of a tree in the order a layout writes them.
+
+    rank: node -> sort key, lowest for the most frequent words
+    """
+    order = []
+    if layout == "dfs":
+        # children in key order, each before its parent
+        stack = [(root, False)]
+        while stack:
+            k, done = stack.pop()
+            if done:
+                order.append(k)
+            else:
+                stack.append((k, True))
+                stack.extend((r, False) for r in reversed(k.refs) if r is not None)
+        return order
+
+    level = [root]
+    size = 0
+    while level:
+        if layout == "hot":
+            level.sort(key=rank)
+            size += sum(k.nodesize() for k in level)
+            if size > HOT_BYTES and order:
+                break
+        order.extend(level)
+        level = [r for k in level for r in k.refs if r is not None]
+
+    # the rest of a hot layout: each subtree depth-first, parents first
+    for top in level:
+        stack = [top]
+        while stack:
+            k = stack.pop()
+            order.append(k)
+            stack.extend(sorted((r for r in k.refs if r is not None), key=rank, reverse=True))
+    return order
+
+
+def save_nodes(f, nodes, ids=None, wide=False):
+    """Write nodes in order from the current position of f.
+
+    Positions are worked out first, so parents can come before their children.
+    ids: {word: number} in the file's string pool, if it has one
+    wide: write 64-bit positions and 32-bit word counts
+    """
+    pos = f.tell()
+    for k in nodes:
+        k.fpos = pos
+        pos += k.nodesize(ids, wide)
+    for k in nodes:
+        f.write(k.tobytes([None if r is None else r.fpos for r in k.refs], ids, wide))
+
+
+def needs_wide(nodes, ids, start, textbytes):
+    """Check whether nodes written from position start need a wide file.
+
+    textbytes: total length of the words, with a byte each for separators
+    """
+    if any(len(k.words) > MAX_WORDS for k in nodes):
+        return True
+    # at most 9 refs and a count per node: only add it up near the limit
+    if start + 40 * len(nodes) + textbytes <= 0xFFFFFFFF:
+        return False
+    return start + sum(k.nodesize(ids) for k in nodes) > 0xFFFFFFFF
+
+
+def makedict(strIn, strOut, language="Unknown", comment="", layout="hot", pool=False, compress=None, wide=None):
+    """Build a dictionary file from a wordlist in frequency order.
+
+    layout: node order in the file, one of LAYOUTS
+    pool: keep words in a front-coded string pool, see pool.py
+    compress: "zlib" or "lzma" to make a read-only compressed file, see blocks.py
+    wide: 64-bit positions and 32-bit word counts (None = only if needed)
+    """
+    if layout not in LAYOUTS:
+        raise ValueError(f"Unknown layout: {layout}")
 
-def makedict(strIn, strOut, language="Unknown", comment=""):
     root = T9Key()
     count = 0
+    textbytes = 0
+    words = []
+    # wordlists are in frequency order, so the order nodes are created in
+    # ranks them by the most frequent word below them
+    rank = {id(root): 0}
 
     for word in read_wordlist(strIn):
         count += 1
@@ -27,14 +126,50 @@ def makedict(strIn, strOut, language="Unknown", comment=""):
         for c in path:
             if r.refs[int(c) - 1] is None:
                 r.refs[int(c) - 1] = T9Key()
+                rank[id(r.refs[int(c) - 1])] = len(rank)
             r = r.refs[int(c) - 1]
         # add the word to this position
         r.words.append(word)
+        textbytes += len(word.encode("utf-8")) + 1
+        if pool:
+            words.append(word)
+
+    ids = None
+    if pool:
+        data, ids = build_pool(words)
+    nodes = layout_order(root, layout, lambda k: rank[id(k)])
+    if wide is None:
+        start = 64 + len(language.encode("utf-8")) + len(comment.encode("utf-8")) + (len(data) if pool else 0)
+        wide = needs_wide(nodes, ids, start, textbytes)
 
-    f = open(strOut, "wb")
-    f.write(b"PY9DICT:" + struct.pack("!LL", 0, 0))
-    f.write(language.encode("utf-8") + b"\x0a" + comment.encode("utf-8") + b"\x0a")
-    root.save(f)
-    f.seek(0)
-    f.write(b"PY9DICT:" + struct.pack("!LL", count, root.fpos))
-    f.close()
+    # write a new file and move it into place, so anyone reading the old
+    # file keeps a complete copy until they notice the new generation
+    tmp = f"{strOut}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            header = Header(0, 0, language, comment, generation=new_generation())
+            if pool:
+                header.flags |= FLAG_POOL
+            if compress:
+                header.flags |= FLAG_BLOCKS
+            if wide:
+                header.flags |= FLAG_WIDE
+            write_header(f, header)
+            if pool:
+                f.write(data)
+            if compress:
+                # lay the nodes out as if uncompressed, then compress them
+                base = f.tell()
+                plain = io.BytesIO()
+                plain.seek(base)
+                save_nodes(plain, nodes, ids, wide)
+                f.write(compress_nodes(plain.getbuffer()[base:], base, sorted(k.fpos for k in nodes), compress))
+            else:
+                save_nodes(f, nodes, ids, wide)
+            f.seek(header.countpos)
+            f.write(header.pack_counts(count, root.fpos))
+        os.replace(tmp, strOut)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
@@ -0,0 +1,134 @@
+"""Front-coded string pool for PY9 T9 text input system.
+
+Pooled dictionaries keep every word once, in a pool after the header, and
+nodes refer to words by their number in the pool.
+
+Pool:
+    !L              number of words
+    !H              words per block
+    !L              length of the blocks in bytes
+    !L[blocks]      position of each block, from the end of this table
+    blocks          each word as varint(bytes shared with the word before),
+                    varint(length of the rest), the rest (UTF-8)
+
+The first word of a block shares nothing, so finding a word means decoding
+at most one block. Words are sorted case-insensitively, so case variants
+and words with a common stem sit next to each other.
+"""
+
+import struct
+from collections import OrderedDict
+
+HEAD = struct.Struct("!LHL")
+OFFSET = struct.Struct("!L")
+
+BLOCK_WORDS = 16
+
+# decoded blocks kept per pool
+BLOCK_CACHE = 1 << 12
+
+
+def encode_varint(n):
+    """Encode an unsigned integer, 7 bits per byte, least significant first."""
+    data = bytearray()
+    while n >= 0x80:
+        data.append(n & 0x7F | 0x80)
+        n >>= 7
+    data.append(n)
+    return bytes(data)
+
+
+def decode_varint(buf, pos):
+    """Decode an unsigned integer at pos.
+
+    Returns:
+        (value, position after it)
+    """
+    n = shift = 0
+    while True:
+        b = buf[pos]
+        pos += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, pos
+        shift += 7
+
+
+def sort_key(word):
+    """Pool order: case-insensitive, then exact."""
+    return (word.casefold(), word)
+
+
+def build_pool(words, block_words=BLOCK_WORDS):
+    """Build a pool holding each of words once.
+
+    Returns:
+        (pool bytes, {word: number in the pool})
+    """
+    words = sorted(set(words), key=sort_key)
+    ids = {}
+    offsets = []
+    blocks = []
+    pos = 0
+    for start in range(0, len(words), block_words):
+        offsets.append(OFFSET.pack(pos))
+        data = []
+        prev = b""
+        for word in words[start : start + block_words]:
+            ids[word] = len(ids)
+            enc = word.encode("utf-8")
+            n = 0
+            limit = min(len(prev), len(enc))
+            while n < limit and prev[n] == enc[n]:
+                n += 1
+            data.append(encode_varint(n) + encode_varint(len(enc) - n) + enc[n:])
+            prev = enc
+        block = b"".join(data)
+        blocks.append(block)
+        pos += len(block)
+    return HEAD.pack(len(words), block_words, pos) + b"".join(offsets) + b"".join(blocks), ids
+
+
+class StringPool:
+    """Reads words from a pool in a buffer, such as an mmap of the dictionary file."""
+
+    def __init__(self, buf, pos):
+        self.buf = buf
+        self.pos = pos
+        self.count, self.block_words, blocks_size = HEAD.unpack_from(buf, pos)
+        self.blocks = -(-self.count // self.block_words)
+        self.index = pos + HEAD.size
+        self.start = self.index + self.blocks * OFFSET.size
+        self.end = self.start + blocks_size  # where the nodes start
+        self._cache = OrderedDict()  # block number -> decoded words
+
+    def word(self, i):
+        """Get word number i."""
+        block, n = divmod(i, self.block_words)
+        words = self._cache.get(block)
+        if words is None:
+            words = self.decode(block)
+            if len(self._cache) >= BLOCK_CACHE:
+                # drop the oldest entry, unless another thread just did
+                try:
+                    self._cache.popitem(last=False)
+                except KeyError:
+                    pass
+            self._cache[block] = words
+        return words[n]
+
+    def decode(self, block):
+        """Decode every word in a block."""
+        buf = self.buf
+        (pos,) = OFFSET.unpack_from(buf, self.index + block * OFFSET.size)
+        pos += self.start
+        count = min(self.block_words, self.count - block * self.block_words)
+        words = []
+        prev = b""
+        for _ in range(count):
+            shared, pos = decode_varint(buf, pos)
+            size, pos = decode_varint(buf, pos)
+            prev = prev[:shared] + buf[pos : pos + size]
+            pos += size
+            words.append(prev.decode("utf-8"))
+        return words
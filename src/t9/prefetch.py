@@ -0,0 +1,131 @@
+"""Speculative lookups for PY9 T9 text input system.
+
+While the user is between keypresses, a Prefetcher looks up the words for
+the keys typed so far followed by each of the likeliest next digits, in a
+background thread. When the next key arrives its lookup is answered from
+memory, and whatever prefetching is left to do is cancelled.
+
+Prefetched words belong to the dictionary version they were looked up in,
+so a word added by another session or process since makes them stale.
+Prefetch lookups are counted under "prefetch" in the dictionary's stats,
+apart from the lookups typing needs.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# next digits to try, roughly by how often English letters are on each key
+DIGITS = "364782591"
+
+# threads shared by prefetchers that aren't given an executor
+THREADS = 4
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def shared_executor():
+    """Get the thread pool used by prefetchers that aren't given one."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=THREADS, thread_name_prefix="t9-prefetch")
+        return _executor
+
+
+class Prefetcher:
+    """The dictionary seen by a T9Input that prefetches.
+
+    Lookups are answered from the last prefetch when they can be, and go to
+    the wrapped dictionary otherwise. New words go straight to it.
+    """
+
+    def __init__(self, dictionary, count=len(DIGITS), executor=None, digits=DIGITS):
+        """Wrap a dictionary.
+
+        dictionary: T9Dict, or anything with its current(), getwords() and addword()
+        count: number of next digits to prefetch, from digits
+        executor: executor for prefetching (default: a shared thread pool)
+        digits: next digits in order of likelihood
+        """
+        self.dict = dictionary
+        self.digits = digits[:count]
+        self.executor = executor if executor is not None else shared_executor()
+        self._results = (None, {})  # (dictionary version, digit sequence -> words) from the last prefetch
+        self._cancel = None  # set to stop the running prefetch
+        self._future = None
+        self._lock = threading.Lock()  # counters are also updated by prefetching threads
+        self.hits = 0  # lookups answered from a prefetch
+        self.misses = 0  # lookups that went to the dictionary
+        self.lookups = 0  # lookups done by prefetching
+        self.cancelled = 0  # prefetches stopped before they were done
+
+    @property
+    def hit_rate(self):
+        """Fraction of lookups answered from a prefetch."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def as_dict(self):
+        """Get the counters as a dict."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "lookups": self.lookups,
+                "cancelled": self.cancelled,
+                "hit_rate": round(self.hit_rate, 4),
+            }
+
+    def _count(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def getwords(self, digits):
+        """Get possible words for a T9 digit sequence."""
+        version, results = self._results
+        words = results.get(digits)
+        if words is not None and version is not self.dict.current():
+            # the dictionary has changed since, maybe in another session or process
+            self._results = (None, {})
+            words = None
+        if words is None:
+            self._count("misses")
+            return self.dict.getwords(digits)
+        self._count("hits")
+        return list(words)
+
+    def addword(self, word):
+        """Add a word to the dictionary, forgetting prefetched words it could change."""
+        self.cancel()
+        self._results = (None, {})
+        return self.dict.addword(word)
+
+    def start(self, keys):
+        """Start looking up keys followed by each digit, replacing the last prefetch."""
+        self.cancel()
+        results = {}
+        self._results = (self.dict.current(), results)
+        cancel = self._cancel = threading.Event()
+        self._future = self.executor.submit(self._run, keys, results, cancel)
+
+    def _run(self, keys, results, cancel):
+        for d in self.digits:
+            if cancel.is_set():
+                self._count("cancelled")
+                return
+            results[keys + d] = self.dict.getwords(keys + d, op="prefetch")
+            self._count("lookups")
+
+    def cancel(self):
+        """Stop the running prefetch, keeping what it has found so far."""
+        if self._cancel is not None:
+            self._cancel.set()
+            if self._future.cancel():
+                self._count("cancelled")
+            self._cancel = None
+
+    def wait(self):
+        """Wait for the running prefetch to finish."""
+        if self._future is not None and not self._future.cancelled():
+            self._future.result()
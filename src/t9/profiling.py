@@ -0,0 +1,91 @@
+"""Profiling support for the PY9 command line."""
+
+import cProfile
+import pstats
+import re
+import tracemalloc
+from pathlib import Path
+
+# modules whose functions get their own section in the summary
+HOT_MODULES = re.compile(r"t9[/\\](maket9|key|dict)\.py$|t9[/\\]corpus[/\\]")
+
+
+def profile_paths(path):
+    """Get the (pstats, summary) output paths for a --profile argument."""
+    path = Path(path)
+    if path.suffix != ".pstats":
+        path = path.with_name(path.name + ".pstats")
+    return path, path.with_suffix(".txt")
+
+
+def format_function(key, row):
+    """Format one pstats row as a summary line."""
+    filename, line, name = key
+    _, calls, tottime, cumtime, _ = row
+    return f"{tottime:10.4f} {cumtime:10.4f} {calls:10d}  {Path(filename).name}:{line}({name})"
+
+
+def summarise(stats, peak, snapshot, top=15):
+    """Build the text summary of a profiled run.
+
+    peak and snapshot are None if tracing was stopped before the run ended.
+    """
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+    header = f"{'tottime':>10} {'cumtime':>10} {'calls':>10}  function"
+
+    if snapshot is None:
+        # the command stopped tracing itself
+        lines = ["Peak traced memory: not traced to the end", "", "Top allocation sites: not traced to the end"]
+    else:
+        lines = [f"Peak traced memory: {peak} bytes", "", "Top allocation sites:"]
+        for stat in snapshot.statistics("lineno")[:top]:
+            frame = stat.traceback[0]
+            lines.append(f"{stat.size:12d} bytes {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+
+    lines += ["", "Hottest t9 functions (maket9, key, dict, corpus):", header]
+    lines += [format_function(k, r) for k, r in rows if HOT_MODULES.search(k[0])][:top]
+
+    lines += ["", "Hottest functions overall:", header]
+    lines += [format_function(k, r) for k, r in rows[:top]]
+    return "\n".join(lines) + "\n"
+
+
+def run_profiled(func, path):
+    """Run func under cProfile and tracemalloc.
+
+    Writes a .pstats file and a .txt summary of peak memory, the top
+    allocation sites and the hottest functions.
+
+    Args:
+        func: callable to profile, taking no arguments
+        path: output path; .pstats is added if it isn't there already
+
+    Returns:
+        whatever func returns
+    """
+    stats_path, summary_path = profile_paths(path)
+    profiler = cProfile.Profile()
+
+    tracemalloc.start()
+    try:
+        result = profiler.runcall(func)
+    finally:
+        # the profile first, so it's kept whatever happens to tracing
+        profiler.dump_stats(str(stats_path))
+        peak = snapshot = None
+        if tracemalloc.is_tracing():
+            _, peak = tracemalloc.get_traced_memory()
+            snapshot = tracemalloc.take_snapshot().filter_traces(
+                (
+                    tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+                    tracemalloc.Filter(False, "<unknown>"),
+                )
+            )
+            tracemalloc.stop()
+
+        summary = summarise(pstats.Stats(profiler), peak, snapshot)
+        summary_path.write_text(summary, encoding="utf-8")
+        print(f"Profile written to {stats_path} and {summary_path}")
+
+    return result
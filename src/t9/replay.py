@@ -0,0 +1,282 @@
+"""Keypress log replay for PY9 T9 text input system.
+
+A log is a JSON lines file with one recorded session per line:
+
+    {"id": "s1", "keys": "43556R", "times": [0.0, 0.3, 0.5, 0.8, 1.1, 1.6]}
+
+keys are action keys as for T9Input.sendkeys(), and times, if given, are
+when each key was pressed in seconds. "text" and "mode" give the starting
+text and input mode. Each session is typed into its own T9Input, and the
+results are JSON lines in the same order:
+
+    {"id": "s1", "text": "hello", "keys": 6, "added": 0, "error": null}
+
+Words added by a session go into a private copy of the dictionary, which is
+put back as it was before the next session starts. Results don't depend on
+the order sessions run in, or how many worker processes share them.
+"""
+
+import bisect
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from .batch import read_chunks
+from .bench import PERCENTILES
+from .dict import T9Dict
+from .header import read_header
+from .input import T9Input
+from .stats import BUCKETS
+
+# decoded nodes kept by each sandbox dictionary
+CACHE_NODES = 1 << 16
+
+# input read per chunk, in bytes (rounded up to a whole line)
+CHUNK_BYTES = 1 << 18
+
+# chunks queued per worker before waiting for the oldest
+AHEAD = 2
+
+
+class Sandbox:
+    """A private copy of a dictionary that can be put back as it was.
+
+    addword() only appends nodes and rewrites the header, so truncating the
+    copy and writing back the original header undoes any number of words.
+    """
+
+    def __init__(self, dict_file, path):
+        """Copy dict_file to path and open the copy."""
+        self.path = str(path)
+        shutil.copyfile(dict_file, self.path)
+        with open(self.path, "rb") as f:
+            data = f.read(1 << 16)
+            self.head = data[: read_header(data).size]
+            self.size = os.fstat(f.fileno()).st_size
+        self.dict = self._open()
+
+    def _open(self):
+        # nobody else writes the copy, so there is no need to revalidate
+        return T9Dict(self.path, cache_size=CACHE_NODES, revalidate=None)
+
+    def reset(self):
+        """Undo every change since the copy was made.
+
+        Returns:
+            True if there was anything to undo
+        """
+        if os.path.getsize(self.path) == self.size:
+            return False
+        self.dict.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(self.size)
+            f.write(self.head)
+        self.dict = self._open()
+        return True
+
+    def close(self):
+        """Close and delete the copy."""
+        self.dict.close()
+        os.remove(self.path)
+
+
+class Totals:
+    """Counts and a per-key latency histogram over many replayed sessions.
+
+    Latencies are counted in the same buckets as T9Stats, so the totals stay
+    the same size however many keys are replayed.
+    """
+
+    def __init__(self):
+        self.sessions = 0
+        self.keys = 0
+        self.errors = 0
+        self.added = 0
+        self.histogram = [0] * (len(BUCKETS) + 1)  # keys by latency, the last over BUCKETS[-1]
+        self.latency = 0.0  # seconds taken by every key
+        self.slowest = 0.0
+
+    def key(self, seconds):
+        """Count the latency of one key."""
+        self.histogram[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.latency += seconds
+        if seconds > self.slowest:
+            self.slowest = seconds
+
+    def add(self, other):
+        """Add the totals from another Totals, such as a worker's."""
+        self.sessions += other.sessions
+        self.keys += other.keys
+        self.errors += other.errors
+        self.added += other.added
+        self.histogram = [a + b for a, b in zip(self.histogram, other.histogram)]
+        self.latency += other.latency
+        self.slowest = max(self.slowest, other.slowest)
+
+    def percentiles(self):
+        """Summarise the latencies in microseconds, each percentile as the upper bound of its bucket."""
+        count = sum(self.histogram)
+        if not count:
+            return {}
+        bounds = BUCKETS + (self.slowest,)
+        result = {}
+        for p in PERCENTILES:
+            rank = min(count, int(count * p / 100) + 1)
+            seen = 0
+            for bound, n in zip(bounds, self.histogram):
+                seen += n
+                if seen >= rank:
+                    result[f"p{p}_us"] = round(min(bound, self.slowest) * 1e6, 3)
+                    break
+        result["max_us"] = round(self.slowest * 1e6, 3)
+        result["mean_us"] = round(self.latency / count * 1e6, 3)
+        return result
+
+    def summary(self, seconds, workers=1):
+        """Summarise a replay that took seconds."""
+        return {
+            "sessions": self.sessions,
+            "keys": self.keys,
+            "errors": self.errors,
+            "added": self.added,
+            "workers": workers,
+            "seconds": round(seconds, 6),
+            "sessions_per_second": round(self.sessions / seconds, 1) if seconds else 0,
+            "keys_per_second": round(self.keys / seconds, 1) if seconds else 0,
+            "latency": self.percentiles(),
+            "histogram": {str(b): n for b, n in zip(BUCKETS + ("+Inf",), self.histogram)},
+        }
+
+
+class Replayer:
+    """Replays recorded sessions against a sandboxed dictionary."""
+
+    def __init__(self, dict_file, workdir, keydelay=0.5):
+        """Copy the dictionary into workdir.
+
+        dict_file: dictionary file to replay against
+        workdir: directory for the private copy
+        keydelay: key timeout in text modes, for every session
+        """
+        self.sandbox = Sandbox(dict_file, os.path.join(workdir, f"replay.{os.getpid()}.dict"))
+        self.keydelay = keydelay
+        self.totals = Totals()
+
+    def replay(self, session):
+        """Replay one session, given as a dict read from the log.
+
+        Returns:
+            the result dict
+        """
+        d = self.sandbox.dict
+        keys = session["keys"]
+        times = session.get("times")
+        result = {"id": session.get("id"), "text": None, "keys": len(keys), "added": 0, "error": None}
+        wordcount = d.wordcount
+        x = T9Input(d, session.get("text", ""), session.get("mode", 0), self.keydelay)
+        totals = self.totals
+        clock = time.perf_counter
+        try:
+            for i, key in enumerate(keys):
+                start = clock()
+                x.sendkeys(key if times is None else [(key, times[i])])
+                totals.key(clock() - start)
+        except Exception as e:
+            result["error"] = f"{type(e).__name__}: {e}"
+            totals.errors += 1
+        result["text"] = x.text()
+        result["added"] = d.wordcount - wordcount
+        self.sandbox.reset()
+
+        totals.sessions += 1
+        totals.keys += len(keys)
+        totals.added += result["added"]
+        return result
+
+    def run(self, infile, outfile):
+        """Replay every session of a binary log file, writing results to a binary output file.
+
+        Returns:
+            number of sessions replayed
+        """
+        count = 0
+        for line in infile:
+            line = line.strip()
+            if line:
+                result = self.replay(json.loads(line))
+                outfile.write(json.dumps(result, ensure_ascii=False).encode("utf-8") + b"\n")
+                count += 1
+        outfile.flush()
+        return count
+
+    def close(self):
+        """Delete the dictionary copy."""
+        self.sandbox.close()
+
+
+_replayer = None  # the worker's Replayer
+
+
+def _start_worker(dict_file, workdir, keydelay):
+    """Copy the dictionary in a new worker process."""
+    global _replayer
+    _replayer = Replayer(dict_file, workdir, keydelay)
+
+
+def _run_chunk(chunk):
+    """Replay a chunk of log lines in a worker.
+
+    Returns:
+        (output bytes, Totals for the chunk)
+    """
+    out = io.BytesIO()
+    _replayer.totals = Totals()
+    _replayer.run(io.BytesIO(chunk), out)
+    return out.getvalue(), _replayer.totals
+
+
+def run_replay(dict_file, infile, outfile, workers=1, keydelay=0.5, chunk_bytes=CHUNK_BYTES):
+    """Replay every session in a binary log file, writing results in order.
+
+    workers: worker processes (1 = replay in this process)
+
+    Returns:
+        a summary dict: sessions, keys, errors, words added, throughput and
+        per-key latency percentiles
+    """
+    workdir = tempfile.mkdtemp(prefix="t9-replay-")
+    start = time.perf_counter()
+    try:
+        if workers > 1:
+            totals = Totals()
+            pending = deque()
+
+            def write_oldest():
+                data, chunk_totals = pending.popleft().result()
+                outfile.write(data)
+                totals.add(chunk_totals)
+
+            initargs = (str(dict_file), workdir, keydelay)
+            with ProcessPoolExecutor(workers, initializer=_start_worker, initargs=initargs) as pool:
+                for chunk in read_chunks(infile, chunk_bytes):
+                    pending.append(pool.submit(_run_chunk, chunk))
+                    if len(pending) >= workers * AHEAD:
+                        write_oldest()
+                while pending:
+                    write_oldest()
+            outfile.flush()
+        else:
+            replayer = Replayer(str(dict_file), workdir, keydelay)
+            try:
+                replayer.run(infile, outfile)
+            finally:
+                replayer.close()
+            totals = replayer.totals
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return totals.summary(time.perf_counter() - start, workers)
@@ -0,0 +1,98 @@
+"""Asyncio lookup server for PY9 T9 text input system.
+
+Clients connect over a Unix socket or localhost TCP and send lines of
+keypresses (0-9, U/D/L/R/S). Each connection gets its own T9Input, all
+sharing one dictionary, and every line is answered with a JSON line:
+
+    {"display": "hello|", "text": "hello", "mode": 0}
+
+or, for servers started with diffs=True, with only what changed on the
+display since the last reply (see T9Input.diff()):
+
+    {"start": 5, "end": 12, "text": "|", "cursor": 5, "candidates": [], "mode": 0}
+
+Keypresses are handled in a thread pool so that dictionary file I/O never
+blocks the event loop, and new words are saved by a single writer task.
+"""
+
+import asyncio
+import json
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from .aio import AsyncT9Dict
+
+logger = logging.getLogger(__name__)
+
+
+class T9Server:
+    """Serves T9Input sessions that share one dictionary."""
+
+    def __init__(self, dict_file, workers=4, diffs=False):
+        """Open the shared dictionary.
+
+        dict_file: dictionary file, or an open T9Dict
+        workers: threads used for keypresses and dictionary lookups
+        diffs: reply with display changes instead of the whole display
+        """
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="t9")
+        self.adict = AsyncT9Dict(dict_file, self.executor)
+        self.dict = self.adict.dict
+        self.diffs = diffs
+        self.sessions = 0
+
+    def state(self, session):
+        """Get the reply for a session's current state."""
+        if self.diffs:
+            return session.diff().todict()
+        return {"display": session.gettext(), "text": session.text(), "mode": int(session.mode)}
+
+    async def handle(self, reader, writer):
+        """Run one client session until it disconnects."""
+        session = self.adict.session()
+        self.sessions += 1
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                keys = line.decode("utf-8").strip()
+                if keys:
+                    await self.adict.sendkeys(session, keys)
+                writer.write(json.dumps(self.state(session), ensure_ascii=False).encode("utf-8") + b"\n")
+                await writer.drain()
+        except ConnectionError:
+            pass
+        except Exception:
+            logger.exception("session failed")
+        finally:
+            self.sessions -= 1
+            writer.close()
+
+    async def start(self, path=None, host="127.0.0.1", port=0):
+        """Start listening on a Unix socket path, or on a TCP host and port.
+
+        Returns:
+            the asyncio.Server
+        """
+        if path:
+            return await asyncio.start_unix_server(self.handle, path)
+        return await asyncio.start_server(self.handle, host, port)
+
+    async def close(self):
+        """Finish queued writes, stop the worker threads and close the dictionary if it was opened here."""
+        await self.adict.close()
+        self.executor.shutdown()
+
+
+async def serve_forever(dict_file, path=None, host="127.0.0.1", port=9009, workers=4, diffs=False):
+    """Serve sessions until cancelled."""
+    server = T9Server(dict_file, workers, diffs)
+    try:
+        listener = await server.start(path, host, port)
+        where = path or ", ".join(str(s.getsockname()) for s in listener.sockets)
+        print(f"Serving {server.dict.file} on {where}")
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.close()
@@ -0,0 +1,131 @@
+"""Session pool for PY9 T9 text input system.
+
+A SessionPool keeps many T9Input sessions against one shared dictionary.
+Sessions that haven't had a keypress for a while are evicted to a snapshot
+of a few bytes (see T9Input.snapshot()) and restored on their next use, so
+a process can hold thousands of idle sessions cheaply.
+
+A SessionPool isn't thread-safe. Use it from one thread, or behind a lock.
+"""
+
+import itertools
+import os
+import time
+from collections import OrderedDict
+
+from .dict import T9Dict
+from .input import T9Input
+
+# decoded nodes kept by the shared dictionary
+CACHE_NODES = 1 << 16
+
+
+class SessionPool:
+    """T9Input sessions that share one dictionary, evicted when idle."""
+
+    def __init__(self, dict_file, idle=60.0, stats=None, clock=time.monotonic, prefetch=0):
+        """Open the shared dictionary.
+
+        dict_file: dictionary file, or an open T9Dict
+        idle: seconds without a keypress before evict() snapshots a session
+        stats: optional T9Stats shared by every session
+        clock: function giving the time in seconds, also used by the sessions
+        prefetch: number of likely next digits each session looks up between keypresses
+        """
+        self._owned = isinstance(dict_file, (str, os.PathLike))  # opened here, so closed by close_all()
+        if self._owned:
+            self.dict = T9Dict(str(dict_file), stats, cache_size=CACHE_NODES)
+        else:
+            self.dict = dict_file
+        self.idle = idle
+        self.stats = stats
+        self.clock = clock
+        self.prefetch = prefetch
+        self._live = OrderedDict()  # session id -> (last used, T9Input), least recently used first
+        self._snapshots = {}  # session id -> bytes, for evicted sessions
+        self._ids = itertools.count(1)
+
+    def __len__(self):
+        return len(self._live) + len(self._snapshots)
+
+    def __contains__(self, sid):
+        return sid in self._live or sid in self._snapshots
+
+    @property
+    def live(self):
+        """Number of sessions held as T9Input objects."""
+        return len(self._live)
+
+    @property
+    def evicted(self):
+        """Number of sessions held as snapshots."""
+        return len(self._snapshots)
+
+    def open(self, *args, **kwargs):
+        """Start a session.
+
+        Takes the same arguments as T9Input, apart from the dictionary, stats, clock and prefetch.
+
+        Returns:
+            the new session's id
+        """
+        sid = next(self._ids)
+        session = T9Input(self.dict, *args, stats=self.stats, clock=self.clock, prefetch=self.prefetch, **kwargs)
+        self._live[sid] = (self.clock(), session)
+        return sid
+
+    def get(self, sid):
+        """Get a session, restoring it if it was evicted, and mark it used.
+
+        Raises KeyError for unknown sessions.
+        """
+        entry = self._live.pop(sid, None)
+        if entry is not None:
+            session = entry[1]
+        else:
+            session = T9Input.restore(self.dict, self._snapshots.pop(sid), self.stats, self.clock, self.prefetch)
+        self._live[sid] = (self.clock(), session)
+        return session
+
+    def sendkeys(self, sid, keys):
+        """Send keys to a session, see T9Input.sendkeys()."""
+        return self.get(sid).sendkeys(keys)
+
+    def close(self, sid):
+        """End a session. Raises KeyError for unknown sessions."""
+        if self._live.pop(sid, None) is None:
+            del self._snapshots[sid]
+
+    def evict(self, idle=None):
+        """Snapshot every session that has been idle for idle seconds (default: self.idle).
+
+        Returns:
+            number of sessions evicted
+        """
+        if idle is None:
+            idle = self.idle
+        cutoff = self.clock() - idle
+        count = 0
+        while self._live:
+            sid, (used, session) = next(iter(self._live.items()))
+            if used > cutoff:
+                break
+            del self._live[sid]
+            if session.prefetcher is not None:
+                session.prefetcher.cancel()
+            self._snapshots[sid] = session.snapshot()
+            count += 1
+        return count
+
+    def close_all(self):
+        """End every session, and close the dictionary if it was opened here."""
+        self._live.clear()
+        self._snapshots.clear()
+        if self._owned:
+            self.dict.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close_all()
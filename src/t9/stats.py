@@ -0,0 +1,149 @@
+"""Opt-in instrumentation for PY9 T9 text input system.
+
+Pass a T9Stats to T9Dict or T9Input to count the work each call does.
+When no stats object is given nothing is counted or timed.
+"""
+
+import time
+
+# latency histogram bucket upper bounds, in seconds
+BUCKETS = (1e-6, 2e-6, 5e-6, 1e-5, 2e-5, 5e-5, 1e-4, 2e-4, 5e-4, 1e-3, 2e-3, 5e-3, 1e-2, 2e-2, 5e-2, 0.1)
+
+COUNTERS = ("opens", "seeks", "nodes", "cache_hits", "bytes_read", "bytes_written", "keys")
+
+
+class Call:
+    """Counters for a single instrumented call."""
+
+    __slots__ = ("op", "elapsed") + COUNTERS
+
+    def __init__(self, op):
+        self.op = op
+        self.elapsed = 0.0
+        self.opens = 0
+        self.seeks = 0
+        self.nodes = 0
+        self.cache_hits = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.keys = 0
+
+    def as_dict(self):
+        """Get the call's counters as a dict."""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class CountingFile:
+    """File wrapper that adds its seeks and bytes to a Call."""
+
+    def __init__(self, f, call):
+        self._f = f
+        self._call = call
+
+    def read(self, *args):
+        data = self._f.read(*args)
+        self._call.bytes_read += len(data)
+        return data
+
+    def readline(self, *args):
+        data = self._f.readline(*args)
+        self._call.bytes_read += len(data)
+        return data
+
+    def write(self, data):
+        self._call.bytes_written += len(data)
+        return self._f.write(data)
+
+    def seek(self, *args):
+        self._call.seeks += 1
+        return self._f.seek(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._f, name)
+
+
+class T9Stats:
+    """Per-operation counters, latency histograms and an optional hook.
+
+    hook: called as hook(call) after every instrumented call
+    """
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.reset()
+
+    def reset(self):
+        """Clear all counters and histograms."""
+        self.totals = {}  # op -> {"calls": n, counter: n, ...}
+        self.histograms = {}  # op -> bucket counts, with a final +Inf bucket
+        self.latency = {}  # op -> total seconds
+
+    def measure(self, op, func, *args):
+        """Run func(*args, call) and record the call under op."""
+        call = Call(op)
+        start = time.perf_counter()
+        try:
+            return func(*args, call)
+        finally:
+            call.elapsed = time.perf_counter() - start
+            self.record(call)
+
+    def record(self, call):
+        """Add a finished call to the totals."""
+        op = call.op
+        totals = self.totals.get(op)
+        if totals is None:
+            totals = self.totals[op] = dict.fromkeys(("calls",) + COUNTERS, 0)
+            self.histograms[op] = [0] * (len(BUCKETS) + 1)
+            self.latency[op] = 0.0
+
+        totals["calls"] += 1
+        for name in COUNTERS:
+            totals[name] += getattr(call, name)
+        self.latency[op] += call.elapsed
+
+        histogram = self.histograms[op]
+        for i, bound in enumerate(BUCKETS):
+            if call.elapsed <= bound:
+                histogram[i] += 1
+                break
+        else:
+            histogram[-1] += 1
+
+        if self.hook is not None:
+            self.hook(call)
+
+    def open(self, file, mode, call):
+        """Open a file whose activity is counted against call."""
+        call.opens += 1
+        return CountingFile(open(file, mode), call)
+
+    def as_dict(self):
+        """Export everything recorded so far as a plain dict."""
+        return {
+            op: dict(
+                totals,
+                seconds=self.latency[op],
+                histogram={str(b): n for b, n in zip(BUCKETS + ("+Inf",), self.histograms[op])},
+            )
+            for op, totals in self.totals.items()
+        }
+
+    def prometheus(self, prefix="t9"):
+        """Export everything recorded so far in Prometheus text format."""
+        lines = []
+        for name in ("calls",) + COUNTERS:
+            lines.append(f"# TYPE {prefix}_{name}_total counter")
+            for op, totals in self.totals.items():
+                lines.append(f'{prefix}_{name}_total{{op="{op}"}} {totals[name]}')
+
+        lines.append(f"# TYPE {prefix}_latency_seconds histogram")
+        for op, histogram in self.histograms.items():
+            count = 0
+            for bound, n in zip(BUCKETS + ("+Inf",), histogram):
+                count += n
+                lines.append(f'{prefix}_latency_seconds_bucket{{op="{op}",le="{bound}"}} {count}')
+            lines.append(f'{prefix}_latency_seconds_sum{{op="{op}"}} {self.latency[op]}')
+            lines.append(f'{prefix}_latency_seconds_count{{op="{op}"}} {count}')
+
+        return "\n".join(lines) + "\n"
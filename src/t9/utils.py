@@ -8,13 +8,14 @@ from pathlib import Path
 from .constants import ALLKEYS
 
 
-def getkey(word):
-    """Convert a word to T9 keypress sequence.
+# character -> key digit, filled in by getkey() as characters are seen
+_KEYS = {}
 
-    Example: "hello" -> "43556"
-    """
-    result = ""
-    for char in word:
+
+def charkey(char):
+    """Get the key digit for one character ("1" for anything not on a key)."""
+    digit = _KEYS.get(char)
+    if digit is None:
         digit = "1"  # Default to punctuation key
         char_upper = char.upper()
 
@@ -23,8 +24,20 @@ def getkey(word):
                 digit = str(key_num)
                 break
 
-        result += digit
-    return result
+        _KEYS[char] = digit
+    return digit
+
+
+def getkey(word):
+    """Convert a word to T9 keypress sequence.
+
+    Example: "hello" -> "43556"
+    """
+    keys = _KEYS
+    try:
+        return "".join([keys[char] for char in word])
+    except KeyError:
+        return "".join([charkey(char) for char in word])
 
 
 def read_wordlist(filename):
@@ -4,6 +4,27 @@ import pytest
 from pathlib import Path
 
 
+def pytest_addoption(parser):
+    """Add options for the performance regression suite."""
+    parser.addoption("--perf", action="store_true", help="Run the performance regression tests in tests/perf")
+    parser.addoption("--perf-update", action="store_true", help="Rewrite the stored performance baselines")
+
+
+def pytest_configure(config):
+    """Register custom markers."""
+    config.addinivalue_line("markers", "perf: performance regression test, only run with --perf")
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skip performance tests unless they were asked for."""
+    if config.getoption("--perf") or config.getoption("--perf-update"):
+        return
+    skip = pytest.mark.skip(reason="performance test, use --perf to run")
+    for item in items:
+        if "perf" in item.keywords:
+            item.add_marker(skip)
+
+
 @pytest.fixture
 def test_data_dir():
     """Get the test data directory path."""
@@ -0,0 +1,143 @@
+"""Fixtures for the performance regression suite.
+
+Each workload is measured and compared against its entry in baseline.json.
+Times are divided by a fixed calibration loop so that one baseline works
+across machines, while node loads and bytes read are exact counts that
+catch I/O regressions even when the clock is noisy.
+
+Run with ``pytest --perf tests/perf``, and rewrite the baseline after an
+intentional change with ``pytest --perf-update tests/perf``.
+"""
+
+import itertools
+import json
+import time
+import tracemalloc
+from pathlib import Path
+
+import pytest
+
+from t9 import maket9
+from t9.utils import get_wordlists_dir, read_wordlist
+
+BASELINE = Path(__file__).parent / "baseline.json"
+
+# how much a metric may grow over its baseline before the test fails
+TOLERANCE = {
+    "time": 2.0,
+    "peak_bytes": 1.25,
+}
+# exact counts only fail on growth
+DEFAULT_TOLERANCE = 1.0
+
+# words in the build workload's wordlist
+BUILD_WORDS = 10000
+
+
+@pytest.fixture(scope="session")
+def calibration():
+    """Time a fixed pure Python loop, used to normalise workload times."""
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        d = {}
+        for i in range(200000):
+            d[i % 1000] = str(i)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+@pytest.fixture
+def timed(calibration):
+    """Run a workload and return its best time relative to the calibration."""
+
+    def run(workload, repeat=3):
+        best = float("inf")
+        for _ in range(repeat):
+            start = time.perf_counter()
+            workload()
+            best = min(best, time.perf_counter() - start)
+        return round(best / calibration, 4)
+
+    return run
+
+
+@pytest.fixture
+def peak():
+    """Run a workload under tracemalloc and return its peak traced memory."""
+
+    def run(workload):
+        tracemalloc.start()
+        try:
+            workload()
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    return run
+
+
+@pytest.fixture(scope="session")
+def baseline(request):
+    """Load the stored baselines, writing them back in update mode."""
+    data = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    yield data
+    if request.config.getoption("--perf-update"):
+        BASELINE.write_text(json.dumps(data, indent=2, sort_keys=True) + "\n")
+
+
+@pytest.fixture
+def check_baseline(request, baseline):
+    """Compare a workload's metrics to the baseline, or store them."""
+
+    def check(name, metrics):
+        if request.config.getoption("--perf-update"):
+            baseline[name] = metrics
+            return
+
+        assert name in baseline, f"No baseline for {name}, run pytest --perf-update tests/perf"
+        failures = []
+        for metric, value in metrics.items():
+            expected = baseline[name].get(metric)
+            if expected is None:
+                continue
+            limit = expected * TOLERANCE.get(metric, DEFAULT_TOLERANCE)
+            if value > limit:
+                failures.append(f"{metric}: {value} > {limit} (baseline {expected})")
+        assert not failures, f"{name} regressed: " + ", ".join(failures)
+
+    return check
+
+
+@pytest.fixture
+def perf_words(test_data_dir):
+    """Every distinct word in the test data wordlists, in a stable order."""
+    words = set()
+    for path in sorted(test_data_dir.glob("*.txt")):
+        words.update(w.strip() for w in path.read_text(encoding="utf-8").splitlines() if w.strip())
+    return sorted(words)
+
+
+@pytest.fixture
+def perf_wordlist(perf_words, tmp_path):
+    """A wordlist combining all of the test data wordlists."""
+    path = tmp_path / "perf.txt"
+    path.write_text("\n".join(perf_words) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def build_wordlist(tmp_path):
+    """The most frequent words of the shipped en-US wordlist, enough for a build to take a while."""
+    path = tmp_path / "build.txt"
+    words = itertools.islice(read_wordlist(get_wordlists_dir() / "en-US.words.gz"), BUILD_WORDS)
+    path.write_text("\n".join(words) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def perf_dict(perf_wordlist, tmp_path):
+    """A dictionary built from the combined test data wordlist."""
+    path = tmp_path / "perf.dict"
+    maket9.makedict(str(perf_wordlist), str(path), "Perf", "Performance test dictionary")
+    return path
@@ -0,0 +1,138 @@
+"""Performance regression tests for deterministic workloads."""
+
+import random
+import shutil
+
+import pytest
+
+from t9 import maket9
+from t9.bench import corpus_keys, new_words
+from t9.dict import T9Dict
+from t9.input import T9Input
+from t9.stats import T9Stats
+from t9.utils import getkey
+
+pytestmark = pytest.mark.perf
+
+LOOKUPS = 100000
+INSERTS = 2000
+
+# decoded nodes kept by the cached lookup workload
+CACHE_NODES = 1 << 12
+
+
+def lookup_keys(words, count, seed=9):
+    """Key sequences for whole words and their prefixes, sampled with a fixed seed."""
+    keys = sorted({getkey(w)[:n] for w in words for n in range(1, len(w) + 1)})
+    rng = random.Random(seed)
+    return [rng.choice(keys) for _ in range(count)]
+
+
+def counted(stats, op, per):
+    """Get the totals recorded for op as averages per lookup, insert or key."""
+    totals = stats.as_dict()[op]
+    return {name: round(totals[name] / per, 4) for name in ("nodes", "bytes_read", "bytes_written")}
+
+
+def test_build(build_wordlist, tmp_path, timed, peak, check_baseline):
+    """Build a dictionary from the most frequent 10k words of a shipped wordlist."""
+    output = tmp_path / "build.dict"
+
+    def build():
+        maket9.makedict(str(build_wordlist), str(output), "Perf", "")
+
+    check_baseline(
+        "build",
+        {
+            "time": timed(build, repeat=5),
+            "peak_bytes": peak(build),
+            "file_bytes": output.stat().st_size,
+        },
+    )
+
+
+def test_lookups(perf_dict, perf_words, timed, peak, check_baseline):
+    """Look up 100k key sequences in one dictionary."""
+    keys = lookup_keys(perf_words, LOOKUPS)
+    d = T9Dict(str(perf_dict))
+
+    def lookups(keys=keys):
+        for k in keys:
+            d.getwords(k)
+
+    time = timed(lookups, repeat=1)
+    memory = peak(lambda: lookups(keys[:10000]))
+
+    stats = T9Stats()
+    d = T9Dict(str(perf_dict), stats)
+    lookups()
+    io = counted(stats, "getwords", LOOKUPS)
+
+    # nodes decoded with a node cache, so cache misses
+    stats = T9Stats()
+    d = T9Dict(str(perf_dict), stats, cache_size=CACHE_NODES)
+    lookups()
+    cached = counted(stats, "getwords", LOOKUPS)
+    check_baseline(
+        "lookups",
+        {
+            "time": time,
+            "peak_bytes": memory,
+            "nodes_per_lookup": io["nodes"],
+            "bytes_per_lookup": io["bytes_read"],
+            "cached_nodes_per_lookup": cached["nodes"],
+        },
+    )
+
+
+def test_inserts(perf_dict, perf_words, tmp_path, timed, peak, check_baseline):
+    """Add a batch of new words to a copy of the dictionary."""
+    words = new_words(perf_words, INSERTS, seed=9)
+    scratch = tmp_path / "scratch.dict"
+
+    def inserts(stats=None):
+        shutil.copyfile(perf_dict, scratch)
+        d = T9Dict(str(scratch), stats)
+        for word in words:
+            d.addword(word)
+
+    time = timed(inserts)
+    memory = peak(inserts)
+
+    stats = T9Stats()
+    inserts(stats)
+    io = counted(stats, "addword", INSERTS)
+    check_baseline(
+        "inserts",
+        {
+            "time": time,
+            "peak_bytes": memory,
+            "nodes_per_insert": io["nodes"],
+            "bytes_read_per_insert": io["bytes_read"],
+            "file_bytes_per_insert": round((scratch.stat().st_size - perf_dict.stat().st_size) / INSERTS, 4),
+        },
+    )
+
+
+def test_sendkeys(perf_dict, perf_words, tmp_path, timed, check_baseline):
+    """Type the test data words through the input parser."""
+    keys = corpus_keys(" ".join(perf_words * 20))
+    scratch = tmp_path / "scratch.dict"
+
+    def typing(stats=None):
+        shutil.copyfile(perf_dict, scratch)
+        T9Input(str(scratch), stats=stats).sendkeys(keys)
+
+    time = timed(typing)
+
+    stats = T9Stats()
+    typing(stats)
+    io = counted(stats, "getwords", len(keys))
+    check_baseline(
+        "sendkeys",
+        {
+            "time": time,
+            "nodes_per_key": io["nodes"],
+            "bytes_per_key": io["bytes_read"],
+        },
+    )
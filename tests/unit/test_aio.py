@@ -0,0 +1,119 @@
+"""Tests for the asyncio dictionary and input API."""
+
+import asyncio
+
+import pytest
+from t9 import maket9
+from t9.aio import AsyncT9Dict
+from t9.dict import T9Dict
+from t9.utils import getkey
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+def test_getwords_and_addword(test_dict_path):
+    """Test lookups and writes from a coroutine."""
+
+    async def run():
+        async with AsyncT9Dict(test_dict_path) as d:
+            assert "hello" in await d.getwords("43556")
+            await d.addword("newword")
+            assert "newword" in await d.getwords("6399673")
+            with pytest.raises(KeyError):
+                await d.addword("hello")
+
+    asyncio.run(run())
+    assert "newword" in T9Dict(str(test_dict_path)).getwords("6399673")
+
+
+def test_concurrent_writes_are_serialized(test_dict_path):
+    """Test many concurrent addword calls all land."""
+    words = [f"word{c}" for c in "abcdefghij"]
+
+    async def run():
+        async with AsyncT9Dict(test_dict_path) as d:
+            await asyncio.gather(*(d.addword(w) for w in words))
+            return d.dict.wordcount
+
+    count = T9Dict(str(test_dict_path)).wordcount
+    assert asyncio.run(run()) == count + len(words)
+    d = T9Dict(str(test_dict_path))
+    for w in words:
+        assert w in d.getwords(getkey(w))
+
+
+def test_sessions_share_one_dictionary(test_dict_path):
+    """Test sessions type through the shared dictionary, queueing new words."""
+
+    async def run():
+        async with AsyncT9Dict(test_dict_path) as d:
+            a = d.session()
+            b = d.session()
+            assert a.dict.dict is b.dict.dict is d.dict
+
+            await d.sendkeys(a, "43556")
+            await b.asendkeys("46")
+            assert a.gettext() == "[hello]"
+            assert b.gettext() == "[go]"
+
+            # spell "ho", which isn't in the dictionary, so accepting it writes it
+            await d.sendkeys(b, "UURR")
+            assert b.text() == "ho"
+            assert await d.getwords("46") == ["go", "ho"]
+
+    asyncio.run(run())
+    assert T9Dict(str(test_dict_path)).getwords("46") == ["go", "ho"]
+
+
+def test_session_addword_errors(test_dict_path):
+    """Test a session's failed write reaches the session, and can't wait on the event loop."""
+
+    async def run():
+        async with AsyncT9Dict(test_dict_path) as d:
+            session = d.session()
+            loop = asyncio.get_running_loop()
+            with pytest.raises(KeyError):
+                await loop.run_in_executor(None, session.dict.addword, "hello")
+            with pytest.raises(RuntimeError):
+                session.dict.addword("newword")
+
+    asyncio.run(run())
+
+
+def test_close_leaves_callers_dictionary_open(test_dict_path):
+    """Test close() only closes a dictionary AsyncT9Dict opened itself."""
+    shared = T9Dict(str(test_dict_path))
+
+    async def run(dict_file):
+        async with AsyncT9Dict(dict_file) as d:
+            await d.getwords("4")
+            return d.dict
+
+    asyncio.run(run(shared))
+    assert not shared._version.mapping.mm.closed
+    assert shared.getwords("46") == ["go"]
+    opened = asyncio.run(run(test_dict_path))
+    assert opened._version.mapping.mm.closed
+
+
+def test_session_with_prefetch(test_dict_path):
+    """Test a session that prefetches types through the shared dictionary."""
+
+    async def run():
+        async with AsyncT9Dict(test_dict_path) as d:
+            session = d.session(prefetch=3)
+            plain = d.session()
+            for key in "43556":
+                session.prefetcher.wait()
+                await d.sendkeys(session, key)
+                await d.sendkeys(plain, key)
+                assert session.gettext() == plain.gettext()
+            assert session.prefetcher.hits > 0
+
+    asyncio.run(run())
@@ -0,0 +1,45 @@
+"""Tests for process pool batch lookups."""
+
+import io
+
+import pytest
+from t9 import maket9
+from t9.batch import read_chunks, run_batch
+from t9.lookup import Lookup
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+def test_read_chunks_whole_lines():
+    """Test chunks always end on a line break, apart from the last one."""
+    data = b"".join(b"%d\n" % n for n in range(1000)) + b"43556"
+    chunks = list(read_chunks(io.BytesIO(data), 64))
+    assert len(chunks) > 1
+    assert all(c.endswith(b"\n") for c in chunks[:-1])
+    assert b"".join(chunks) == data
+
+
+@pytest.mark.parametrize("fmt", ["tsv", "jsonl"])
+def test_same_output_as_lookup(test_dict_path, fmt):
+    """Test the pool gives the same output, in the same order, as a single process."""
+    text = "".join(f"{k}\n" for k in ["43556", "46", "4", "22899", "1", "abc", ""] * 50).encode()
+    expected = io.BytesIO()
+    Lookup(test_dict_path, top=2, match=True, fmt=fmt).run(io.BytesIO(text), expected)
+
+    out = io.BytesIO()
+    count = run_batch(test_dict_path, io.BytesIO(text), out, 2, top=2, match=True, fmt=fmt, chunk_bytes=100)
+    assert count == 350
+    assert out.getvalue() == expected.getvalue()
+
+
+def test_empty_input(test_dict_path):
+    """Test empty input gives no output."""
+    out = io.BytesIO()
+    assert run_batch(test_dict_path, io.BytesIO(b""), out, 2) == 0
+    assert out.getvalue() == b""
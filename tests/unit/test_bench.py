@@ -0,0 +1,48 @@
+"""Tests for the benchmark suite."""
+
+import json
+import tracemalloc
+
+from t9.bench import bench_makedict, corpus_keys, new_words, percentiles, run_bench, sample_words
+
+
+def test_percentiles():
+    """Test percentiles are reported in microseconds."""
+    result = percentiles([i / 1e6 for i in range(1, 101)])
+    assert result["p50_us"] == 51
+    assert result["p99_us"] == 100
+    assert result["max_us"] == 100
+
+
+def test_sampling_is_reproducible():
+    """Test the same seed samples the same workload."""
+    words = ["he", "hell", "hello", "help", "world"]
+    assert sample_words(words, 20, 1) == sample_words(words, 20, 1)
+    assert not set(new_words(words, 10, 1)) & set(words)
+
+
+def test_corpus_keys():
+    """Test text is typed as digits with a space after each word."""
+    assert corpus_keys("hello world") == "435560967530"
+
+
+def test_run_bench_is_json(test_data_dir):
+    """Test a small benchmark run produces every section as JSON."""
+    results = run_bench(test_data_dir / "branches.txt", lookups=20, inserts=5)
+    for section in ("makedict", "getwords", "addword", "sendkeys"):
+        assert section in results
+    assert results["getwords"]["lookups"] == 20
+    assert results["getwords"]["per_lookup"]["cold_faults"] >= 0
+    assert results["addword"]["words"] == 5
+    json.dumps(results)
+
+
+def test_bench_makedict_keeps_tracing(test_data_dir, tmp_path):
+    """Test a build measured while something else is tracing leaves it tracing."""
+    tracemalloc.start()
+    try:
+        result = bench_makedict(test_data_dir / "branches.txt", tmp_path / "test.dict")
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
+    assert result["peak_bytes"] > 0
@@ -0,0 +1,57 @@
+"""Tests for block-compressed dictionaries."""
+
+import io
+
+import pytest
+from t9 import blocks, maket9
+from t9.dict import T9Dict
+from t9.utils import getkey, read_wordlist
+
+
+@pytest.fixture(params=["zlib", "lzma"])
+def compressed_dict_path(request, test_data_dir, tmp_path, monkeypatch):
+    """Create a compressed test dictionary from branches.txt, in small blocks."""
+    monkeypatch.setattr(blocks, "BLOCK_BYTES", 64)
+    monkeypatch.setattr(blocks, "BLOCK_CACHE", 2)
+    dict_path = tmp_path / "compressed.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test", compress=request.param)
+    return dict_path
+
+
+def test_compressed_lookups(compressed_dict_path, test_data_dir):
+    """Test every word can be looked up, with blocks evicted and decompressed again."""
+    d = T9Dict(str(compressed_dict_path))
+    reader = d._version.mapping.blocks
+    assert len(reader.starts) > 3
+    assert d.comment == "Test"
+    for _ in range(2):
+        for word in read_wordlist(test_data_dir / "branches.txt"):
+            assert word in d.getwords(getkey(word))
+
+
+def test_same_results_as_uncompressed(compressed_dict_path, test_data_dir, tmp_path):
+    """Test lookups give the same results, including lookahead and lookbehind."""
+    plain_path = tmp_path / "plain.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(plain_path), "Test", "Test")
+    plain = T9Dict(str(plain_path))
+    compressed = T9Dict(str(compressed_dict_path))
+    assert compressed.rootpos == plain.rootpos
+    for digits in ["4", "43", "435", "4355", "43556", "435561", "22899", "1", "9999"]:
+        assert compressed.getwords(digits) == plain.getwords(digits)
+
+
+def test_compressed_pooled(test_data_dir, tmp_path):
+    """Test compression and a string pool work together."""
+    dict_path = tmp_path / "both.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), pool=True, compress="zlib")
+    d = T9Dict(str(dict_path))
+    for word in read_wordlist(test_data_dir / "branches.txt"):
+        assert word in d.getwords(getkey(word))
+
+
+def test_compressed_is_read_only(compressed_dict_path):
+    """Test adding a word to a compressed dictionary is refused, leaving the file alone."""
+    before = compressed_dict_path.read_bytes()
+    with pytest.raises(io.UnsupportedOperation):
+        T9Dict(str(compressed_dict_path)).addword("gekk")
+    assert compressed_dict_path.read_bytes() == before
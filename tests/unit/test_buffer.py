@@ -0,0 +1,70 @@
+"""Tests for the gap buffer behind T9Input."""
+
+from t9.buffer import TextBuffer
+
+
+def test_insert_and_move():
+    """Test edits at the cursor and cursor moves."""
+    b = TextBuffer("hello")
+    b.insert(" world")
+    assert (b.before, b.after, b.cursor) == ("hello world", "", 11)
+
+    for _ in range(6):
+        b.left()
+    b.insert(",")
+    assert (b.before, b.after) == ("hello,", " world")
+    assert (b.charbefore(), b.charafter()) == (",", " ")
+
+    b.right()
+    assert b.backspace() == " "
+    b.insertafter("big ")
+    assert str(b) == "hello,big world"
+    assert len(b) == 15
+
+
+def test_ends():
+    """Test moves and deletes at either end do nothing."""
+    b = TextBuffer()
+    b.left()
+    b.right()
+    assert b.backspace() == ""
+    assert (b.charbefore(), b.charafter()) == ("", "")
+    assert str(b) == ""
+
+
+def test_take_words():
+    """Test taking the word either side of the cursor stops at a space."""
+    b = TextBuffer("one two", " three four")
+    assert b.takewordbefore() == "two"
+    assert b.before == "one "
+    assert b.takewordafter() == ""
+    b.right()
+    assert b.takewordafter() == "three"
+    assert b.after == " four"
+
+
+def test_replace_and_assign():
+    """Test replacing the last character, and assigning whole strings."""
+    b = TextBuffer("cat")
+    b.replacebefore("r")
+    assert b.before == "car"
+    b.before = "bus"
+    b.after = "stop"
+    assert str(b) == "busstop"
+    assert b.charafter() == "s"
+
+
+def test_changes():
+    """Test edits record how much text either side of them is unchanged."""
+    b = TextBuffer("hello", " world")
+    assert b.changes() == (11, 11)
+    b.insert("!")
+    assert b.changes() == (5, 6)
+    b.left()
+    b.left()
+    assert b.changes() == (12, 12)
+    b.backspace()
+    b.insertafter("X")
+    assert b.changes() == (3, 8)
+    assert b.text(2, 6) == "lXo!"
+    assert b.text(0, len(b)) == str(b) == "helXo! world"
@@ -0,0 +1,18 @@
+"""Tests for the command line subcommands."""
+
+from t9 import maket9
+from t9.cli import dict_reorder
+
+
+def test_reorder_compressed(test_data_dir, tmp_path, capsys):
+    """Test reordering a compressed dictionary prints why it can't, instead of a traceback."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test", compress="zlib")
+    frequencies = tmp_path / "frequencies.txt"
+    frequencies.write_text("go 10\n", encoding="utf-8")
+    original = dict_path.read_bytes()
+    capsys.readouterr()
+
+    assert dict_reorder(dict_path, frequencies) == 1
+    assert "compressed" in capsys.readouterr().out
+    assert dict_path.read_bytes() == original
@@ -0,0 +1,198 @@
+"""Stress tests for sharing one dictionary between threads."""
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+import t9.dict
+from t9 import maket9
+from t9.bench import new_words
+from t9.dict import T9Dict
+from t9.utils import getkey, read_wordlist
+
+READERS = 4
+WRITES = 200
+
+
+@pytest.fixture(params=[0, 1000], ids=["uncached", "cached"])
+def shared_dict(request, test_data_dir, tmp_path):
+    """A dictionary built from branches.txt, shared by every thread."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return T9Dict(str(dict_path), cache_size=request.param)
+
+
+def test_readers_and_writer(shared_dict, test_data_dir):
+    """Test readers always see a consistent dictionary while a writer adds words."""
+    original = list(read_wordlist(test_data_dir / "branches.txt"))
+    added = new_words(original, WRITES, seed=33)
+    done = threading.Event()
+    errors = []
+
+    def reader(n):
+        try:
+            seen = 0
+            while not done.is_set() or seen == 0:
+                for word in original:
+                    assert word in shared_dict.getwords(getkey(word))
+                # anything already published must stay visible
+                for word in added[: shared_dict.wordcount - len(original)]:
+                    assert word in shared_dict.getwords(getkey(word))
+                seen += 1
+        except Exception as e:
+            errors.append(e)
+
+    def writer():
+        try:
+            for word in added:
+                shared_dict.addword(word)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            done.set()
+
+    threads = [threading.Thread(target=reader, args=(n,)) for n in range(READERS)]
+    threads.append(threading.Thread(target=writer))
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert shared_dict.wordcount == len(original) + WRITES
+    fresh = T9Dict(shared_dict.file)
+    for word in original + added:
+        assert word in fresh.getwords(getkey(word))
+
+
+def test_concurrent_writers_are_serialized(shared_dict, test_data_dir):
+    """Test writes from several threads don't lose each other's words."""
+    original = list(read_wordlist(test_data_dir / "branches.txt"))
+    added = new_words(original, 100, seed=34)
+    errors = []
+
+    def writer(words):
+        try:
+            for word in words:
+                shared_dict.addword(word)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=writer, args=(added[n::4],)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert not errors
+    assert shared_dict.wordcount == len(original) + len(added)
+    for word in added:
+        assert word in shared_dict.getwords(getkey(word))
+
+
+def add_words(dict_file, words):
+    """Add words from another process."""
+    d = T9Dict(dict_file)
+    for word in words:
+        d.addword(word)
+
+
+@pytest.fixture
+def dict_file(test_data_dir, tmp_path):
+    """A dictionary file built from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return str(dict_path)
+
+
+@pytest.mark.parametrize("extended", [True, False], ids=["generation", "legacy"])
+def test_other_writer_seen(dict_file, test_data_dir, tmp_path, monkeypatch, extended):
+    """Test a reader picks up a word added through another open dictionary."""
+    if not extended:
+        monkeypatch.setattr(maket9, "new_generation", lambda: None)
+        maket9.makedict(str(test_data_dir / "branches.txt"), dict_file, "Test", "Test")
+    reader = T9Dict(dict_file, cache_size=1000)
+    writer = T9Dict(dict_file)
+    assert "zzzz" not in reader.getwords("9999")
+
+    writer.addword("zzzz")
+    assert reader.getwords("9999") == ["zzzz"]
+    assert reader.wordcount == writer.wordcount
+
+    # and the other way round: the writer builds on the reader's word
+    reader.addword("wwww")
+    writer.addword("yyyy")
+    assert reader.getwords("9999") == ["zzzz", "wwww", "yyyy"]
+
+
+def test_revalidate_interval(dict_file):
+    """Test readers only check for other writers as often as asked."""
+    reader = T9Dict(dict_file, revalidate=None)
+    T9Dict(dict_file).addword("zzzz")
+    assert "zzzz" not in reader.getwords("9999")
+
+    reader.reload()
+    assert reader.getwords("9999") == ["zzzz"]
+
+    reader = T9Dict(dict_file, revalidate=3600)
+    T9Dict(dict_file).addword("yyyy")
+    assert reader.getwords("9999") == ["zzzz"]
+
+
+def test_rebuilt_file_seen(dict_file, test_data_dir, tmp_path, monkeypatch):
+    """Test a reader moves to a rebuilt file, while lookups on the old one stay valid."""
+    monkeypatch.setattr(t9.dict, "REPLACED_INTERVAL", 0)
+    reader = T9Dict(dict_file)
+    assert "hello" in reader.getwords("43556")
+    # a lookup still using the old file
+    old = reader._acquire()
+
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("zzzz\n")
+    maket9.makedict(str(wordlist), dict_file, "Test", "Rebuilt")
+
+    assert reader.getwords("9999") == ["zzzz"]
+    assert reader.wordcount == 1
+    assert reader.comment == "Rebuilt"
+    # the old file stays mapped for the lookup, and is closed when it's done
+    assert old.mapping.mm[:8] == b"PY9DICT:"
+    old.mapping.release()
+    assert old.mapping.mm.closed
+
+
+def test_reload_closes_old_file(dict_file):
+    """Test reloading doesn't leave the old file open."""
+    reader = T9Dict(dict_file)
+    mappings = []
+    for _ in range(5):
+        mappings.append(reader._version.mapping)
+        reader.reload()
+        assert "hello" in reader.getwords("43556")
+    assert all(m.f.closed and m.mm.closed for m in mappings)
+    assert not reader._version.mapping.f.closed
+
+
+@pytest.mark.parametrize("revalidate", [0.0, None])
+def test_use_after_close(dict_file, revalidate):
+    """Test lookups and writes on a closed dictionary fail clearly, instead of spinning."""
+    d = T9Dict(dict_file, revalidate=revalidate)
+    d.close()
+    for call in (lambda: d.getwords("43556"), lambda: d.getmany(["4"]), lambda: d.addword("abu")):
+        with pytest.raises(ValueError, match="is closed"):
+            call()
+
+
+def test_writers_in_processes(dict_file, test_data_dir):
+    """Test writers in separate processes don't lose each other's words."""
+    original = list(read_wordlist(test_data_dir / "branches.txt"))
+    added = new_words(original, 80, seed=34)
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(4, mp_context=context) as pool:
+        for future in [pool.submit(add_words, dict_file, added[n::4]) for n in range(4)]:
+            future.result()
+
+    d = T9Dict(dict_file)
+    assert d.wordcount == len(original) + len(added)
+    for word in original + added:
+        assert word in d.getwords(getkey(word))
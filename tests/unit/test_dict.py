@@ -1,8 +1,11 @@
 """Comprehensive tests for dictionary operations targeting all code branches."""
 
+import itertools
+
 import pytest
 from t9 import maket9
 from t9.dict import T9Dict
+from t9.key import MAX_WORDS
 
 
 @pytest.fixture
@@ -125,6 +128,27 @@ def test_add_duplicate_word_raises_error(test_dict_path):
         d.addword("hello")  # Should already exist in branches.txt
 
 
+@pytest.mark.parametrize("wide", [False, True])
+def test_add_word_to_full_node(tmp_path, wide):
+    """Test a node already holding MAX_WORDS words only takes more in a wide dictionary."""
+    words = ["".join(w) for w in itertools.product("abc", repeat=10)][: MAX_WORDS + 1]
+    wordlist_path = tmp_path / "words.txt"
+    wordlist_path.write_text("\n".join(words[:-1]) + "\n", encoding="utf-8")
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(wordlist_path), str(dict_path), "Test", "Test", wide=wide)
+    original = dict_path.read_bytes()
+
+    d = T9Dict(str(dict_path))
+    if wide:
+        d.addword(words[-1])
+        assert T9Dict(str(dict_path)).getwords("2" * 10) == words
+    else:
+        with pytest.raises(ValueError, match="wide"):
+            d.addword(words[-1])
+        assert dict_path.read_bytes() == original
+        assert d.wordcount == MAX_WORDS
+
+
 def test_delete_word_not_implemented(test_dict_path):
     """Test that delete word raises NotImplementedError."""
     d = T9Dict(str(test_dict_path))
@@ -187,8 +211,7 @@ def test_complex_word_addition_nested_nodes(test_dict_path):
 def test_word_addition_node_position_update(test_dict_path):
     """Test lines 164-166: node position update in addword."""
     d = T9Dict(str(test_dict_path))
-    # Add a word that should trigger the position update logic
-    # This happens when nodes[p-1].fpos != 0 and needsave == -1
+    # Add a word below existing nodes, so their copies point at the new ones
     d.addword("specialword")
 
     # Verify word was added successfully
@@ -279,3 +302,11 @@ def test_fallback_dead_end_lines_85_86(test_data_dir, tmp_path):
 
     # For now, just verify it returns something (might not hit lines 85-86 yet)
     assert isinstance(result, list)
+
+
+def test_getmany_same_as_getwords(test_dict_path):
+    """Test batched lookups give what getwords() gives, sorted or not."""
+    d = T9Dict(str(test_dict_path))
+    sequences = ["4", "43", "43556", "4355699", "46", "4663", "22899", "228", "1", "9999", "2287"]
+    for order in (sequences, sorted(sequences)):
+        assert d.getmany(order) == [d.getwords(digits) for digits in order]
@@ -0,0 +1,236 @@
+"""Tests for tools that work on compiled dictionary files."""
+
+import io
+import itertools
+import os
+
+import pytest
+from t9 import maket9
+from t9.dict import T9Dict
+from t9.dicttools import diff, inspect, merge, read_frequencies, reorder, walk_pair
+from t9.header import read_header
+from t9.key import REF
+from t9.utils import getkey
+
+WORDS = ["good", "home", "gone", "Hood", "cat", "act", "bat", "hello", "a", "b", "c"]
+
+
+@pytest.fixture
+def wordlist(tmp_path):
+    path = tmp_path / "words.txt"
+    path.write_text("\n".join(WORDS) + "\n", encoding="utf-8")
+    return path
+
+
+@pytest.mark.parametrize("options", [{}, {"pool": True}, {"wide": True}])
+def test_reorder(wordlist, tmp_path, options):
+    """Test words are put in frequency order, and nothing else about the file changes."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(wordlist), str(dict_path), "Test", "Test", **options)
+    size = os.path.getsize(dict_path)
+    assert T9Dict(str(dict_path)).getwords("4663") == ["good", "home", "gone", "Hood"]
+
+    result = reorder(dict_path, {"hood": 10, "gone": 5, "home": 5, "act": 1})
+    assert result["reordered"] == 2
+    assert result["skipped"] == 0
+    assert os.path.getsize(dict_path) == size
+    d = T9Dict(str(dict_path))
+    # "Hood" is counted in lower case, and equal counts keep their order
+    assert d.getwords("4663") == ["Hood", "home", "gone", "good"]
+    assert d.getwords("228") == ["act", "cat", "bat"]
+    assert d.getwords("43556") == ["hello"]
+    assert d.getwords("466") == ["Hood", "home", "gone", "good"]
+
+
+def test_reorder_output(wordlist, tmp_path):
+    """Test output leaves the original file alone, and words can still be added to the result."""
+    dict_path = tmp_path / "test.dict"
+    out_path = tmp_path / "out.dict"
+    maket9.makedict(str(wordlist), str(dict_path), "Test", "Test")
+    original = dict_path.read_bytes()
+    reorder(dict_path, {"bat": 3}, out_path)
+    assert dict_path.read_bytes() == original
+    d = T9Dict(str(out_path))
+    assert d.getwords("228") == ["bat", "cat", "act"]
+    d.addword("abu")
+    assert T9Dict(str(out_path)).getwords("228") == ["bat", "cat", "act", "abu"]
+
+
+def test_addword_after_reorder(wordlist, tmp_path):
+    """Test a dictionary opened before a reorder adds words to the new file."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(wordlist), str(dict_path), "Test", "Test")
+    d = T9Dict(str(dict_path))
+    reorder(dict_path, {"bat": 3})
+    d.addword("abu")
+    assert T9Dict(str(dict_path)).getwords("228") == ["bat", "cat", "act", "abu"]
+
+
+def test_reorder_skips_changed_encoding(wordlist, tmp_path):
+    """Test a node whose words wouldn't re-encode to the same length is left alone, and counted."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(wordlist), str(dict_path), "Test", "Test")
+    # a line ending in "\r\n" is read without the "\r", so it would be written a byte shorter
+    data = dict_path.read_bytes()
+    dict_path.write_bytes(data.replace(b"good\n", b"goo\r\n"))
+    result = reorder(dict_path, {"hood": 10, "bat": 3})
+    assert result["reordered"] == 1
+    assert result["skipped"] == 1
+    d = T9Dict(str(dict_path))
+    assert d.getwords("4663") == ["goo", "home", "gone", "Hood"]
+    assert d.getwords("228") == ["bat", "cat", "act"]
+
+
+def test_reorder_compressed(wordlist, tmp_path):
+    """Test compressed dictionaries are refused."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(wordlist), str(dict_path), "Test", "Test", compress="zlib")
+    original = dict_path.read_bytes()
+    with pytest.raises(io.UnsupportedOperation):
+        reorder(dict_path, {"bat": 3})
+    assert dict_path.read_bytes() == original
+    assert sorted(os.listdir(tmp_path)) == ["test.dict", "words.txt"]
+
+
+def test_read_frequencies(tmp_path):
+    """Test counted and ranked frequency files."""
+    counted = tmp_path / "counted.txt"
+    counted.write_text("the\t100\nof 50\nNew York 3\n", encoding="utf-8")
+    assert read_frequencies(counted) == {"the": 100, "of": 50, "New York": 3}
+    ranked = tmp_path / "ranked.txt"
+    ranked.write_text("the\nof\nand\n", encoding="utf-8")
+    assert read_frequencies(ranked) == {"the": 3, "of": 2, "and": 1}
+
+
+@pytest.fixture
+def dict_pair(tmp_path):
+    """Two dictionaries with some words in common, the second pooled."""
+    a_words = tmp_path / "a.txt"
+    a_words.write_text("good\nhome\ncat\nhello\n", encoding="utf-8")
+    b_words = tmp_path / "b.txt"
+    b_words.write_text("gone\nhome\nhood\nbat\ncat\nxyz\n", encoding="utf-8")
+    a_path = tmp_path / "a.dict"
+    b_path = tmp_path / "b.dict"
+    maket9.makedict(str(a_words), str(a_path), "Test", "A")
+    maket9.makedict(str(b_words), str(b_path), "Test", "B", pool=True)
+    return a_path, b_path
+
+
+@pytest.mark.parametrize(
+    "priority, expected",
+    [
+        ("a", ["good", "home", "gone", "hood"]),
+        ("b", ["gone", "home", "hood", "good"]),
+        ("interleave", ["good", "gone", "home", "hood"]),
+    ],
+)
+def test_merge(dict_pair, tmp_path, priority, expected):
+    """Test every word of both dictionaries is in the merge, in priority order."""
+    out_path = tmp_path / "out.dict"
+    result = merge(*dict_pair, out_path, priority)
+    assert result["words"] == 8
+    d = T9Dict(str(out_path))
+    assert d.wordcount == 8
+    assert d.comment == "A"
+    assert d.getwords("4663") == expected
+    assert d.getwords("43556") == ["hello"]
+    assert d.getwords("999") == ["xyz"]
+    assert set(d.getwords("228")) == {"cat", "bat"}
+    # the result is a normal dictionary
+    d.addword("abu")
+    assert T9Dict(str(out_path)).getwords("228")[-1] == "abu"
+
+
+def test_diff(dict_pair):
+    """Test words added and removed are listed by digit sequence, in order."""
+    assert list(diff(*dict_pair)) == [
+        ("228", ["bat"], []),
+        ("43556", [], ["hello"]),
+        ("4663", ["gone", "hood"], ["good"]),
+        ("999", ["xyz"], []),
+    ]
+    assert list(diff(dict_pair[0], dict_pair[0])) == []
+
+
+def test_merge_overflows_to_wide(tmp_path):
+    """Test a merge with too many words for one node of a narrow file is written wide."""
+    words = ["".join(w) for w in itertools.product("abc", repeat=10)][:40000]
+    paths = []
+    for name, part in (("a", words[:20000]), ("b", words[20000:])):
+        wordlist = tmp_path / f"{name}.txt"
+        wordlist.write_text("\n".join(part) + "\n", encoding="utf-8")
+        paths.append(tmp_path / f"{name}.dict")
+        maket9.makedict(str(wordlist), str(paths[-1]), "Test", "Test")
+    result = merge(*paths, tmp_path / "out.dict")
+    assert result["wide"]
+    assert T9Dict(str(tmp_path / "out.dict")).getwords("2" * 10) == words
+
+
+@pytest.mark.parametrize("options", [{}, {"pool": True}, {"wide": True}, {"compress": "zlib"}, {"layout": "dfs"}])
+def test_inspect(wordlist, tmp_path, options):
+    """Test the shape of a sound dictionary is measured, with no problems."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(wordlist), str(dict_path), "Test", "Test", **options)
+    result = inspect(dict_path, top=2)
+    assert result["problems"] == []
+    assert result["words"] == len(WORDS)
+    assert result["dead_nodes"] == 0
+    # the root and the nodes down to every word, shared where their keys are
+    assert result["nodes"] == len({getkey(w)[:i] for w in WORDS for i in range(len(getkey(w)) + 1)})
+    assert result["depth"]["0"] == 1
+    assert result["max_depth"] == 5
+    assert result["words_per_node"]["4"] == 1
+    assert result["most_words"][0]["keys"] == "4663"
+    assert result["most_words"][0]["words"] == 4
+    assert result["compressed"] == options.get("compress")
+
+
+def test_inspect_dead_nodes(wordlist, tmp_path):
+    """Test the nodes addword() leaves behind are counted, but aren't problems."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(wordlist), str(dict_path), "Test", "Test")
+    before = inspect(dict_path)
+    T9Dict(str(dict_path)).addword("abu")
+    after = inspect(dict_path)
+    assert after["problems"] == []
+    # the old root, and the old nodes for "2", "22" and "228"
+    assert after["dead_nodes"] == 4
+    # every byte appended is a copy of a dead node, apart from "abu\n"
+    assert after["sections"]["dead_nodes"] == after["file_bytes"] - before["file_bytes"] - 4
+    assert after["words"] == len(WORDS) + 1
+
+
+def test_inspect_problems(wordlist, tmp_path):
+    """Test broken child positions, word counts and truncated files are found."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(wordlist), str(dict_path), "Test", "Test", layout="dfs")
+    data = bytearray(dict_path.read_bytes())
+    header = read_header(data)
+    # the root comes last in a dfs layout: point its first child past the end
+    data[header.rootpos + 2 : header.rootpos + 6] = REF.pack(len(data) + 100)
+    dict_path.write_bytes(data)
+    result = inspect(dict_path)
+    messages = [p["problem"] for p in result["problems"]]
+    assert messages[0] == "child position out of range"
+    assert result["problems"][0]["position"] == header.rootpos
+    assert messages[1].startswith("header word count")
+
+    dict_path.write_bytes(data[:-3])
+    result = inspect(dict_path)
+    assert result["problems"][0] == {"problem": "truncated node", "position": header.rootpos}
+    assert "root position not at a node" in [p["problem"] for p in result["problems"]]
+
+
+def test_walk_pair_holds_its_version(dict_pair):
+    """Test a walk carries on through a reload, and lets go of the old file when it's done."""
+    a = T9Dict(str(dict_pair[0]))
+    b = T9Dict(str(dict_pair[1]))
+    walk = walk_pair(a, b)
+    keys = [next(walk)[0]]
+    old = a.current()
+    a.reload()
+    b.reload()
+    keys += [k for k, ka, kb in walk]
+    assert keys == [k for k, ka, kb in walk_pair(a, b)]
+    assert "4663" in keys
+    assert old.mapping.mm.closed
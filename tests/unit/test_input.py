@@ -0,0 +1,115 @@
+"""Tests for the T9Input parser."""
+
+import pytest
+from t9 import maket9
+from t9.dict import T9Dict
+from t9.input import T9Input
+from t9.mode import InputMode
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+def test_predictive_typing(test_dict_path):
+    """Test typing a word and accepting it with a space."""
+    x = T9Input(T9Dict(str(test_dict_path)))
+    x.sendkeys("43556")
+    assert x.gettext() == "[hello]"
+    x.sendkeys("0")
+    assert x.gettext() == "hello |"
+    assert x.text() == "hello "
+
+
+def test_text_properties(test_dict_path):
+    """Test textbefore and textafter follow the cursor, and can be set."""
+    x = T9Input(T9Dict(str(test_dict_path)), "ab", defaultmode=InputMode.NUMERIC)
+    x.sendkeys("L")
+    assert (x.textbefore, x.textafter) == ("a", "b")
+    x.textafter = "cd"
+    x.textbefore = "xy"
+    assert x.gettext() == "xy#cd"
+
+
+def test_text_mode_multitap(test_dict_path, capsys):
+    """Test repeated keys cycle letters in text mode, without printing anything."""
+    x = T9Input(T9Dict(str(test_dict_path)), defaultmode=InputMode.TEXT_LOWER, keydelay=60)
+    x.sendkeys("222")
+    assert x.text() == "c"
+    x.sendkeys("0LD")
+    assert x.gettext() == "() "
+    assert capsys.readouterr().out == ""
+
+
+def test_edit_word_before_cursor(test_dict_path):
+    """Test moving left into a word puts it back into word edit mode."""
+    x = T9Input(T9Dict(str(test_dict_path)), "say hello")
+    x.sendkeys("L")
+    assert x.mode == InputMode.EDIT_WORD
+    assert x.gettext() == "say [hello]"
+
+
+def test_diff(test_dict_path):
+    """Test display changes rebuild the display, and only cover what changed."""
+    x = T9Input(T9Dict(str(test_dict_path)), "say ")
+    change = x.diff()
+    assert (change.start, change.end, change.text) == (0, 0, "say |")
+    display = change.apply("")
+
+    x.sendkeys("435")
+    change = x.diff()
+    assert change.start == 4
+    assert change.cursor == 4
+    assert change.mode == InputMode.EDIT_CHAR
+    assert change.candidates == x.words != []
+    display = change.apply(display)
+    assert display == x.gettext()
+
+    # only the end of the cursor text changes
+    x.sendkeys("5")
+    change = x.diff()
+    assert (change.start, change.end, change.text) == (10, 12, 'l"?')
+    display = change.apply(display)
+
+    x.sendkeys("6")
+    assert x.diff().apply(display) == x.gettext() == "say [hello]"
+
+    x.sendkeys("0")
+    change = x.diff()
+    assert change.todict() == {
+        "start": 4,
+        "end": 11,
+        "text": "hello |",
+        "cursor": 10,
+        "candidates": [],
+        "mode": 0,
+    }
+
+
+def test_timed_keys(test_dict_path):
+    """Test keys sent with times cycle letters only within keydelay of each other."""
+    x = T9Input(T9Dict(str(test_dict_path)), defaultmode=InputMode.TEXT_LOWER, keydelay=0.5)
+    x.sendkeys([("2", 10.0), ("2", 10.3), ("2", 11.0), ("3", 11.1), ("3", 11.2)])
+    assert x.text() == "bae"
+
+
+@pytest.mark.parametrize("start", [0.0, 100.0])
+def test_timed_keys_break(test_dict_path, start):
+    """Test a key other than a digit ends multi-tap, whenever the keys start."""
+    x = T9Input(T9Dict(str(test_dict_path)), defaultmode=InputMode.TEXT_LOWER, keydelay=0.5)
+    x.sendkeys([("2", start), ("R", start + 0.1), ("2", start + 0.2)])
+    assert x.text() == "aa"
+
+
+def test_injected_clock(test_dict_path):
+    """Test untimed keys use the input's clock."""
+    now = [0.0]
+    x = T9Input(T9Dict(str(test_dict_path)), defaultmode=InputMode.TEXT_UPPER, clock=lambda: now[0])
+    x.sendkeys("22")
+    now[0] = 1.0
+    x.sendkeys("2")
+    assert x.text() == "BA"
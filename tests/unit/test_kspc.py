@@ -0,0 +1,104 @@
+"""Tests for keystrokes per character evaluation."""
+
+import shutil
+
+import pytest
+from t9 import maket9
+from t9.dict import T9Dict
+from t9.input import T9Input
+from t9.kspc import charmode, corpus_words, evaluate, wordkeys
+from t9.utils import getkey
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+@pytest.mark.parametrize("word", ["hello", "cats", "act", "bat", "Good", "HELLO", "xyzzy", "gekk", "a", "éa"])
+def test_keys_type_the_word(test_dict_path, tmp_path, word):
+    """Test the keys worked out for a word really type it, in T9Input."""
+    d = T9Dict(str(test_dict_path))
+    digits = getkey(word)
+    editchar = charmode(digits, [d.getwords(digits[:n]) for n in range(1, len(digits) + 1)])
+    keys, _ = wordkeys(word, d.getwords(digits), digits, editchar)
+    scratch = tmp_path / "scratch.dict"
+    shutil.copyfile(test_dict_path, scratch)
+    x = T9Input(T9Dict(str(scratch)))
+    x.sendkeys(keys)
+    assert x.text() == word + " "
+
+
+def test_word_keys(test_dict_path):
+    """Test first choice words need only their digits, and others more."""
+    d = T9Dict(str(test_dict_path))
+    assert wordkeys("hello", d.getwords("43556")) == ("435560", False)
+    keys, spelled = wordkeys("act", d.getwords("228"))
+    assert spelled
+    assert keys.startswith("228U")
+
+
+def test_corpus_words():
+    """Test words are counted without the punctuation around them."""
+    assert corpus_words('Hello, hello. "don\'t" ... go') == {"Hello": 1, "hello": 1, "don't": 1, "go": 1}
+
+
+def test_evaluate(test_dict_path):
+    """Test a corpus of first choice words costs one key per character."""
+    result = evaluate(test_dict_path, "hello go hello. cat")
+    assert result["words"] == 4
+    assert result["chars"] == 19
+    assert result["keystrokes"] == 19
+    assert result["kspc"] == 1.0
+    assert result["first_choice"] == 1.0
+    assert result["lookups"] == 3
+
+    result = evaluate(test_dict_path, "hello act")
+    assert result["kspc"] > 1.0
+    assert result["spelled"] == 1
+
+
+def test_evaluate_closes_what_it_opens(test_dict_path, monkeypatch):
+    """Test a dictionary opened from a path is closed, and one passed in is left open."""
+    closed = []
+    close = T9Dict.close
+    monkeypatch.setattr(T9Dict, "close", lambda self: closed.append(self) or close(self))
+    evaluate(test_dict_path, "hello go")
+    assert len(closed) == 1
+
+    d = T9Dict(str(test_dict_path))
+    evaluate(d, "hello go")
+    assert len(closed) == 1
+    assert d.getwords("46") == ["go"]
+
+
+@pytest.mark.parametrize("word", ["hellp", "tesz"])
+def test_word_with_no_candidates(test_dict_path, tmp_path, word):
+    """Test a word with nothing offered is spelled when its digits end in character editing."""
+    d = T9Dict(str(test_dict_path))
+    keys = getkey(word)
+    assert d.getwords(keys) == []
+    assert charmode(keys, [d.getwords(keys[:n]) for n in range(1, len(keys) + 1)])
+    presses, spelled = wordkeys(word, [], keys, editchar=True)
+    assert spelled
+    scratch = tmp_path / "scratch.dict"
+    shutil.copyfile(test_dict_path, scratch)
+    x = T9Input(T9Dict(str(scratch)))
+    x.sendkeys(presses)
+    assert x.text() == word + " "
+
+
+def test_untypeable_word(test_dict_path):
+    """Test a word with nothing offered, whose digits end in word editing, counts as untyped."""
+    d = T9Dict(str(test_dict_path))
+    keys = getkey("qzx")
+    assert d.getwords(keys) == []
+    assert not charmode(keys, [d.getwords(keys[:n]) for n in range(1, len(keys) + 1)])
+    assert wordkeys("qzx", [], keys) == (None, True)
+    result = evaluate(test_dict_path, "hello qzx hellp")
+    assert result["words"] == 2
+    assert result["untyped"] == 1
+    assert result["spelled"] == 1
@@ -0,0 +1,63 @@
+"""Tests for batch digit sequence lookups."""
+
+import io
+import json
+
+import pytest
+from t9 import maket9
+from t9.lookup import Lookup, match_type
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+def run(lookup, text):
+    """Run a lookup over text lines and return the output lines."""
+    out = io.BytesIO()
+    count = lookup.run(io.BytesIO(text.encode()), out)
+    lines = out.getvalue().decode().splitlines()
+    assert count == len(lines)
+    return lines
+
+
+def test_match_type():
+    """Test match types follow the length of the first word."""
+    assert match_type("46", ["go"]) == "exact"
+    assert match_type("4", ["go"]) == "lookahead"
+    assert match_type("22899", ["cat"]) == "lookbehind"
+    assert match_type("1", []) == "none"
+
+
+def test_tsv_output(test_dict_path):
+    """Test one TSV line per input line, in order."""
+    lines = run(Lookup(test_dict_path, match=True), "43556\n46\n")
+    assert lines[0].split("\t")[:3] == ["43556", "exact", "hello"]
+    assert lines[1].split("\t")[:3] == ["46", "exact", "go"]
+
+
+def test_jsonl_output_and_top(test_dict_path):
+    """Test JSON lines output is cut down to the top words."""
+    lines = run(Lookup(test_dict_path, top=1, fmt="jsonl"), "4\n")
+    result = json.loads(lines[0])
+    assert result["digits"] == "4"
+    assert len(result["words"]) == 1
+    assert "match" not in result
+
+
+def test_invalid_lines_are_empty(test_dict_path):
+    """Test blank and non-digit lines keep their place with no words."""
+    lines = run(Lookup(test_dict_path, match=True), "\n4305\nabc\n46\n")
+    assert lines[:3] == ["\tnone", "4305\tnone", "abc\tnone"]
+    assert lines[3].startswith("46\texact")
+
+
+def test_repeated_lookups_are_remembered(test_dict_path):
+    """Test a repeated digit sequence gives the same line."""
+    lookup = Lookup(test_dict_path)
+    assert lookup.lookup("228") == lookup.lookup("228")
+    assert "cat" in lookup.lookup("228")
@@ -4,6 +4,8 @@ import pytest
 from pathlib import Path
 from t9 import maket9
 from t9.dict import T9Dict
+from t9.header import read_header
+from t9.key import T9Key
 from t9.utils import getkey, read_wordlist
 
 
@@ -45,3 +47,95 @@ def test_makedict_all_words_retrievable(test_data_dir, tmp_path, wordlist_file):
         key = getkey(word)
         result = d.getwords(key)
         assert word in result, f"Word '{word}' (key {key}) not found in dictionary results {result}"
+
+
+def test_makedict_header_generation(test_data_dir, tmp_path):
+    """Test each build gets a header extension with a new generation, and no temp file is left."""
+    dict_path = tmp_path / "test.dict"
+    generations = []
+    for _ in range(2):
+        maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Comment")
+        header = read_header(dict_path.read_bytes())
+        generations.append(header.generation)
+
+    assert header.extended
+    assert header.language == "Test"
+    assert header.comment == "Comment"
+    assert header.wordcount == len(list(read_wordlist(test_data_dir / "branches.txt")))
+    assert generations[0] != generations[1]
+    assert [p.name for p in tmp_path.iterdir()] == ["test.dict"]
+
+
+def test_makedict_without_extension(test_data_dir, tmp_path, monkeypatch):
+    """Test dictionaries in the original header format can still be read."""
+    monkeypatch.setattr(maket9, "new_generation", lambda: None)
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Comment")
+
+    assert b"PY9X" not in dict_path.read_bytes()
+    header = read_header(dict_path.read_bytes())
+    assert not header.extended
+    assert header.genpos == 8
+
+    d = T9Dict(str(dict_path))
+    assert "hello" in d.getwords("43556")
+    assert d.comment == "Comment"
+
+
+@pytest.mark.parametrize("layout", maket9.LAYOUTS)
+def test_makedict_layouts(test_data_dir, tmp_path, layout):
+    """Test every layout holds the same words, with the root first unless depth-first."""
+    wordlist_path = test_data_dir / "branches.txt"
+    dict_path = tmp_path / f"{layout}.dict"
+    maket9.makedict(str(wordlist_path), str(dict_path), "Test", "Test", layout)
+
+    d = T9Dict(str(dict_path))
+    header = read_header(dict_path.read_bytes())
+    if layout == "dfs":
+        assert d.rootpos > header.size
+    else:
+        assert d.rootpos == header.size
+    for word in read_wordlist(wordlist_path):
+        assert word in d.getwords(getkey(word))
+
+
+def test_hot_layout_subtrees(tmp_path, monkeypatch):
+    """Test below the breadth-first levels, the most frequent path follows its parent."""
+    monkeypatch.setattr(maket9, "HOT_BYTES", 0)
+    wordlist_path = tmp_path / "words.txt"
+    wordlist_path.write_text("hi\ngo\nha\n")
+    dict_path = tmp_path / "hot.dict"
+    maket9.makedict(str(wordlist_path), str(dict_path), layout="hot")
+
+    data = dict_path.read_bytes()
+    # "hi" (44) is the most frequent child of 4, then "go" (46) and "ha" (42)
+    assert data.index(b"hi\n") < data.index(b"go\n") < data.index(b"ha\n")
+
+
+def test_makedict_unknown_layout(test_data_dir, tmp_path):
+    """Test an unknown layout is refused."""
+    with pytest.raises(ValueError):
+        maket9.makedict(str(test_data_dir / "branches.txt"), str(tmp_path / "x.dict"), layout="zigzag")
+
+
+def test_no_identical_subtrees(test_data_dir):
+    """Test every subtree is unique, as every word is stored at its own key's path."""
+    root = T9Key()
+    nodes = 1
+    for word in read_wordlist(test_data_dir / "branches.txt"):
+        r = root
+        for c in getkey(word):
+            if r.refs[int(c) - 1] is None:
+                r.refs[int(c) - 1] = T9Key()
+                nodes += 1
+            r = r.refs[int(c) - 1]
+        r.words.append(word)
+
+    subtrees = {}
+
+    def intern(k):
+        shape = (tuple(k.words), tuple(None if r is None else intern(r) for r in k.refs))
+        return subtrees.setdefault(shape, len(subtrees))
+
+    intern(root)
+    assert len(subtrees) == nodes
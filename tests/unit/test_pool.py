@@ -0,0 +1,69 @@
+"""Tests for the front-coded string pool."""
+
+import pytest
+from t9 import maket9
+from t9.dict import T9Dict
+from t9.header import EXT_MARKER, read_header
+from t9.pool import StringPool, build_pool, decode_varint, encode_varint
+from t9.utils import getkey, read_wordlist
+
+
+@pytest.fixture
+def pooled_dict_path(test_data_dir, tmp_path):
+    """Create a pooled test dictionary from branches.txt."""
+    dict_path = tmp_path / "pooled.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test", pool=True)
+    return dict_path
+
+
+@pytest.mark.parametrize("n", [0, 1, 127, 128, 300, 1 << 21, (1 << 32) + 5])
+def test_varint_round_trip(n):
+    """Test varints decode to what was encoded."""
+    data = b"x" + encode_varint(n)
+    assert decode_varint(data, 1) == (n, len(data))
+
+
+def test_pool_words():
+    """Test every word can be found by number, across blocks."""
+    words = ["polish", "Polish", "police", "policy", "polite", "go", "in", "hello", "hell", "héllo"] * 2
+    data, ids = build_pool(words, block_words=3)
+    pool = StringPool(b"\0" * 5 + data, 5)
+
+    assert pool.count == len(set(words))
+    assert pool.end == 5 + len(data)
+    for word, i in ids.items():
+        assert pool.word(i) == word
+    # case variants sit next to each other
+    assert abs(ids["Polish"] - ids["polish"]) == 1
+
+
+def test_pooled_dict_lookups(pooled_dict_path, test_data_dir):
+    """Test a pooled dictionary holds every word."""
+    header = read_header(pooled_dict_path.read_bytes())
+    assert header.flags
+
+    d = T9Dict(str(pooled_dict_path))
+    for word in read_wordlist(test_data_dir / "branches.txt"):
+        assert word in d.getwords(getkey(word))
+
+
+def test_pooled_dict_addword(pooled_dict_path):
+    """Test new words are stored inline alongside pooled ones."""
+    d = T9Dict(str(pooled_dict_path))
+    d.addword("gekk")
+    d.addword("hekko")
+
+    d2 = T9Dict(str(pooled_dict_path))
+    assert d2.getwords("4355") == ["gekk"]
+    assert "hekko" in d2.getwords("43556")
+    assert "hello" in d2.getwords("43556")
+
+
+def test_unsupported_flags(pooled_dict_path):
+    """Test files using format flags this version doesn't know are refused."""
+    data = bytearray(pooled_dict_path.read_bytes())
+    pos = data.index(EXT_MARKER)
+    data[pos + 6 : pos + 8] = b"\x80\x00"
+    pooled_dict_path.write_bytes(bytes(data))
+    with pytest.raises(ValueError):
+        T9Dict(str(pooled_dict_path))
@@ -0,0 +1,76 @@
+"""Tests for speculative next-digit lookups."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from t9 import maket9
+from t9.dict import T9Dict
+from t9.input import T9Input
+from t9.prefetch import Prefetcher
+from t9.stats import T9Stats
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+def test_next_keys_come_from_prefetch(test_dict_path):
+    """Test keys typed after a prefetch are answered from it, with the same words."""
+    plain = T9Input(T9Dict(str(test_dict_path)))
+    x = T9Input(T9Dict(str(test_dict_path)), prefetch=9)
+    for key in "43556":
+        x.prefetcher.wait()
+        x.sendkeys(key)
+        plain.sendkeys(key)
+        assert x.gettext() == plain.gettext()
+        assert x.words == plain.words
+
+    p = x.prefetcher
+    assert p.misses == 0
+    assert p.hits > 0
+    assert p.hit_rate == 1.0
+    assert p.lookups >= 9
+
+
+def test_cancelled_by_next_key(test_dict_path):
+    """Test a prefetch that hasn't started is cancelled, and counted."""
+    release = threading.Event()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(release.wait)
+        p = Prefetcher(T9Dict(str(test_dict_path)), 3, executor)
+        p.start("4")
+        p.cancel()
+        release.set()
+        assert p.cancelled == 1
+        assert p.getwords("43") == T9Dict(str(test_dict_path)).getwords("43")
+        assert p.as_dict()["misses"] == 1
+
+
+def test_stale_after_word_added_elsewhere(test_dict_path):
+    """Test prefetched words aren't used once another dictionary adds a word to the file."""
+    p = Prefetcher(T9Dict(str(test_dict_path)), 3)
+    p.start("4")
+    p.wait()
+    assert p.getwords("46") == ["go"]
+    T9Dict(str(test_dict_path)).addword("in")
+    assert p.getwords("46") == ["go", "in"]
+    assert p.as_dict()["hits"] == 1
+    assert p.as_dict()["misses"] == 1
+
+
+def test_prefetch_counted_apart(test_dict_path):
+    """Test prefetch lookups are counted in the dictionary's stats, but not as getwords."""
+    stats = T9Stats()
+    p = Prefetcher(T9Dict(str(test_dict_path), stats), 3)
+    p.start("4")
+    p.wait()
+    p.getwords("46")
+    p.getwords("2")
+    totals = stats.as_dict()
+    assert totals["prefetch"]["calls"] == 3
+    assert totals["getwords"]["calls"] == 1
@@ -0,0 +1,40 @@
+"""Tests for command profiling."""
+
+import tracemalloc
+
+from t9 import maket9
+from t9.profiling import profile_paths, run_profiled
+
+
+def test_profile_paths(tmp_path):
+    """Test the .pstats suffix is added once and the summary sits beside it."""
+    assert profile_paths(tmp_path / "run") == (tmp_path / "run.pstats", tmp_path / "run.txt")
+    assert profile_paths(tmp_path / "run.pstats") == (tmp_path / "run.pstats", tmp_path / "run.txt")
+
+
+def test_run_profiled(test_data_dir, tmp_path):
+    """Test a profiled build returns its result and writes both files."""
+    dict_path = tmp_path / "test.dict"
+
+    def build():
+        maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path))
+        return 7
+
+    assert run_profiled(build, tmp_path / "build") == 7
+
+    assert (tmp_path / "build.pstats").stat().st_size > 0
+    summary = (tmp_path / "build.txt").read_text()
+    assert "Peak traced memory" in summary
+    assert "maket9.py" in summary.split("Hottest t9 functions")[1].split("Hottest functions overall")[0]
+
+
+def test_run_profiled_tracing_stopped(tmp_path):
+    """Test the profile is still written when the command stops tracing itself."""
+
+    def stop():
+        tracemalloc.stop()
+        return 3
+
+    assert run_profiled(stop, tmp_path / "stop") == 3
+    assert (tmp_path / "stop.pstats").stat().st_size > 0
+    assert "not traced to the end" in (tmp_path / "stop.txt").read_text()
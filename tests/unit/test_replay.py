@@ -0,0 +1,78 @@
+"""Tests for keypress log replay."""
+
+import io
+import json
+
+import pytest
+from t9 import maket9
+from t9.replay import Totals, run_replay
+
+SESSIONS = [
+    {"id": "typed", "keys": "435560"},
+    {"id": "added", "text": "say gekk", "keys": "LR"},
+    {"id": "after", "keys": "4355R"},
+    {"id": "multitap", "mode": 3, "keys": "2223", "times": [0.0, 0.1, 0.9, 1.0]},
+    {"id": "short", "mode": 3, "keys": "22", "times": [0.0]},
+]
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+def replay(dict_path, sessions, workers=1):
+    """Replay sessions, returning the results and summary."""
+    log = "".join(json.dumps(s) + "\n" for s in sessions).encode()
+    out = io.BytesIO()
+    summary = run_replay(dict_path, io.BytesIO(log), out, workers, chunk_bytes=64)
+    return [json.loads(line) for line in out.getvalue().splitlines()], summary
+
+
+def test_replay_sandboxes_new_words(test_dict_path):
+    """Test sessions are replayed alone, without changing the dictionary."""
+    before = test_dict_path.read_bytes()
+    results, summary = replay(test_dict_path, SESSIONS)
+    alone, _ = replay(test_dict_path, SESSIONS[2:3])
+
+    assert [r["id"] for r in results] == [s["id"] for s in SESSIONS]
+    assert results[0]["text"] == "hello "
+    assert results[1]["added"] == 1
+    assert results[2] == alone[0]
+    assert results[3]["text"] == "bad"
+    assert results[4]["error"].startswith("IndexError")
+    assert test_dict_path.read_bytes() == before
+
+    assert (summary["sessions"], summary["keys"], summary["errors"], summary["added"]) == (5, 19, 1, 1)
+    assert summary["latency"]["p50_us"] > 0
+
+
+def test_workers_give_same_results(test_dict_path):
+    """Test a process pool gives the same results, in the same order."""
+    sessions = SESSIONS * 20
+    expected, _ = replay(test_dict_path, sessions)
+    results, summary = replay(test_dict_path, sessions, workers=2)
+    assert results == expected
+    assert summary["sessions"] == 100
+
+
+def test_totals_histogram():
+    """Test latencies are counted in buckets, which add up across workers."""
+    a = Totals()
+    b = Totals()
+    for seconds in (3e-6, 3e-6, 3e-6, 0.5):
+        a.key(seconds)
+    for seconds in (3e-6, 1.5e-5):
+        b.key(seconds)
+    a.add(b)
+    assert sum(a.histogram) == 6
+    assert a.histogram[-1] == 1
+    latency = a.percentiles()
+    # the upper bound of the bucket each percentile falls in
+    assert latency["p50_us"] == 5.0
+    assert latency["p90_us"] == 500000.0
+    assert latency["max_us"] == 500000.0
+    assert latency["mean_us"] == round((4 * 3e-6 + 1.5e-5 + 0.5) / 6 * 1e6, 3)
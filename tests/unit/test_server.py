@@ -0,0 +1,101 @@
+"""Tests for the asyncio lookup server, using local clients."""
+
+import asyncio
+import json
+import sys
+
+import pytest
+from t9 import maket9
+from t9.server import T9Server
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+async def send(reader, writer, keys):
+    """Send a line of keys and read the JSON reply."""
+    writer.write(keys.encode() + b"\n")
+    await writer.drain()
+    return json.loads(await reader.readline())
+
+
+def test_tcp_sessions_are_separate(test_dict_path):
+    """Test two clients type independently against one dictionary."""
+
+    async def run():
+        server = T9Server(test_dict_path)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            r1, w1 = await asyncio.open_connection("127.0.0.1", port)
+            r2, w2 = await asyncio.open_connection("127.0.0.1", port)
+
+            assert (await send(r1, w1, "43556"))["display"] == "[hello]"
+            assert (await send(r2, w2, "46"))["display"] == "[go]"
+            reply = await send(r1, w1, "0")
+            assert reply["text"] == "hello "
+            assert reply["display"] == "hello |"
+            assert reply["mode"] == 0
+            assert (await send(r2, w2, ""))["text"] == "go"
+
+            for w in (w1, w2):
+                w.close()
+                await w.wait_closed()
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            await server.close()
+
+    asyncio.run(run())
+
+
+def test_diff_replies(test_dict_path):
+    """Test a server started with diffs=True replies with display changes."""
+
+    async def run():
+        server = T9Server(test_dict_path, diffs=True)
+        listener = await server.start(port=0)
+        port = listener.sockets[0].getsockname()[1]
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            display = ""
+            for keys in ("228", "0", "46"):
+                reply = await send(reader, writer, keys)
+                display = display[: reply["start"]] + reply["text"] + display[reply["end"] :]
+            assert display == "cat [go]"
+            assert reply["cursor"] == 4
+            assert "go" in reply["candidates"]
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            await server.close()
+
+    asyncio.run(run())
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Unix sockets only")
+def test_unix_socket(test_dict_path, tmp_path):
+    """Test serving over a Unix socket."""
+
+    async def run():
+        server = T9Server(test_dict_path)
+        path = str(tmp_path / "t9.sock")
+        listener = await server.start(path)
+        try:
+            reader, writer = await asyncio.open_unix_connection(path)
+            assert (await send(reader, writer, "228"))["display"] == "[cat]"
+            writer.close()
+            await writer.wait_closed()
+        finally:
+            listener.close()
+            await listener.wait_closed()
+            await server.close()
+
+    asyncio.run(run())
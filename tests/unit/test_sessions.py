@@ -0,0 +1,89 @@
+"""Tests for the session pool and input snapshots."""
+
+import pytest
+from t9 import maket9
+from t9.dict import T9Dict
+from t9.input import T9Input
+from t9.mode import InputMode
+from t9.sessions import SessionPool
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+class FakeClock:
+    """A clock that only moves when told to."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_snapshot_restore(test_dict_path):
+    """Test a restored input carries on exactly like the original."""
+    d = T9Dict(str(test_dict_path))
+    x = T9Input(d, "say ", keydelay=60)
+    x.sendkeys("4355")
+    x.diff()
+    x.sendkeys("6")
+
+    y = T9Input.restore(d, x.snapshot())
+    assert y.gettext() == x.gettext() == "say [hello]"
+    assert y.mode == InputMode.EDIT_WORD
+    assert y.words == x.words
+    assert y.diff().todict() == x.diff().todict()
+    for keys in ("0", "S", "22", "0", "D", "L"):
+        x.sendkeys(keys)
+        y.sendkeys(keys)
+        assert y.gettext() == x.gettext()
+    assert not hasattr(y, "__dict__")
+
+
+def test_pool_evicts_idle_sessions(test_dict_path):
+    """Test idle sessions are snapshotted, and restored on their next keypress."""
+    clock = FakeClock()
+    with SessionPool(test_dict_path, idle=10, clock=clock) as pool:
+        a = pool.open()
+        b = pool.open("go ")
+        pool.sendkeys(a, "43556")
+        clock.now = 5
+        pool.sendkeys(b, "228")
+        assert pool.evict() == 0
+
+        clock.now = 12
+        assert pool.evict() == 1
+        assert (pool.live, pool.evicted, len(pool)) == (1, 1, 2)
+
+        pool.sendkeys(a, "0")
+        assert pool.get(a).text() == "hello "
+        assert pool.live == 2
+
+        clock.now = 100
+        assert pool.evict() == 2
+        assert pool.get(b).gettext() == "go [cat]"
+
+        pool.close(a)
+        pool.close(b)
+        assert a not in pool and len(pool) == 0
+        with pytest.raises(KeyError):
+            pool.get(a)
+
+
+def test_close_all_leaves_callers_dictionary_open(test_dict_path):
+    """Test close_all() only closes a dictionary the pool opened itself."""
+    shared = T9Dict(str(test_dict_path))
+    with SessionPool(shared) as pool:
+        pool.sendkeys(pool.open(), "43556")
+    assert shared.getwords("46") == ["go"]
+
+    with SessionPool(test_dict_path) as pool:
+        opened = pool.dict
+    with pytest.raises(ValueError, match="is closed"):
+        opened.getwords("46")
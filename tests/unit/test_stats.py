@@ -0,0 +1,74 @@
+"""Tests for opt-in dictionary and input instrumentation."""
+
+import pytest
+from t9 import maket9
+from t9.dict import T9Dict
+from t9.input import T9Input
+from t9.stats import T9Stats
+
+
+@pytest.fixture
+def test_dict_path(test_data_dir, tmp_path):
+    """Create a test dictionary from branches.txt."""
+    dict_path = tmp_path / "test.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test")
+    return dict_path
+
+
+def test_disabled_by_default(test_dict_path):
+    """Test nothing is recorded without a stats object."""
+    d = T9Dict(str(test_dict_path))
+    assert d.stats is None
+    assert "hello" in d.getwords("43556")
+
+
+def test_getwords_counters(test_dict_path):
+    """Test a lookup counts one node per digit plus the last node, and no opens."""
+    stats = T9Stats()
+    d = T9Dict(str(test_dict_path), stats)
+    d.getwords("43556")
+
+    totals = stats.as_dict()["getwords"]
+    assert totals["calls"] == 1
+    # the file is mapped when the dictionary is opened
+    assert totals["opens"] == 0
+    assert totals["nodes"] == 6
+    assert totals["bytes_read"] > 0
+    assert sum(totals["histogram"].values()) == 1
+
+
+def test_addword_counters(test_dict_path):
+    """Test adding a word counts bytes written."""
+    stats = T9Stats()
+    d = T9Dict(str(test_dict_path), stats)
+    d.addword("newword")
+
+    totals = stats.as_dict()["addword"]
+    assert totals["calls"] == 1
+    assert totals["bytes_written"] > 0
+
+
+def test_hook_sees_every_call(test_dict_path):
+    """Test the hook is called with each finished call."""
+    calls = []
+    stats = T9Stats(hook=calls.append)
+    x = T9Input(str(test_dict_path), stats=stats)
+    x.sendkeys("4355")
+
+    ops = [c.op for c in calls]
+    assert ops[-1] == "sendkeys"
+    assert "getwords" in ops
+    assert calls[-1].keys == 4
+
+
+def test_prometheus_export(test_dict_path):
+    """Test the Prometheus text export has counters and a histogram."""
+    stats = T9Stats()
+    d = T9Dict(str(test_dict_path), stats)
+    d.getwords("4")
+    d.getwords("46")
+
+    text = stats.prometheus()
+    assert 't9_calls_total{op="getwords"} 2' in text
+    assert 't9_latency_seconds_bucket{op="getwords",le="+Inf"} 2' in text
+    assert 't9_latency_seconds_count{op="getwords"} 2' in text
@@ -0,0 +1,103 @@
+"""Tests for wide dictionaries: 64-bit positions and 32-bit word counts."""
+
+import itertools
+import os
+import sys
+
+import pytest
+from t9 import maket9
+from t9.dict import T9Dict
+from t9.header import FLAG_WIDE, Header, new_generation, read_header, write_header
+from t9.key import T9Key
+from t9.utils import getkey, read_wordlist
+
+# where the nodes of the sparse test dictionary start
+SPARSE_START = 5 << 30
+
+
+def make_tree(words):
+    """Build a dictionary tree in memory."""
+    root = T9Key()
+    for word in words:
+        r = root
+        for c in getkey(word):
+            if r.refs[int(c) - 1] is None:
+                r.refs[int(c) - 1] = T9Key()
+            r = r.refs[int(c) - 1]
+        r.words.append(word)
+    return root
+
+
+def test_narrow_refs_past_2gb():
+    """Test narrow positions are unsigned, so nodes past 2 GiB can be referred to."""
+    k = T9Key()
+    k.words = ["go"]
+    data = k.tobytes([None, None, 3 << 30, None, None, None, None, None, (1 << 32) - 1])
+    loaded = T9Key()
+    assert loaded.loadbuffer(data, 0) == len(data)
+    assert loaded.refs[2] == 3 << 30
+    assert loaded.refs[8] == (1 << 32) - 1
+
+
+def test_wide_dict(test_data_dir, tmp_path):
+    """Test a wide dictionary holds every word, and takes new ones."""
+    dict_path = tmp_path / "wide.dict"
+    maket9.makedict(str(test_data_dir / "branches.txt"), str(dict_path), "Test", "Test", wide=True)
+    assert read_header(dict_path.read_bytes()).wide
+
+    d = T9Dict(str(dict_path))
+    for word in read_wordlist(test_data_dir / "branches.txt"):
+        assert word in d.getwords(getkey(word))
+    count = d.wordcount
+    d.addword("gekk")
+
+    d2 = T9Dict(str(dict_path))
+    assert d2.wordcount == count + 1
+    assert d2.getwords("4355") == ["gekk"]
+
+
+def test_wide_when_needed(tmp_path):
+    """Test a node with more than 32767 words makes a wide dictionary."""
+    words = ["".join(w) for w in itertools.islice(itertools.product("abc", repeat=10), 40000)]
+    wordlist = tmp_path / "words.txt"
+    wordlist.write_text("\n".join(words) + "\n")
+    dict_path = tmp_path / "many.dict"
+    maket9.makedict(str(wordlist), str(dict_path))
+
+    assert read_header(dict_path.read_bytes()).wide
+    assert T9Dict(str(dict_path)).getwords("2" * 10) == words
+
+
+@pytest.mark.skipif(sys.platform == "win32" or sys.maxsize < 1 << 32, reason="needs sparse files and a 64-bit map")
+def test_sparse_dictionary_over_4gb(test_data_dir, tmp_path):
+    """Test lookups and writes in a dictionary whose nodes are all past 4 GiB.
+
+    The nodes are written after a hole, so the file takes little space on
+    disk, and lookups only touch the pages they need.
+    """
+    words = list(read_wordlist(test_data_dir / "branches.txt"))
+    root = make_tree(words)
+    dict_path = tmp_path / "sparse.dict"
+    with open(dict_path, "wb") as f:
+        header = Header(0, 0, "Test", "Sparse", flags=FLAG_WIDE, generation=new_generation())
+        write_header(f, header)
+        f.seek(SPARSE_START)
+        maket9.save_nodes(f, maket9.layout_order(root, "dfs", None), wide=True)
+        f.seek(header.countpos)
+        f.write(header.pack_counts(len(words), root.fpos))
+
+    st = os.stat(dict_path)
+    if st.st_blocks * 512 >= 1 << 30:
+        pytest.skip("file system doesn't support sparse files")
+    assert st.st_size > 1 << 32
+
+    d = T9Dict(str(dict_path))
+    assert d.rootpos > 1 << 32
+    for word in words:
+        assert word in d.getwords(getkey(word))
+
+    d.addword("gekk")
+    d2 = T9Dict(str(dict_path))
+    assert d2.rootpos == d.rootpos > SPARSE_START
+    assert d2.getwords("4355") == ["gekk"]
+    assert "hello" in d2.getwords("43556")